@@ -0,0 +1,132 @@
+"""
+ai/accounting.py — Contabilidad de tokens y latencia por punto de llamada al modelo
+"""
+
+import json
+import time
+import pathlib
+import threading
+from collections import deque, Counter
+from datetime import datetime
+
+from core.text import estimate_tokens
+
+_DUMP_FILE = pathlib.Path(__file__).parent.parent / "llm_accounting.json"
+_WINDOW = 500  # registros recientes por punto de llamada
+
+
+def _percentile(values: list, q: float):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, int(round(q / 100 * len(ordered))) - 1))]
+
+
+def count_prompt_tokens(contents, config: dict | None = None) -> int:
+    """Estimación de tokens de entrada: textos del contenido + instrucción de sistema (sin imágenes)."""
+    items = contents if isinstance(contents, list) else [contents]
+    total = sum(estimate_tokens(item) for item in items if isinstance(item, str))
+    system = (config or {}).get("system_instruction")
+    if isinstance(system, str):
+        total += estimate_tokens(system)
+    return total
+
+
+def usage_tokens(response, contents, config: dict | None = None) -> tuple[int, int, bool]:
+    """
+    Tokens (entrada, salida, estimado) de una respuesta. Usa usage_metadata si el
+    backend la entrega; si no, estima por longitud de texto.
+    """
+    usage = getattr(response, "usage_metadata", None)
+    prompt = getattr(usage, "prompt_token_count", None) if usage else None
+    output = getattr(usage, "candidates_token_count", None) if usage else None
+    if prompt is not None and output is not None:
+        return int(prompt), int(output), False
+    return count_prompt_tokens(contents, config), estimate_tokens(getattr(response, "text", "") or ""), True
+
+
+class CallAccountant:
+    """
+    Guarda un registro por llamada (punto de llamada, modelo, tokens, latencia,
+    reintentos y resultado) en ventanas deslizantes, más totales acumulados.
+    """
+
+    def __init__(self, window: int = _WINDOW):
+        self.window = window
+        self._records = {}
+        self._totals = {}
+        self._lock = threading.Lock()
+
+    def record(self, call_site: str, model: str, task: str, prompt_tokens: int, response_tokens: int,
+               latency: float, attempts: int = 1, outcome: str = "ok", estimated: bool = True):
+        entry = {
+            "ts": time.time(),
+            "call_site": call_site,
+            "model": model,
+            "task": task,
+            "prompt_tokens": prompt_tokens,
+            "response_tokens": response_tokens,
+            "latency_ms": round(latency * 1000, 1),
+            "retries": max(0, attempts - 1),
+            "outcome": outcome,
+            "estimated": estimated,
+        }
+        with self._lock:
+            self._records.setdefault(call_site, deque(maxlen=self.window)).append(entry)
+            totals = self._totals.setdefault(call_site, Counter())
+            totals["calls"] += 1
+            totals["prompt_tokens"] += prompt_tokens
+            totals["response_tokens"] += response_tokens
+
+    def summary(self, call_site: str | None = None) -> dict:
+        """Agregados por punto de llamada (o de uno solo) sobre la ventana reciente."""
+        with self._lock:
+            sites = [call_site] if call_site else list(self._records)
+            snapshot = {s: (list(self._records.get(s, ())), dict(self._totals.get(s, {}))) for s in sites}
+
+        report = {}
+        for site, (records, totals) in snapshot.items():
+            if not records:
+                continue
+            prompts = [r["prompt_tokens"] for r in records]
+            outputs = [r["response_tokens"] for r in records]
+            latencies = [r["latency_ms"] for r in records]
+            report[site] = {
+                "calls": len(records),
+                "outcomes": dict(Counter(r["outcome"] for r in records)),
+                "models": dict(Counter(r["model"] for r in records)),
+                "prompt_tokens_avg": round(sum(prompts) / len(prompts), 1),
+                "prompt_tokens_p95": _percentile(prompts, 95),
+                "prompt_tokens_max": max(prompts),
+                "response_tokens_avg": round(sum(outputs) / len(outputs), 1),
+                "latency_ms_p50": _percentile(latencies, 50),
+                "latency_ms_p95": _percentile(latencies, 95),
+                "retries_avg": round(sum(r["retries"] for r in records) / len(records), 2),
+                "estimated_share": round(sum(r["estimated"] for r in records) / len(records), 2),
+                "lifetime": totals,
+            }
+        return report
+
+    def recent(self, call_site: str, n: int = 20) -> list[dict]:
+        with self._lock:
+            return list(self._records.get(call_site, ()))[-n:]
+
+    def dump(self, path: pathlib.Path | str | None = None) -> pathlib.Path:
+        """Escribe los agregados en JSON (por defecto llm_accounting.json) y retorna la ruta."""
+        path = pathlib.Path(path or _DUMP_FILE)
+        data = {"generated_at": datetime.now().isoformat(timespec="seconds"), "sites": self.summary()}
+        tmp = path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(data, indent=2, ensure_ascii=False), encoding="utf-8")
+        tmp.replace(path)
+        return path
+
+    def reset(self):
+        with self._lock:
+            self._records.clear()
+            self._totals.clear()
+
+
+_accountant = CallAccountant()
+
+def get_accountant() -> CallAccountant:
+    return _accountant
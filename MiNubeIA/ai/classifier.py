@@ -4,69 +4,174 @@ ai/classifier.py — Clasificador de intenciones usando Google Gemini
 
 import os
 import json
-from google import genai
-from dotenv import load_dotenv
+import pathlib
 
-load_dotenv()
+from ai.client import get_client
+from ai.knn_classifier import LocalIntentClassifier
+from core.cache import TTLCache
+from core.plugin_manager import plugin_manager
+from core.text import normalize_text
 
-_API_KEY = os.getenv("GEMINI_API_KEY", "")
+# Caché persistente de clasificaciones: "abre WhatsApp" repetido no vuelve a Gemini
+_CACHE_FILE = pathlib.Path(__file__).parent.parent / "intent_cache.json"
+_CACHE_TTL = float(os.getenv("NUVIA_INTENT_CACHE_TTL", 7 * 24 * 3600))
+_cache = TTLCache(max_entries=512, ttl=_CACHE_TTL, path=_CACHE_FILE)
 
-_SYSTEM_INSTRUCTIONS = """
+# Clasificador kNN aprendido de las decisiones de Gemini: frases nuevas con forma conocida
+_local = LocalIntentClassifier()
+
+_HEADER = """
 Eres el motor de clasificación de intención de Nuevi.
-Analiza el mensaje y devuelve EXCLUSIVAMENTE un JSON válido con esta estructura:
-{
-  "intent": "nombre_intencion",
-  "parameters": { "param1": "valor1", ... }
-}
-
-Intenciones y sus parámetros:
-1. open_app: { "app": "nombre" }
-2. close_app: { "app": "nombre" }
-3. send_whatsapp: { "number": "ej: 34600112233", "message": "texto" }
-4. generate_image: { "prompt": "descripción visual" }
-5. remember: { "info": "información a guardar" }
-6. recall: { "query": "búsqueda en memoria" }
-7. suggest_context: { "action": "analyze" }
-8. system_control: { "action": "shutdown/restart/cancel_shutdown" }
-9. general_chat: { "message": "texto del usuario" }
+Analiza el mensaje y devuelve la intención y sus parámetros en el JSON del esquema.
+"""
 
+_RULES = """
 Reglas:
-- No incluyas texto extra ni markdown.
 - Si no estás seguro, usa 'general_chat'.
 - Para WhatsApp, extrae el número si se menciona.
+- Omite los parámetros que no correspondan a la intención elegida.
 """
 
-_client = None
+# Catálogo generado desde los plugins, cacheado por versión del conjunto de plugins
+_catalog_cache = {}
+
+def _catalog_bundle() -> dict:
+    """Bloque de intenciones y esquema de salida para la versión actual de los plugins."""
+    if not plugin_manager.plugins:
+        plugin_manager.load_plugins()
+    version = plugin_manager.version
+    bundle = _catalog_cache.get(version)
+    if bundle is None:
+        catalog = plugin_manager.intent_catalog()
+        bundle = {
+            "catalog": catalog,
+            "prompt": _build_intents_prompt(catalog),
+            "schema": _build_schema_properties(catalog),
+        }
+        _catalog_cache.clear()
+        _catalog_cache[version] = bundle
+    return bundle
+
+def _build_intents_prompt(catalog: dict) -> str:
+    lines = ["Intenciones y sus parámetros:"]
+    for i, (intent, meta) in enumerate(catalog.items(), 1):
+        params = ", ".join(
+            f'"{name}": ' + (" | ".join(spec) if isinstance(spec, list) else f'"{spec}"')
+            for name, spec in meta["parameters"].items()
+        )
+        body = f" {params} " if params else ""
+        lines.append(f"{i}. {intent}: {{{body}}} — {meta['description']}")
+    return "\n".join(lines) + "\n"
+
+def _build_schema_properties(catalog: dict) -> dict:
+    """Propiedades 'intent' (enum) y 'parameters' (unión de parámetros de todos los plugins)."""
+    params = {}
+    for meta in catalog.values():
+        for name, spec in meta["parameters"].items():
+            current = params.get(name)
+            if current is None:
+                current = params[name] = {"type": "STRING", "nullable": True}
+                current.update({"enum": list(spec)} if isinstance(spec, list) else {"description": spec})
+            elif isinstance(spec, list) and "enum" in current:
+                current["enum"] = sorted(set(current["enum"]) | set(spec))
+            else:
+                # Mismo nombre con texto libre en otro plugin: el parámetro deja de ser enum
+                current.pop("enum", None)
+                if not isinstance(spec, list):
+                    current.setdefault("description", spec)
+    properties = {"intent": {"type": "STRING", "enum": list(catalog)}}
+    if params:
+        properties["parameters"] = {"type": "OBJECT", "properties": params}
+    return properties
+
+def intents_prompt() -> str:
+    """Lista compacta de intenciones generada desde los metadatos de los plugins."""
+    return _catalog_bundle()["prompt"]
+
+def intent_schema_properties() -> dict:
+    """Propiedades del esquema JSON (modo estructurado) para intención y parámetros."""
+    return _catalog_bundle()["schema"]
+
+def sanitize_classification(result: dict, text: str) -> dict:
+    """Ajusta la salida del modelo al catálogo: intención válida y solo sus parámetros."""
+    catalog = _catalog_bundle()["catalog"]
+    intent = result.get("intent") if isinstance(result, dict) else None
+    if intent not in catalog:
+        return {"intent": "general_chat", "parameters": {"message": text}}
+    raw_params = result.get("parameters") or {}
+    params = {name: raw_params[name] for name in catalog[intent]["parameters"]
+              if raw_params.get(name) not in (None, "")}
+    if intent == "general_chat" and not params.get("message"):
+        params["message"] = text
+    return {"intent": intent, "parameters": params}
 
-def _get_client():
-    global _client
-    if _client is None:
-        if not _API_KEY:
-            raise ValueError("GEMINI_API_KEY no detectada")
-        _client = genai.Client(api_key=_API_KEY)
-    return _client
+def _classifier_config() -> dict:
+    return {
+        'system_instruction': _HEADER + intents_prompt() + _RULES,
+        'response_mime_type': 'application/json',
+        'response_schema': {"type": "OBJECT", "properties": intent_schema_properties(), "required": ["intent"]},
+    }
+
+def _from_cache(key: str, text: str) -> dict | None:
+    """Devuelve la clasificación cacheada adaptada al texto literal de esta vez."""
+    if plugin_manager.version:
+        _cache.set_version(plugin_manager.version)
+    entry = _cache.get(key)
+    if entry is None:
+        return None
+    params = {
+        # Los parámetros que copiaban la frase completa (p. ej. general_chat) usan la actual
+        name: (text if value == entry["text"] else value)
+        for name, value in entry["result"].get("parameters", {}).items()
+    }
+    return {"intent": entry["result"].get("intent", "general_chat"), "parameters": params}
+
+def classify_local(text: str) -> dict | None:
+    """
+    Intenta clasificar sin red: primero la caché de frases normalizadas y luego
+    el clasificador kNN aprendido de decisiones anteriores. Retorna None si no hay confianza.
+    """
+    key = normalize_text(text)
+    if not key:
+        return None
+    cached = _from_cache(key, text)
+    if cached:
+        print(f"[Nuvia Classifier] Caché: '{key}' → {cached['intent']}")
+        return cached
+
+    local = _local.classify(text, allowed_intents=plugin_manager.plugins or None)
+    if local:
+        print(f"[Nuvia Classifier] kNN local: '{key}' → {local['intent']}")
+        _cache.put(key, {"text": text, "result": local})
+        return local
+    return None
+
+def learn_classification(text: str, result: dict):
+    """Registra una clasificación hecha por el modelo en la caché y en el índice kNN."""
+    key = normalize_text(text)
+    if key and isinstance(result, dict) and result.get("intent"):
+        _cache.put(key, {"text": text, "result": result})
+        _local.add(text, result["intent"], result.get("parameters", {}))
 
 def classify_intent(text: str) -> dict:
     """
     Envía el texto a Gemini para clasificar la intención.
     Retorna un diccionario con la estructura JSON definida.
+    Las frases ya vistas (normalizadas) se resuelven desde la caché sin llamar a Gemini,
+    y las parecidas a decisiones anteriores con el clasificador local kNN.
     """
+    local = classify_local(text)
+    if local:
+        return local
+
     try:
-        client = _get_client()
-        response = client.models.generate_content(
-            model="models/gemini-flash-latest",
-            contents=text,
-            config={'system_instruction': _SYSTEM_INSTRUCTIONS}
-        )
-        
-        # Limpiar posible basura o markdown si Gemini lo ignora
-        raw_text = response.text.strip()
-        if "```json" in raw_text:
-            raw_text = raw_text.split("```json")[-1].split("```")[0].strip()
-        elif raw_text.startswith("```"):
-             raw_text = raw_text.replace("```", "").strip()
-        
-        return json.loads(raw_text)
+        response = get_client().generate(text, config=_classifier_config(), task="classification",
+                                         call_site="classify_intent")
+
+        # Modo JSON con esquema: la respuesta ya es JSON válido, sin bloques markdown
+        result = sanitize_classification(json.loads(response.text), text)
+        learn_classification(text, result)
+        return result
     except Exception as e:
         print(f"[Nuvia Classifier] Error: {e}")
         # Fallback seguro con nueva estructura
@@ -0,0 +1,528 @@
+"""
+ai/client.py — Capa única de acceso a Gemini: conexión reutilizada, timeouts, reintentos y circuit breaker
+"""
+
+import os
+import time
+import random
+import logging
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from dotenv import load_dotenv
+
+from ai.scheduler import Priority, RequestScheduler, LoadShedError
+from ai.accounting import get_accountant, usage_tokens, count_prompt_tokens
+from core.text import estimate_tokens
+
+load_dotenv()
+
+logger = logging.getLogger("NuviaLLM")
+
+_API_KEY = os.getenv("GEMINI_API_KEY", "")
+DEFAULT_MODEL = os.getenv("NUVIA_GEMINI_MODEL", "models/gemini-flash-latest")
+_TIMEOUT = float(os.getenv("NUVIA_LLM_TIMEOUT", 20))
+_MAX_ATTEMPTS = int(os.getenv("NUVIA_LLM_MAX_ATTEMPTS", 3))
+_HEDGING = os.getenv("NUVIA_HEDGING", "1") != "0"
+
+# Códigos HTTP que indican un fallo transitorio (vale la pena reintentar)
+_RETRYABLE_CODES = {408, 429, 500, 502, 503, 504}
+
+
+class LLMError(Exception):
+    """Error base de la capa de acceso al modelo."""
+
+
+class LLMTimeoutError(LLMError):
+    """La llamada superó su tiempo límite."""
+
+
+class CircuitOpenError(LLMError):
+    """El circuito está abierto: la API falla de forma sostenida y no se intenta la llamada."""
+
+
+def is_transient(error: Exception) -> bool:
+    """Decide si un error es transitorio (timeout, red, 429/5xx) y por tanto reintentable."""
+    if isinstance(error, (LLMTimeoutError, TimeoutError, ConnectionError)):
+        return True
+    code = getattr(error, "code", None) or getattr(error, "status_code", None)
+    if isinstance(code, int):
+        return code in _RETRYABLE_CODES
+    name = type(error).__name__
+    return "Timeout" in name or "Connect" in name or "ServerError" in name
+
+
+# ── Backends ──────────────────────────────────────────────────────────────────
+
+class GeminiBackend:
+    """
+    Backend real. Un único genai.Client para todo el proceso: su cliente HTTP
+    interno mantiene el pool de conexiones (keep-alive) entre llamadas.
+    """
+
+    def __init__(self, api_key: str = _API_KEY, timeout: float = _TIMEOUT):
+        if not api_key:
+            raise ValueError("GEMINI_API_KEY no detectada")
+        from google import genai
+        from google.genai import types
+        self._client = genai.Client(
+            api_key=api_key,
+            http_options=types.HttpOptions(timeout=int(timeout * 1000)),
+        )
+
+    def generate(self, model: str, contents, config: dict | None, timeout: float):
+        config = dict(config or {})
+        config.setdefault("http_options", {"timeout": int(timeout * 1000)})
+        return self._client.models.generate_content(model=model, contents=contents, config=config)
+
+    def stream(self, model: str, contents, config: dict | None, timeout: float):
+        """Itera los fragmentos de texto de generate_content_stream."""
+        config = dict(config or {})
+        config.setdefault("http_options", {"timeout": int(timeout * 1000)})
+        for chunk in self._client.models.generate_content_stream(model=model, contents=contents, config=config):
+            if chunk.text:
+                yield chunk.text
+
+
+class LocalResponse:
+    """Respuesta mínima compatible con la de genai (atributo .text)."""
+
+    def __init__(self, text: str, usage_metadata=None):
+        self.text = text
+        self.usage_metadata = usage_metadata
+
+
+class LocalBackend:
+    """
+    Sustituto local para pruebas y desarrollo sin red: responde con 'handler'
+    (o un eco) y puede simular latencia y fallos transitorios.
+    """
+
+    def __init__(self, handler=None, latency: float = 0.0, failure_rate: float = 0.0):
+        self.handler = handler or self._default_handler
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.calls = 0
+
+    @staticmethod
+    def _default_handler(model, contents, config):
+        if (config or {}).get("response_mime_type") == "application/json":
+            return "{}"
+        last = contents[-1] if isinstance(contents, list) else contents
+        return f"Respuesta local: {last}"
+
+    def generate(self, model: str, contents, config: dict | None, timeout: float):
+        self.calls += 1
+        latency = self.latency() if callable(self.latency) else self.latency
+        if latency:
+            time.sleep(latency)
+        if self.failure_rate and random.random() < self.failure_rate:
+            raise ConnectionError("Fallo simulado del backend local")
+        result = self.handler(model, contents, config)
+        return result if hasattr(result, "text") else LocalResponse(str(result))
+
+    def stream(self, model: str, contents, config: dict | None, timeout: float):
+        """Emite la respuesta palabra a palabra, con la latencia simulada repartida."""
+        words = self.generate(model, contents, config, timeout).text.split(" ")
+        for i, word in enumerate(words):
+            yield word if i == len(words) - 1 else word + " "
+
+
+# ── Políticas de resiliencia ──────────────────────────────────────────────────
+
+class CircuitBreaker:
+    """
+    Tras 'failure_threshold' fallos transitorios seguidos se abre y rechaza llamadas
+    durante 'reset_timeout' segundos; después deja pasar una sola de prueba (half-open).
+    Si la prueba no informa en 'probe_timeout' segundos, se deja pasar otra.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0, probe_timeout: float = 60.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.probe_timeout = probe_timeout
+        self.state = "closed"
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_at = 0.0
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            now = time.monotonic()
+            if self.state == "open":
+                if now - self._opened_at < self.reset_timeout:
+                    return False
+                self.state = "half_open"
+                self._probe_at = now
+                return True
+            if self.state == "half_open":
+                if now - self._probe_at < self.probe_timeout:
+                    return False  # ya hay una llamada de prueba en curso
+                self._probe_at = now  # la prueba anterior nunca informó: se deja pasar otra
+                return True
+            return True
+
+    def release_probe(self):
+        """La llamada terminó sin veredicto (p. ej. stream abandonado): si era la de prueba, se permite otra ya."""
+        with self._lock:
+            if self.state == "half_open":
+                self.state = "open"
+                self._opened_at = time.monotonic() - self.reset_timeout
+
+    def record_success(self):
+        with self._lock:
+            self.state = "closed"
+            self._failures = 0
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self.state == "half_open" or self._failures >= self.failure_threshold:
+                if self.state != "open":
+                    logger.warning("Circuito abierto: la API de Gemini está fallando, se rechazan llamadas.")
+                self.state = "open"
+                self._opened_at = time.monotonic()
+
+
+class RetryBudget:
+    """
+    Presupuesto de reintentos: cada llamada aporta 'ratio' fichas y cada reintento
+    gasta una. Evita multiplicar la carga cuando la API ya está saturada.
+    """
+
+    def __init__(self, ratio: float = 0.2, min_tokens: float = 3.0, max_tokens: float = 10.0):
+        self.ratio = ratio
+        self.max_tokens = max_tokens
+        self._tokens = min_tokens
+        self._lock = threading.Lock()
+
+    def deposit(self):
+        with self._lock:
+            self._tokens = min(self.max_tokens, self._tokens + self.ratio)
+
+    def withdraw(self) -> bool:
+        with self._lock:
+            if self._tokens >= 1.0:
+                self._tokens -= 1.0
+                return True
+            return False
+
+
+# ── Cliente compartido ────────────────────────────────────────────────────────
+
+class LLMClient:
+    """
+    Punto único de salida hacia el modelo. Cada llamada tiene un tiempo límite
+    estricto, reintentos con backoff exponencial y jitter (limitados por presupuesto)
+    y pasa por el circuit breaker. El modelo se elige por tarea con el ModelRouter,
+    que además cubre las peticiones lentas con el modelo secundario (hedging).
+    Antes de salir, cada llamada pide turno al RequestScheduler según su prioridad,
+    y al terminar queda anotada en el CallAccountant bajo su 'call_site'.
+    """
+
+    def __init__(self, backend=None, timeout: float = _TIMEOUT, max_attempts: int = _MAX_ATTEMPTS,
+                 backoff_base: float = 0.5, backoff_max: float = 4.0, max_workers: int = 8,
+                 router=None, hedging: bool = _HEDGING, scheduler: RequestScheduler | None = None,
+                 accountant=None):
+        if router is None:
+            from ai.router import get_router  # import diferido: router depende de este módulo
+            router = get_router()
+        self.router = router
+        self.scheduler = scheduler or RequestScheduler()
+        self.accountant = accountant or get_accountant()
+        self.hedging = hedging
+        # Las peticiones de cobertura no pueden superar el 10% de las llamadas (cuota)
+        self.hedge_budget = RetryBudget(ratio=0.1, min_tokens=1.0, max_tokens=5.0)
+        self._backend = backend
+        self._backend_lock = threading.Lock()
+        self.timeout = timeout
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.breaker = CircuitBreaker()
+        self.retry_budget = RetryBudget()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="nuvia-llm")
+
+    @property
+    def backend(self):
+        with self._backend_lock:
+            if self._backend is None:
+                self._backend = LocalBackend() if os.getenv("NUVIA_LLM_BACKEND") == "local" else GeminiBackend()
+            return self._backend
+
+    def set_backend(self, backend):
+        with self._backend_lock:
+            self._backend = backend
+        self.breaker.record_success()
+
+    def generate(self, contents, config: dict | None = None, model: str | None = None,
+                 timeout: float | None = None, task: str = "chat",
+                 priority: Priority = Priority.INTERACTIVE, call_site: str | None = None):
+        """
+        Llama a generate_content con timeout, reintentos y circuit breaker. Retorna la respuesta.
+        Cada intento dura como mucho 'timeout' y el total (con reintentos) el doble.
+        'task' (classification, memory, chat, vision) decide el modelo si no se fuerza 'model'.
+        'priority' decide el turno en el scheduler; las de fondo pueden lanzar LoadShedError.
+        'call_site' identifica al llamante en la contabilidad (por defecto, la tarea).
+        """
+        models = [model] if model else self.router.models_for(task)
+        timeout = timeout or self.timeout
+        start = time.monotonic()
+        deadline = start + 2 * timeout
+        backend = self.backend
+        self.retry_budget.deposit()
+        self.hedge_budget.deposit()
+
+        attempts = [0]
+        try:
+            used_model, response = self._generate_with_retries(
+                backend, models, contents, config, timeout, deadline, priority, attempts)
+        except Exception as e:
+            self.accountant.record(call_site or task, models[0], task, count_prompt_tokens(contents, config), 0,
+                                   time.monotonic() - start, attempts[0], _outcome(e))
+            raise
+        prompt_tokens, response_tokens, estimated = usage_tokens(response, contents, config)
+        self.accountant.record(call_site or task, used_model, task, prompt_tokens, response_tokens,
+                               time.monotonic() - start, attempts[0], "ok", estimated)
+        return response
+
+    def _generate_with_retries(self, backend, models, contents, config, timeout, deadline, priority, attempts):
+        """Bucle de intentos de generate(); retorna (modelo que respondió, respuesta)."""
+        attempt = 0
+        while True:
+            attempt += 1
+            attempts[0] = attempt
+            self.scheduler.acquire(priority)
+            if not self.breaker.allow():
+                self.scheduler.release()
+                raise CircuitOpenError("Circuito abierto: Gemini no está disponible ahora mismo")
+            remaining = min(timeout, deadline - time.monotonic())
+            try:
+                used_model, response = self._call_hedged(backend, models, contents, config, remaining, priority)
+                self.breaker.record_success()
+                return used_model, response
+            except Exception as e:
+                if not is_transient(e):
+                    # Error del propio pedido (400, clave inválida...): el servicio está vivo
+                    self.breaker.record_success()
+                    raise
+                self.breaker.record_failure()
+                delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** (attempt - 1)))
+                if (attempt >= self.max_attempts or deadline - time.monotonic() <= delay
+                        or not self.retry_budget.withdraw()):
+                    raise
+                logger.warning(f"Fallo transitorio ({e}); reintento {attempt}/{self.max_attempts - 1} en {delay:.2f}s")
+                time.sleep(delay)
+
+    def generate_text(self, contents, config: dict | None = None, model: str | None = None,
+                      timeout: float | None = None, task: str = "chat",
+                      priority: Priority = Priority.INTERACTIVE, call_site: str | None = None) -> str:
+        """Como generate() pero retorna directamente el texto de la respuesta."""
+        response = self.generate(contents, config=config, model=model, timeout=timeout,
+                                 task=task, priority=priority, call_site=call_site)
+        return (response.text or "").strip()
+
+    def generate_stream(self, contents, config: dict | None = None, model: str | None = None,
+                        timeout: float | None = None, cancel_event: threading.Event | None = None,
+                        task: str = "chat", priority: Priority = Priority.INTERACTIVE,
+                        call_site: str | None = None):
+        """
+        Itera los fragmentos de texto de la respuesta a medida que llegan.
+        'timeout' limita la espera del primer fragmento y el silencio entre fragmentos.
+        Solo se reintenta si el fallo ocurre antes del primer fragmento.
+        Si 'cancel_event' se activa, la iteración termina en menos de 0,1 s.
+        """
+        model = model or self.router.models_for(task)[0]
+        start = time.monotonic()
+        received = []
+        outcome = "ok"
+        attempts = [0]
+        try:
+            for chunk in self._stream_with_retries(model, contents, config, timeout or self.timeout,
+                                                   cancel_event, priority, attempts):
+                received.append(chunk)
+                yield chunk
+            if cancel_event is not None and cancel_event.is_set():
+                outcome = "cancelled"
+        except GeneratorExit:
+            outcome = "cancelled"
+            raise
+        except Exception as e:
+            outcome = _outcome(e)
+            raise
+        finally:
+            self.accountant.record(call_site or task, model, task, count_prompt_tokens(contents, config),
+                                   estimate_tokens("".join(received)), time.monotonic() - start,
+                                   attempts[0], outcome)
+
+    def _stream_with_retries(self, model, contents, config, timeout, cancel_event, priority, attempts):
+        """Bucle de intentos de generate_stream(); 'attempts' recibe el número de intentos."""
+        backend = self.backend
+        self.retry_budget.deposit()
+
+        attempt = 0
+        while True:
+            attempt += 1
+            attempts[0] = attempt
+            self.scheduler.acquire(priority)
+            if not self.breaker.allow():
+                self.scheduler.release()
+                raise CircuitOpenError("Circuito abierto: Gemini no está disponible ahora mismo")
+            received = False
+            settled = False
+            try:
+                for chunk in self._pump_stream(backend, model, contents, config, timeout, cancel_event):
+                    received = True
+                    yield chunk
+                settled = True
+                self.breaker.record_success()
+                return
+            except Exception as e:
+                settled = True
+                if received or not is_transient(e):
+                    if not is_transient(e):
+                        self.breaker.record_success()
+                    raise
+                self.breaker.record_failure()
+                delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** (attempt - 1)))
+                if attempt >= self.max_attempts or not self.retry_budget.withdraw():
+                    raise
+                logger.warning(f"Fallo transitorio en streaming ({e}); reintento en {delay:.2f}s")
+                time.sleep(delay)
+            finally:
+                if not settled:
+                    # El consumidor dejó de leer (GeneratorExit) o llegó una interrupción:
+                    # con datos recibidos el servicio respondió; sin ellos no hay veredicto
+                    if received:
+                        self.breaker.record_success()
+                    else:
+                        self.breaker.release_probe()
+
+    def _pump_stream(self, backend, model, contents, config, timeout, cancel_event):
+        """
+        Consume el stream en un hilo del pool y entrega los fragmentos vía cola con timeout.
+        El hueco del scheduler (ya adquirido) se libera cuando el productor termina.
+        """
+        chunks = queue.Queue()
+        done = object()
+        stop = threading.Event()
+
+        def _producer():
+            try:
+                for chunk in backend.stream(model, contents, config, timeout):
+                    if stop.is_set():
+                        break
+                    chunks.put(chunk)
+                chunks.put(done)
+            except Exception as e:
+                chunks.put(e)
+            finally:
+                self.scheduler.release()
+
+        self._executor.submit(_producer)
+        idle_deadline = time.monotonic() + timeout
+        try:
+            while True:
+                if cancel_event is not None and cancel_event.is_set():
+                    return
+                try:
+                    item = chunks.get(timeout=0.1)
+                except queue.Empty:
+                    if time.monotonic() > idle_deadline:
+                        raise LLMTimeoutError(f"Gemini dejó de enviar datos durante {timeout:.1f}s")
+                    continue
+                idle_deadline = time.monotonic() + timeout
+                if item is done:
+                    return
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            stop.set()
+
+    def _timed_call(self, backend, model, contents, config, timeout):
+        """
+        Ejecuta la llamada y alimenta las métricas del router (latencia y errores).
+        Libera el hueco del scheduler al terminar, aunque el llamante ya no espere.
+        """
+        start = time.monotonic()
+        try:
+            response = backend.generate(model, contents, config, timeout)
+        except Exception as e:
+            self.router.record(model, time.monotonic() - start, ok=not is_transient(e))
+            raise
+        finally:
+            self.scheduler.release()
+        self.router.record(model, time.monotonic() - start, ok=True)
+        return response
+
+    def _call_hedged(self, backend, models, contents, config, timeout, priority=Priority.INTERACTIVE):
+        """
+        Lanza la petición al modelo principal; si supera su p95 sin responder (y hay
+        presupuesto y hueco libre en el scheduler), lanza la misma al secundario.
+        Gana la primera respuesta válida; retorna (modelo, respuesta).
+        El hilo del orquestador nunca espera más que 'timeout', aunque el socket quede colgado.
+        """
+        start = time.monotonic()
+        primary = self._executor.submit(self._timed_call, backend, models[0], contents, config, timeout)
+        futures = {primary}
+
+        hedge_delay = self.router.hedge_delay(models[0]) if self.hedging and len(models) > 1 else None
+        if hedge_delay is not None and hedge_delay < timeout:
+            done, _ = wait(futures, timeout=hedge_delay)
+            if not done and self._reserve_hedge(priority):
+                logger.info(f"{models[0]} supera su p95 ({hedge_delay:.2f}s): cubriendo con {models[1]}")
+                futures.add(self._executor.submit(
+                    self._timed_call, backend, models[1], contents, config, timeout - hedge_delay))
+
+        error = None
+        pending = futures
+        while pending:
+            done, pending = wait(pending, timeout=max(0.0, start + timeout - time.monotonic()),
+                                 return_when=FIRST_COMPLETED)
+            if not done:
+                break
+            for future in done:
+                if future.exception() is None:
+                    return (models[0] if future is primary else models[1]), future.result()
+                error = future.exception()
+        if error is not None and not pending:
+            raise error
+        raise LLMTimeoutError(f"Gemini no respondió en {timeout:.1f}s")
+
+    def _reserve_hedge(self, priority) -> bool:
+        """La cobertura nunca espera turno: solo sale si hay hueco inmediato y presupuesto."""
+        if not self.scheduler.try_acquire(priority):
+            return False
+        if not self.hedge_budget.withdraw():
+            self.scheduler.release()
+            return False
+        return True
+
+
+def _outcome(error: Exception) -> str:
+    if isinstance(error, LoadShedError):
+        return "shed"
+    if isinstance(error, CircuitOpenError):
+        return "circuit_open"
+    if isinstance(error, (LLMTimeoutError, TimeoutError)):
+        return "timeout"
+    return "error"
+
+
+_client = None
+_client_lock = threading.Lock()
+
+def get_client() -> LLMClient:
+    """Instancia compartida por classifier, gemini, memory y el resto de módulos de IA."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = LLMClient()
+        return _client
+
+def set_backend(backend):
+    """Sustituye el backend (p. ej. LocalBackend en pruebas)."""
+    get_client().set_backend(backend)
@@ -0,0 +1,276 @@
+"""
+ai/episodic.py — Memoria episódica: registro de turnos por días con índice vectorial local
+"""
+
+import os
+import re
+import gzip
+import json
+import time
+import pathlib
+import logging
+import threading
+from datetime import datetime, timedelta
+
+from core.text import normalize_text
+from core.vectors import embed, SparseIndex
+
+logger = logging.getLogger("NuviaMemory")
+
+_EPISODES_DIR = pathlib.Path(__file__).parent.parent / "episodes"
+_MIN_SCORE = float(os.getenv("NUVIA_EPISODIC_MIN_SCORE", 0.08))
+# Búsqueda aproximada: dimensiones de la consulta usadas y n-gramas demasiado comunes ignorados
+_QUERY_DIMS = 48
+_MAX_DF = 0.2
+
+_DAY_FILE = re.compile(r"^(\d{4}-\d{2}-\d{2})\.jsonl$")
+_MONTH_FILE = re.compile(r"^(\d{4}-\d{2})\.seg\.gz$")
+
+
+def _vector_text(record: dict) -> str:
+    return f"{record['u']} {record.get('a', '')}"
+
+
+class _Segment:
+    """Turnos de un día (abierto) o de un mes (compactado) con su índice invertido."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.records = []
+        self.index = SparseIndex()
+        self.t_min = float("inf")
+        self.t_max = 0.0
+
+    def add(self, record: dict, vector: dict):
+        self.index.add(len(self.records), vector)
+        self.records.append(record)
+        self.t_min = min(self.t_min, record["t"])
+        self.t_max = max(self.t_max, record["t"])
+
+    def overlaps(self, since: float | None, until: float | None) -> bool:
+        return (since is None or self.t_max >= since) and (until is None or self.t_min <= until)
+
+
+class EpisodicLog:
+    """
+    Registro de solo-anexado de la conversación:
+    - Cada día se escribe en episodes/AAAA-MM-DD.jsonl (una línea por turno).
+    - En segundo plano, los días cerrados se compactan en episodes/AAAA-MM.seg.gz
+      junto con sus vectores ya calculados, así la carga no vuelve a vectorizar.
+    - Cada segmento tiene su índice invertido y la búsqueda solo visita los
+      segmentos del periodo pedido, con poda de la consulta (vecinos aproximados).
+    """
+
+    def __init__(self, root: pathlib.Path | str = _EPISODES_DIR):
+        self.root = pathlib.Path(root)
+        self._segments = {}
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._compact_lock = threading.Lock()
+        self._loaded = False
+        self._current_day = None
+
+    # ── Carga ─────────────────────────────────────────────────────────────────
+
+    def _ensure_loaded(self):
+        with self._lock:
+            if self._loaded:
+                return
+            self._loaded = True
+            if not self.root.exists():
+                return
+            start = time.monotonic()
+            for path in sorted(self.root.iterdir()):
+                if _MONTH_FILE.match(path.name):
+                    self._segments[path.name[:7]] = self._read_month(path)
+                elif _DAY_FILE.match(path.name):
+                    self._segments[path.name[:10]] = self._read_day(path)
+            total = sum(len(s.records) for s in self._segments.values())
+            logger.info(f"Memoria episódica cargada: {total} turnos en {len(self._segments)} segmentos "
+                        f"({(time.monotonic() - start) * 1000:.0f} ms)")
+        self._compact_in_background()
+
+    @staticmethod
+    def _read_day(path: pathlib.Path) -> _Segment:
+        segment = _Segment(path.name[:10])
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue  # línea a medio escribir (corte de luz): se ignora
+                segment.add(record, embed(_vector_text(record)))
+        return segment
+
+    @staticmethod
+    def _read_month(path: pathlib.Path) -> _Segment:
+        segment = _Segment(path.name[:7])
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            for line in f:
+                record = json.loads(line)
+                vector = {int(d): w for d, w in record.pop("v", [])}
+                segment.add(record, vector)
+        return segment
+
+    # ── Escritura ─────────────────────────────────────────────────────────────
+
+    def append(self, user_text: str, answer: str = "", timestamp: float | None = None):
+        """Añade un turno al día en curso y lo indexa al momento."""
+        if not user_text:
+            return
+        self._ensure_loaded()
+        record = {"t": timestamp or time.time(), "u": user_text, "a": answer or ""}
+        day = datetime.fromtimestamp(record["t"]).strftime("%Y-%m-%d")
+        vector = embed(_vector_text(record))
+
+        with self._write_lock:
+            self.root.mkdir(parents=True, exist_ok=True)
+            with open(self.root / f"{day}.jsonl", "a", encoding="utf-8") as f:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        with self._lock:
+            segment = self._segments.get(day)
+            if segment is None:
+                segment = self._segments[day] = _Segment(day)
+            segment.add(record, vector)
+            rolled_over = self._current_day is not None and self._current_day != day
+            self._current_day = day
+        if rolled_over:
+            self._compact_in_background()
+
+    # ── Compactación ──────────────────────────────────────────────────────────
+
+    def _compact_in_background(self):
+        threading.Thread(target=self.compact, daemon=True).start()
+
+    def compact(self) -> int:
+        """Mueve los días cerrados a su segmento mensual comprimido. Retorna los días compactados."""
+        today = datetime.now().strftime("%Y-%m-%d")
+        with self._compact_lock:
+            with self._lock:
+                days = sorted(n for n in self._segments if len(n) == 10 and n < today)
+            months = {}
+            for day in days:
+                months.setdefault(day[:7], []).append(day)
+            for month, month_days in months.items():
+                self._compact_month(month, month_days)
+            if days:
+                logger.info(f"Memoria episódica: {len(days)} días compactados")
+            return len(days)
+
+    def _compact_month(self, month: str, days: list[str]):
+        """Fusiona los días indicados con su segmento mensual y reescribe el .seg.gz una sola vez."""
+        with self._lock:
+            sources = [self._segments.get(month)] + [self._segments.get(day) for day in days]
+        merged = _Segment(month)
+        for segment in filter(None, sources):
+            for i, record in enumerate(segment.records):
+                merged.add(record, segment.index.vector(i))
+
+        path = self.root / f"{month}.seg.gz"
+        tmp = path.with_suffix(".tmp")
+        with gzip.open(tmp, "wt", encoding="utf-8") as f:
+            for i, record in enumerate(merged.records):
+                vector = [[d, round(w, 4)] for d, w in merged.index.vector(i).items()]
+                f.write(json.dumps({**record, "v": vector}, ensure_ascii=False) + "\n")
+        tmp.replace(path)
+
+        with self._lock:
+            self._segments[month] = merged
+            for day in days:
+                self._segments.pop(day, None)
+        for day in days:
+            (self.root / f"{day}.jsonl").unlink(missing_ok=True)
+
+    # ── Búsqueda ──────────────────────────────────────────────────────────────
+
+    def search(self, query: str, k: int = 5, since: float | None = None, until: float | None = None,
+               min_score: float = _MIN_SCORE) -> list[dict]:
+        """Turnos [{t, u, a, score}] más parecidos a 'query' dentro del periodo (más recientes si empatan)."""
+        self._ensure_loaded()
+        vector = embed(query)
+        if not vector:
+            return []
+        with self._lock:
+            segments = [s for s in self._segments.values() if s.overlaps(since, until)]
+            hits = []
+            for segment in segments:
+                for rid, score in segment.index.search(vector, k=k * 3, min_score=min_score,
+                                                      max_query_dims=_QUERY_DIMS, max_df=_MAX_DF):
+                    record = segment.records[rid]
+                    if (since is None or record["t"] >= since) and (until is None or record["t"] <= until):
+                        hits.append({**record, "score": round(score, 3)})
+        hits.sort(key=lambda h: (h["score"], h["t"]), reverse=True)
+        return hits[:k]
+
+    def __len__(self):
+        self._ensure_loaded()
+        with self._lock:
+            return sum(len(s.records) for s in self._segments.values())
+
+
+def parse_period(text: str, now: datetime | None = None) -> tuple[float | None, float | None]:
+    """
+    Traduce expresiones como "ayer", "la semana pasada" o "hace 3 días" a (desde, hasta)
+    en timestamps. (None, None) si no hay periodo.
+    """
+    now = now or datetime.now()
+    normalized = normalize_text(text or "", strip_fillers=False)
+    today = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    week_start = today - timedelta(days=today.weekday())
+    month_start = today.replace(day=1)
+
+    if "semana pasada" in normalized:
+        return (week_start - timedelta(days=7)).timestamp(), week_start.timestamp()
+    if "esta semana" in normalized:
+        return week_start.timestamp(), None
+    if "mes pasado" in normalized:
+        previous = (month_start - timedelta(days=1)).replace(day=1)
+        return previous.timestamp(), month_start.timestamp()
+    if "este mes" in normalized:
+        return month_start.timestamp(), None
+    if "anteayer" in normalized or "antes de ayer" in normalized:
+        return (today - timedelta(days=2)).timestamp(), (today - timedelta(days=1)).timestamp()
+    if "ayer" in normalized:
+        return (today - timedelta(days=1)).timestamp(), today.timestamp()
+    if "hoy" in normalized:
+        return today.timestamp(), None
+    match = re.search(r"hace (\d+|un|una|dos|tres) (dia|dias|semana|semanas|mes|meses)", normalized)
+    if match:
+        amount = {"un": 1, "una": 1, "dos": 2, "tres": 3}.get(match.group(1)) or int(match.group(1))
+        unit = match.group(2)
+        days = amount * (30 if unit.startswith("mes") else 7 if unit.startswith("semana") else 1)
+        return (today - timedelta(days=days)).timestamp(), None
+    return None, None
+
+
+_log = None
+_log_lock = threading.Lock()
+
+def get_episodic_log() -> EpisodicLog:
+    global _log
+    with _log_lock:
+        if _log is None:
+            _log = EpisodicLog()
+        return _log
+
+
+if __name__ == "__main__":
+    # Prueba rápida: tres meses de turnos sintéticos y búsqueda por tema
+    import random
+    import tempfile
+
+    temas = ["el proyecto Nuvia en Python", "la receta de lasaña", "el viaje a Córdoba", "la reunión con el cliente",
+             "mi rutina de gimnasio", "el libro de ciencia ficción", "la factura de la luz", "el cumpleaños de mamá"]
+    log = EpisodicLog(tempfile.mkdtemp())
+    start = time.time() - 90 * 86400
+    for i in range(9000):
+        tema = random.choice(temas)
+        log.append(f"Te cuento algo sobre {tema}, número {i}", f"Perfecto, anotado lo de {tema}.",
+                   timestamp=start + i * 864)
+    log.compact()
+
+    for consulta in ["viaje a Córdoba", "receta lasaña"]:
+        t0 = time.perf_counter()
+        hits = log.search(consulta, k=3)
+        ms = (time.perf_counter() - t0) * 1000
+        print(f"{consulta!r}: {ms:.1f} ms → {[h['u'][:45] for h in hits]}")
@@ -3,74 +3,221 @@ ai/gemini.py — Integración con Google Gemini + generación de imágenes (poll
 """
 
 import os
+import re
+import hashlib
+import threading
 import pathlib
 import requests
 import urllib.parse
-from datetime import datetime
 
-from google import genai
-from dotenv import load_dotenv
-
-load_dotenv()
+from ai.client import get_client
+from ai.router import get_router
+from ai.scheduler import Priority
+from core.artifacts import get_artifacts
+from core.cache import TTLCache, SingleFlight
+from core.text import normalize_text
 
 # ── Configuración Gemini ──────────────────────────────────────────────────────
-_API_KEY = os.getenv("GEMINI_API_KEY", "")
-
 _SYSTEM_PROMPT = (
     "Eres Nuevi, la asistente IA personal de Ramiro. "
     "Responde de forma concisa, amigable y siempre en español. "
     "Máximo 3 oraciones si no te piden más detalle."
 )
 
-_client = None
+_ERROR_ANSWER = "Lo siento Ramiro, hubo un problema al procesar esa información visual."
+
+def _load_image(image_path: str = None) -> bytes | None:
+    if image_path and os.path.exists(image_path):
+        with open(image_path, "rb") as f:
+            return f.read()
+    return None
 
-def _get_client():
-    global _client
-    if _client is None:
-        if not _API_KEY:
-            raise ValueError("GEMINI_API_KEY no está configurada en el archivo .env")
-        # El nuevo cliente de Google GenAI
-        _client = genai.Client(api_key=_API_KEY)
-    return _client
+def _build_contents(prompt: str, image_data: bytes = None, mime_type: str = "image/png") -> list:
+    contents = [prompt]
 
+    if image_data:
+        # El SDK espera un objeto Part o bytes estructurados para imagenes
+        from google.genai import types
+        contents.append(types.Part.from_bytes(data=image_data, mime_type=mime_type))
+    return contents
 
-def ask(prompt: str, image_path: str = None) -> str:
+
+# ── Caché de respuestas ───────────────────────────────────────────────────────
+# Preguntas frecuentes ("¿qué es X?") no pagan otra ida y vuelta; las que dependen
+# del momento (hora, hoy, noticias, clima...) nunca se cachean.
+_TIME_SENSITIVE = re.compile(
+    r"\b(hoy|ahora|hora|horas|manana|ayer|actual|actualmente|ultim[oa]s?|reciente|recientes"
+    r"|noticias|clima|temperatura|llueve|precio|precios|cotizacion|esta semana|este mes|este ano)\b"
+)
+_response_cache = TTLCache(max_entries=256, ttl=float(os.getenv("NUVIA_ASK_CACHE_TTL", 6 * 3600)))
+_inflight = SingleFlight()
+_uncacheable = 0
+_stats_lock = threading.Lock()
+
+def _is_cacheable(normalized_prompt: str) -> bool:
+    return bool(normalized_prompt) and not _TIME_SENSITIVE.search(normalized_prompt)
+
+def _task(image_data: bytes = None) -> str:
+    return "vision" if image_data else "chat"
+
+def _cache_key(normalized_prompt: str, image_data: bytes = None) -> str:
+    image_hash = hashlib.sha1(image_data).hexdigest() if image_data else "-"
+    models = ",".join(get_router().routes.get(_task(image_data), []))
+    raw = "\x1f".join([models, _SYSTEM_PROMPT, normalized_prompt, image_hash])
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+def _with_history(prompt: str, history: str) -> str:
+    """Antepone el historial de la sesión (resumen + últimos turnos) a la pregunta."""
+    return f"{history}\n\nUsuario: {prompt}" if history else prompt
+
+def response_cache_stats() -> dict:
+    """Métricas de la caché de ask(): aciertos, fallos, peticiones fusionadas y no cacheables."""
+    stats = _response_cache.stats()
+    stats["merged"] = _inflight.shared
+    stats["uncacheable"] = _uncacheable
+    return stats
+
+def ask(prompt: str, image_path: str = None, history: str = "", call_site: str = "ask",
+        image_data: bytes = None, mime_type: str = "image/png", priority: Priority = Priority.INTERACTIVE,
+        raise_errors: bool = False) -> str:
     """
     Envía una pregunta a Gemini (opcionalmente con una imagen) y retorna la respuesta.
+    La imagen puede llegar como ruta ('image_path') o ya codificada en memoria
+    ('image_data' + 'mime_type', ver context/capture.py), sin pasar por disco.
+    'priority' se usa para llamadas de fondo (p. ej. el prefetch de contexto).
+    Las respuestas cacheables se reutilizan y las peticiones idénticas simultáneas
+    se fusionan en una sola llamada. Con 'history' (ver ai/session.py) la respuesta
+    depende de la conversación y no se cachea. 'call_site' etiqueta la llamada
+    en la contabilidad de tokens (ai/accounting.py).
+    Con 'raise_errors' los fallos (incluidos LoadShedError y CircuitOpenError)
+    se propagan en lugar de convertirse en el mensaje de error para el usuario.
     """
+    global _uncacheable
     try:
-        client = _get_client()
-        contents = [prompt]
-        
-        if image_path and os.path.exists(image_path):
-            with open(image_path, "rb") as f:
-                image_data = f.read()
-                # El SDK espera un objeto Part o bytes estructurados para imagenes
-                from google.genai import types
-                contents.append(types.Part.from_bytes(data=image_data, mime_type="image/png"))
-
-        response = client.models.generate_content(
-            model="models/gemini-flash-latest",
-            contents=contents,
-            config={'system_instruction': _SYSTEM_PROMPT}
-        )
-        return response.text.strip()
+        if image_data is None:
+            image_data = _load_image(image_path)
+        normalized = normalize_text(prompt, strip_fillers=False)
+        if history or not _is_cacheable(normalized):
+            with _stats_lock:
+                _uncacheable += 1
+            return _generate(_with_history(prompt, history), image_data, call_site, mime_type, priority)
+
+        key = _cache_key(normalized, image_data)
+        cached = _response_cache.get(key)
+        if cached is not None:
+            print("[Nuvia Gemini] Respuesta desde caché.")
+            return cached
+
+        def _fetch():
+            answer = _generate(prompt, image_data, call_site, mime_type, priority)
+            if answer:
+                _response_cache.put(key, answer)
+            return answer
+
+        return _inflight.do(key, _fetch)
     except Exception as e:
+        if raise_errors:
+            raise
         print(f"[Nuvia Gemini ERROR]: {e}")
-        return "Lo siento Ramiro, hubo un problema al procesar esa información visual."
+        return _ERROR_ANSWER
 
+def _generate(prompt: str, image_data: bytes = None, call_site: str = "ask", mime_type: str = "image/png",
+              priority: Priority = Priority.INTERACTIVE) -> str:
+    contents = _build_contents(prompt, image_data, mime_type)
+    return get_client().generate_text(
+        contents, config={'system_instruction': _SYSTEM_PROMPT}, task=_task(image_data),
+        priority=priority, call_site=call_site
+    )
 
 
-# ── Generación de imágenes (pollinations.ai — gratuito, sin key) ──────────────
-_IMAGES_DIR = pathlib.Path(__file__).parent.parent / "assets" / "generated"
+# ── Streaming por oraciones ───────────────────────────────────────────────────
+# Fin de oración: . ! ? … o salto de línea seguidos de espacio (evita cortar "3.5")
+_SENTENCE_END = re.compile(r"[.!?…]+[\"')\]]*\s+|\n+")
+_MIN_SENTENCE_CHARS = 25
 
+class SentenceAssembler:
+    """
+    Acumula fragmentos del stream y entrega oraciones completas.
+    Las oraciones muy cortas ("Sí.") se juntan con la siguiente para no trocear el habla.
+    """
+
+    def __init__(self, min_chars: int = _MIN_SENTENCE_CHARS):
+        self.min_chars = min_chars
+        self._buffer = ""
+
+    def feed(self, chunk: str) -> list[str]:
+        self._buffer += chunk
+        sentences = []
+        start = 0
+        for match in _SENTENCE_END.finditer(self._buffer):
+            if match.end() - start >= self.min_chars:
+                sentences.append(self._buffer[start:match.end()].strip())
+                start = match.end()
+        self._buffer = self._buffer[start:]
+        return [s for s in sentences if s]
+
+    def flush(self) -> str:
+        rest, self._buffer = self._buffer.strip(), ""
+        return rest
+
+def ask_stream(prompt: str, on_sentence, cancel_event=None, image_path: str = None, history: str = "",
+               call_site: str = "ask_stream", image_data: bytes = None, mime_type: str = "image/png") -> str:
+    """
+    Como ask(), pero entrega cada oración a 'on_sentence' en cuanto está completa
+    (p. ej. speak), así el habla empieza con el primer fragmento del modelo.
+    Retorna el texto completo; se detiene si 'cancel_event' se activa.
+    """
+    assembler = SentenceAssembler()
+    spoken = []
+    key = None
+    try:
+        if image_data is None:
+            image_data = _load_image(image_path)
+        normalized = normalize_text(prompt, strip_fillers=False)
+        key = _cache_key(normalized, image_data) if _is_cacheable(normalized) and not history else None
+        cached = _response_cache.get(key) if key else None
+        if cached is not None:
+            # Respuesta ya conocida: se habla entera sin esperar a la red
+            sentences = assembler.feed(cached + " ") + [assembler.flush()]
+            for sentence in filter(None, sentences):
+                on_sentence(sentence)
+            return cached
+
+        contents = _build_contents(_with_history(prompt, history), image_data, mime_type)
+        stream = get_client().generate_stream(
+            contents, config={'system_instruction': _SYSTEM_PROMPT},
+            cancel_event=cancel_event, task=_task(image_data), call_site=call_site
+        )
+        for chunk in stream:
+            for sentence in assembler.feed(chunk):
+                spoken.append(sentence)
+                on_sentence(sentence)
+    except Exception as e:
+        print(f"[Nuvia Gemini STREAM ERROR]: {e}")
+        if not spoken:
+            on_sentence(_ERROR_ANSWER)
+            return _ERROR_ANSWER
+        key = None  # respuesta incompleta: no se cachea
+
+    cancelled = cancel_event is not None and cancel_event.is_set()
+    rest = assembler.flush()
+    if rest and not cancelled:
+        spoken.append(rest)
+        on_sentence(rest)
+    answer = " ".join(spoken)
+    if key and answer and not cancelled:
+        _response_cache.put(key, answer)
+    return answer
+
+
+
+# ── Generación de imágenes (pollinations.ai — gratuito, sin key) ──────────────
 def generate_image(prompt: str) -> pathlib.Path | None:
     """
     Genera una imagen usando pollinations.ai.
-    Retorna el path local del archivo guardado, o None si falla.
+    Retorna el path local del archivo guardado (almacén de artefactos, categoría
+    "generated"; una imagen idéntica reutiliza el mismo archivo), o None si falla.
     """
-    _IMAGES_DIR.mkdir(parents=True, exist_ok=True)
-
     encoded = urllib.parse.quote(prompt)
     url = f"https://image.pollinations.ai/prompt/{encoded}?width=512&height=512&nologo=true"
 
@@ -79,9 +226,7 @@ def generate_image(prompt: str) -> pathlib.Path | None:
         response = requests.get(url, timeout=60)
         response.raise_for_status()
 
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = _IMAGES_DIR / f"nuvia_{timestamp}.jpg"
-        filename.write_bytes(response.content)
+        filename = get_artifacts().put("generated", response.content, "jpg", meta={"prompt": prompt})
         print(f"[Nuvia IMG] Imagen guardada en {filename}")
         return filename
 
@@ -0,0 +1,200 @@
+"""
+ai/knn_classifier.py — Clasificador local por vecinos cercanos entrenado con las decisiones de Gemini
+"""
+
+import os
+import re
+import json
+import time
+import logging
+import pathlib
+import threading
+
+from core.text import normalize_text
+from core.vectors import embed, SparseIndex
+
+logger = logging.getLogger("NuviaClassifier")
+
+_EXAMPLES_FILE = pathlib.Path(__file__).parent.parent / "intent_examples.jsonl"
+
+# Intenciones que nunca se resuelven localmente por su impacto (apagar el equipo, etc.)
+_NEVER_LOCAL = {"system_control"}
+
+# Artículos que no forman parte del valor de un hueco ("abre el bloc de notas" → "bloc de notas")
+_ARTICLES = re.compile(r"^(?:el|la|los|las|un|una|mi|mis) ")
+
+
+def _template(tokens: list[str], params: dict) -> list[str] | None:
+    """
+    Sustituye en la frase los valores de parámetros que aparecen literalmente por
+    huecos "{nombre}". Los identificadores cortos que no aparecen (p. ej. action="minimize")
+    quedan como constantes; si un texto libre no aparece, el ejemplo no es reutilizable (None).
+    """
+    template = list(tokens)
+    for name, value in params.items():
+        if not isinstance(value, str) or not value or not name.isidentifier():
+            continue
+        value_tokens = normalize_text(value, strip_fillers=False).split()
+        n = len(value_tokens)
+        for i in range(len(template) - n + 1):
+            if n and template[i:i + n] == value_tokens:
+                template[i:i + n] = ["{" + name + "}"]
+                break
+        else:
+            if " " in value.strip() or len(value) > 24:
+                return None
+    return template
+
+
+def _fill(template: list[str], tokens: list[str]) -> dict | None:
+    """Encaja la frase nueva en la plantilla y extrae el valor de cada hueco."""
+    pattern = []
+    for token in template:
+        if token.startswith("{") and token.endswith("}"):
+            pattern.append(f"(?P<{token[1:-1]}>.+?)")
+        else:
+            pattern.append(re.escape(token))
+    match = re.fullmatch(" ".join(pattern), " ".join(tokens))
+    return match.groupdict() if match else None
+
+
+def _original_span(text: str, normalized_value: str) -> str:
+    """Recupera el fragmento original (con mayúsculas y tildes) que corresponde a un valor normalizado."""
+    words = text.split()
+    for i in range(len(words)):
+        for j in range(i + 1, len(words) + 1):
+            candidate = " ".join(words[i:j])
+            if normalize_text(candidate, strip_fillers=False) == normalized_value:
+                return candidate.strip("¿?¡!.,;:\"'")
+    return normalized_value
+
+
+class LocalIntentClassifier:
+    """
+    Registra pares (frase, intención, parámetros) decididos por Gemini en un log
+    append-only y mantiene un índice vectorial incremental sobre ellos.
+    Una frase nueva se resuelve localmente si sus vecinos coinciden por encima del umbral.
+    """
+
+    def __init__(self, path: pathlib.Path = _EXAMPLES_FILE, k: int = 5,
+                 min_similarity: float | None = None, min_agreement: float | None = None,
+                 min_template_support: int = 2):
+        self.path = pathlib.Path(path)
+        self.k = k
+        self.min_template_support = min_template_support
+        self.min_similarity = min_similarity if min_similarity is not None else float(os.getenv("NUVIA_KNN_MIN_SIM", 0.8))
+        self.min_agreement = min_agreement if min_agreement is not None else float(os.getenv("NUVIA_KNN_AGREEMENT", 0.75))
+        self._examples = {}  # frase normalizada -> ejemplo
+        self._index = SparseIndex()
+        self._templates = {}  # plantilla -> {frase normalizada}
+        self._by_anchor = {}  # primera palabra fija -> {plantilla}
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self):
+        if not self.path.exists():
+            return
+        try:
+            with self.path.open(encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        self._index_example(json.loads(line))
+            logger.info(f"Índice local de intenciones cargado: {len(self._examples)} ejemplos.")
+        except Exception as e:
+            logger.error(f"Error cargando ejemplos de intenciones: {e}")
+
+    def _index_example(self, example: dict):
+        key = normalize_text(example["text"])
+        if not key:
+            return
+        tokens = key.split()
+        previous = self._examples.get(key)
+        if previous and previous["template"] is not None:
+            self._templates.get(tuple(previous["template"]), set()).discard(key)
+        template = _template(tokens, example.get("parameters", {}))
+        example["template"] = template
+        self._examples[key] = example
+        self._index.add(key, embed(example["text"]))
+        if template is not None:
+            fixed = [t for t in template if not t.startswith("{")]
+            if fixed and len(fixed) < len(template):
+                self._templates.setdefault(tuple(template), set()).add(key)
+                self._by_anchor.setdefault(fixed[0], set()).add(tuple(template))
+
+    def add(self, text: str, intent: str, parameters: dict):
+        """Registra una decisión del modelo (se persiste en el log y se indexa al momento)."""
+        if not text or not intent:
+            return
+        example = {"text": text, "intent": intent, "parameters": parameters or {}, "ts": time.time()}
+        with self._lock:
+            try:
+                with self.path.open("a", encoding="utf-8") as f:
+                    f.write(json.dumps(example, ensure_ascii=False) + "\n")
+            except Exception as e:
+                logger.error(f"No se pudo registrar el ejemplo de intención: {e}")
+            self._index_example(example)
+
+    def classify(self, text: str, allowed_intents=None) -> dict | None:
+        """
+        Retorna {"intent", "parameters"} si los vecinos coinciden con suficiente
+        confianza y sus parámetros se pueden extraer de la frase; si no, None.
+        """
+        key = normalize_text(text)
+        if not key:
+            return None
+        tokens = key.split()
+        with self._lock:
+            neighbours = self._index.search(embed(text), k=self.k, min_score=self.min_similarity)
+            strong = [(self._examples[i], score) for i, score in neighbours]
+            templates = set().union(*(self._by_anchor.get(t, set()) for t in set(tokens)))
+            groups = {
+                template: [self._examples[k] for k in self._templates.get(template, ())]
+                for template in templates if _fill(list(template), tokens) is not None
+            }
+        if allowed_intents:
+            strong = [(e, s) for e, s in strong if e["intent"] in allowed_intents]
+
+        if strong:
+            votes = {}
+            for example, score in strong:
+                votes[example["intent"]] = votes.get(example["intent"], 0.0) + score
+            intent, weight = max(votes.items(), key=lambda x: x[1])
+            if weight / sum(votes.values()) < self.min_agreement:
+                return None
+            return self._resolve(intent, [e for e, _ in strong if e["intent"] == intent], tokens, text)
+
+        # Sin vecinos casi idénticos: aceptamos una plantilla ("abre {app}") confirmada
+        # por varios ejemplos distintos y que ninguna otra intención comparta.
+        group = [e for examples in groups.values() for e in examples
+                 if not allowed_intents or e["intent"] in allowed_intents]
+        intents = {e["intent"] for e in group}
+        if len(intents) != 1 or len(group) < self.min_template_support:
+            return None
+        return self._resolve(intents.pop(), group, tokens, text)
+
+    def _resolve(self, intent: str, candidates: list[dict], tokens: list[str], text: str) -> dict | None:
+        """Extrae los parámetros con la plantilla del primer vecino que encaje."""
+        if intent in _NEVER_LOCAL:
+            return None
+        for example in candidates:
+            if example["template"] is None:
+                continue
+            slots = _fill(example["template"], tokens)
+            if slots is None:
+                continue
+            constants = {n: v for n, v in example["parameters"].items() if n not in slots}
+            # Los vecinos de la misma intención deben coincidir en los parámetros constantes
+            for other in candidates:
+                if any(other["parameters"].get(n, v) != v for n, v in constants.items()):
+                    return None
+            params = dict(constants)
+            for name, value in slots.items():
+                if example["template"] == ["{" + name + "}"]:
+                    params[name] = text  # el parámetro es la frase completa (general_chat)
+                else:
+                    params[name] = _original_span(text, _ARTICLES.sub("", value))
+            return {"intent": intent, "parameters": params}
+        return None
+
+    def __len__(self):
+        return len(self._examples)
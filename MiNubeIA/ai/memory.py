@@ -4,14 +4,15 @@ ai/memory.py — Sistema de memoria persistente para Nuvia
 
 import os
 import json
-import pathlib
-from google import genai
-from dotenv import load_dotenv
+import threading
 
-load_dotenv()
+from ai.client import get_client
+from ai.scheduler import Priority, LoadShedError
+from ai.memory_store import get_store
+from ai.memory_index import MemoryRetriever, format_facts
 
-_API_KEY = os.getenv("GEMINI_API_KEY", "")
-_MEMORY_FILE = pathlib.Path(__file__).parent.parent / "memory.json"
+# Hechos de memoria que se envían al modelo como mucho por consulta
+_TOP_K = int(os.getenv("NUVIA_MEMORY_TOP_K", 5))
 
 _STORE_PROMPT = """
 Eres el módulo de memoria persistente del asistente Nuvia.
@@ -36,7 +37,7 @@ Formato de salida obligatorio:
 
 _RETRIEVE_PROMPT = """
 Eres el módulo de recuperación de memoria de Nuvia.
-Tienes acceso a la siguiente memoria almacenada en formato JSON:
+Estos son los datos de la memoria del usuario relacionados con la pregunta:
 {memory_context}
 
 El usuario pregunta: "{user_question}"
@@ -44,73 +45,81 @@ Responde de forma natural y breve basándote en la memoria.
 Si no existe información relevante, responde exactamente: "NO_DATA".
 """
 
-_client = None
-
-def _get_client():
-    global _client
-    if _client is None:
-        if not _API_KEY:
-            raise ValueError("GEMINI_API_KEY no detectada")
-        _client = genai.Client(api_key=_API_KEY)
-    return _client
-
 def load_memory() -> dict:
-    if not _MEMORY_FILE.exists():
-        return {}
+    """Toda la memoria como {tipo: {clave: valor}} (sale de la caché del almacén SQLite)."""
     try:
-        return json.loads(_MEMORY_FILE.read_text(encoding="utf-8"))
-    except:
+        return get_store().all()
+    except Exception as e:
+        print(f"[Nuvia Memory] Error leyendo memoria: {e}")
         return {}
 
 def save_memory(memory_data: dict):
-    _MEMORY_FILE.write_text(json.dumps(memory_data, indent=2, ensure_ascii=False), encoding="utf-8")
+    """Sustituye toda la memoria en una transacción. Para un solo hecho usar store_memory_item."""
+    get_store().replace_all(memory_data)
 
 def process_memory_storage(text: str):
     """Analiza si el texto contiene algo que recordar y lo guarda."""
     try:
-        client = _get_client()
-        response = client.models.generate_content(
-            model="models/gemini-flash-latest",
-            contents=f"{_STORE_PROMPT}\n\nEntrada: '{text}'"
-        )
-        
-        raw_text = response.text.strip()
+        # Trabajo de fondo: nunca debe quitarle cuota a una petición del usuario
+        raw_text = get_client().generate_text(f"{_STORE_PROMPT}\n\nEntrada: '{text}'", task="memory",
+                                              priority=Priority.BACKGROUND, call_site="process_memory_storage")
         if "```json" in raw_text:
             raw_text = raw_text.split("```json")[-1].split("```")[0].strip()
             
         data = json.loads(raw_text)
-        
-        if data.get("store"):
-            memory = load_memory()
-            m_type = data.get("type", "general")
-            if m_type not in memory:
-                memory[m_type] = {}
-            
-            memory[m_type][data["key"]] = data["value"]
-            save_memory(memory)
-            print(f"[Nuvia Memory] Guardado: {data['key']} = {data['value']}")
+        store_memory_item(data)
             
+    except LoadShedError as e:
+        print(f"[Nuvia Memory] Extracción omitida por carga: {e}")
     except Exception as e:
         print(f"[Nuvia Memory Storage Error] {e}")
 
+def store_memory_item(data: dict) -> bool:
+    """Guarda un elemento {store, type, key, value} ya extraído. Retorna True si se guardó."""
+    if not data or not data.get("store") or not data.get("key"):
+        return False
+    # Upsert transaccional de una fila: sin leer ni reescribir el resto de la memoria
+    value = data.get("value", "")
+    get_store().upsert(data.get("type", "general"), data["key"], value)
+    print(f"[Nuvia Memory] Guardado: {data['key']} = {value}")
+    return True
+
+_retriever = None
+_retriever_lock = threading.Lock()
+
+def _get_retriever() -> MemoryRetriever:
+    global _retriever
+    with _retriever_lock:
+        if _retriever is None:
+            _retriever = MemoryRetriever(get_store())
+        return _retriever
+
+def relevant_facts(text: str, k: int = _TOP_K) -> list[dict]:
+    """Los k hechos más relevantes para el texto según el índice BM25 local."""
+    try:
+        return _get_retriever().search(text, k=k)
+    except Exception as e:
+        print(f"[Nuvia Memory] Error buscando en el índice: {e}")
+        return []
+
+def memory_context(text: str, k: int = _TOP_K) -> str:
+    """Hechos relevantes como líneas para un prompt ("" si no hay ninguno)."""
+    return format_facts(relevant_facts(text, k))
+
 def query_memory(question: str) -> str | None:
-    """Busca en la memoria local si hay respuesta para la pregunta."""
-    memory = load_memory()
-    if not memory:
+    """
+    Busca en la memoria local si hay respuesta para la pregunta. Solo los hechos
+    relevantes viajan al modelo; si ninguno supera el umbral, no se llama a Gemini.
+    """
+    facts = relevant_facts(question)
+    if not facts:
         return None
         
     try:
-        client = _get_client()
-        context = json.dumps(memory, ensure_ascii=False)
+        context = format_facts(facts)
         prompt = _RETRIEVE_PROMPT.format(memory_context=context, user_question=question)
         
-        response = client.models.generate_content(
-            model="models/gemini-flash-latest",
-            contents=prompt
-        )
-
-
-        answer = response.text.strip()
+        answer = get_client().generate_text(prompt, task="memory", call_site="query_memory")
         
         if "NO_DATA" in answer:
             return None
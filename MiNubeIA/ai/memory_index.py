@@ -0,0 +1,181 @@
+"""
+ai/memory_index.py — Índice léxico BM25 sobre la memoria para recuperar solo los hechos relevantes
+"""
+
+import math
+import os
+import threading
+
+from core.text import tokenize
+
+# Palabras vacías en español (ya sin tildes): no aportan al ranking
+_STOPWORDS = set("""
+a al algo como con cual cuales cuando cuanto de del donde el ella ellos en entre era es esa ese eso esta
+estas este esto estoy fue ha habia hay la las le les lo los me mi mis mas muy no nos o para pero por que
+quien se ser si sin sobre son soy su sus te ti tu tus tambien un una uno unos y ya yo
+dime sabes recuerdas acuerdas acuerdo dije dijiste cosa cosas tengo tiene tienes
+""".split())
+
+_K1 = 1.2
+_B = 0.75
+# Un término presente en casi todos los hechos puntúa por debajo (no discrimina)
+_MIN_SCORE = float(os.getenv("NUVIA_MEMORY_MIN_SCORE", 0.25))
+
+
+def _stem(word: str) -> str:
+    """Raíz ligera: quita plural y género (favoritas → favorit, canciones → cancion)."""
+    if len(word) > 5 and word.endswith("es"):
+        word = word[:-2]
+    elif len(word) > 3 and word.endswith("s"):
+        word = word[:-1]
+    if len(word) > 4 and word[-1] in "ao":
+        word = word[:-1]
+    return word
+
+
+def analyze(text: str) -> list[str]:
+    """Normaliza (minúsculas, sin tildes), quita palabras vacías y reduce a raíces."""
+    text = (text or "").replace("_", " ")
+    return [_stem(w) for w in tokenize(text, strip_fillers=False) if w not in _STOPWORDS and len(w) > 1]
+
+
+class BM25Index:
+    """
+    Índice invertido término → {documento: frecuencia} con puntuación BM25.
+    Altas, bajas y actualizaciones son incrementales (no hay que reconstruir).
+    """
+
+    def __init__(self, k1: float = _K1, b: float = _B):
+        self.k1 = k1
+        self.b = b
+        self._postings = {}
+        self._lengths = {}
+        self._doc_terms = {}
+        self._total_length = 0
+        self._lock = threading.Lock()
+
+    def add(self, doc_id, text: str):
+        terms = analyze(text)
+        with self._lock:
+            self._remove(doc_id)
+            counts = {}
+            for term in terms:
+                counts[term] = counts.get(term, 0) + 1
+            for term, tf in counts.items():
+                self._postings.setdefault(term, {})[doc_id] = tf
+            self._lengths[doc_id] = len(terms)
+            self._doc_terms[doc_id] = list(counts)
+            self._total_length += len(terms)
+
+    def remove(self, doc_id):
+        with self._lock:
+            self._remove(doc_id)
+
+    def _remove(self, doc_id):
+        length = self._lengths.pop(doc_id, None)
+        if length is None:
+            return
+        self._total_length -= length
+        for term in self._doc_terms.pop(doc_id, ()):
+            docs = self._postings.get(term)
+            if docs is not None:
+                docs.pop(doc_id, None)
+                if not docs:
+                    del self._postings[term]
+
+    def clear(self):
+        with self._lock:
+            self._postings.clear()
+            self._lengths.clear()
+            self._doc_terms.clear()
+            self._total_length = 0
+
+    def search(self, query: str, k: int = 5, min_score: float = 0.0) -> list[tuple]:
+        """Retorna [(doc_id, puntuación)] de los k mejores documentos por encima de 'min_score'."""
+        terms = set(analyze(query))
+        with self._lock:
+            n = len(self._lengths)
+            if not n or not terms:
+                return []
+            avg_length = self._total_length / n or 1.0
+            scores = {}
+            for term in terms:
+                docs = self._postings.get(term)
+                if not docs:
+                    continue
+                idf = math.log(1 + (n - len(docs) + 0.5) / (len(docs) + 0.5))
+                for doc_id, tf in docs.items():
+                    norm = self.k1 * (1 - self.b + self.b * self._lengths[doc_id] / avg_length)
+                    scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (self.k1 + 1) / (tf + norm)
+        ranked = sorted(((d, s) for d, s in scores.items() if s >= min_score), key=lambda x: x[1], reverse=True)
+        return ranked[:k]
+
+    def __len__(self):
+        return len(self._lengths)
+
+
+class MemoryRetriever:
+    """
+    Mantiene un BM25Index sincronizado con el MemoryStore (se suscribe a sus escrituras)
+    y devuelve los hechos más relevantes para una pregunta.
+    """
+
+    def __init__(self, store, min_score: float = _MIN_SCORE):
+        self.store = store
+        self.min_score = min_score
+        self.index = BM25Index()
+        self._values = {}
+        self._lock = threading.Lock()
+        self._rebuild()
+        store.subscribe(self._on_change)
+
+    @staticmethod
+    def _doc_text(memory_type: str, key: str, value: str) -> str:
+        return f"{key} {value}"
+
+    def _rebuild(self):
+        self.index.clear()
+        with self._lock:
+            self._values.clear()
+            for memory_type, facts in self.store.all().items():
+                for key, value in facts.items():
+                    self._values[(memory_type, key)] = value
+                    self.index.add((memory_type, key), self._doc_text(memory_type, key, value))
+
+    def _on_change(self, event: str, items):
+        if event == "reset":
+            self._rebuild()
+            return
+        with self._lock:
+            for memory_type, key, value in items:
+                doc_id = (memory_type, key)
+                if event == "delete":
+                    self._values.pop(doc_id, None)
+                    self.index.remove(doc_id)
+                else:
+                    self._values[doc_id] = value
+                    self.index.add(doc_id, self._doc_text(memory_type, key, value))
+
+    def search(self, query: str, k: int = 5) -> list[dict]:
+        """Hechos [{type, key, value, score}] relevantes para 'query' (lista vacía si ninguno supera el umbral)."""
+        hits = self.index.search(query, k=k, min_score=self.min_score)
+        with self._lock:
+            return [
+                {"type": doc_id[0], "key": doc_id[1], "value": self._values.get(doc_id, ""), "score": round(score, 2)}
+                for doc_id, score in hits if doc_id in self._values
+            ]
+
+
+def format_facts(facts: list[dict]) -> str:
+    """Hechos como líneas compactas para el prompt."""
+    return "\n".join(f"- [{f['type']}] {f['key']}: {f['value']}" for f in facts)
+
+
+if __name__ == "__main__":
+    # Prueba rápida del ranking
+    index = BM25Index()
+    index.add("comida", "comida_favorita pizza con mucho queso")
+    index.add("proyecto", "proyecto_actual Nuvia, una asistente de escritorio en Python")
+    index.add("perro", "nombre_mascota su perro se llama Toby")
+    for q in ["¿Cuál es mi comida favorita?", "¿cómo se llama mi perro?", "qué hora es"]:
+        print(q, "→", index.search(q, k=2, min_score=_MIN_SCORE))
@@ -0,0 +1,215 @@
+"""
+ai/memory_pipeline.py — Extracción de memoria por lotes con prefiltro local (sustituye una llamada por frase)
+"""
+
+import os
+import re
+import json
+import logging
+import threading
+import time
+
+from ai.client import get_client, CircuitOpenError
+from ai.scheduler import Priority, LoadShedError
+from ai.memory_store import get_store, MEMORY_TYPES
+from core.text import normalize_text
+
+logger = logging.getLogger("NuviaMemory")
+
+_BATCH_SIZE = int(os.getenv("NUVIA_MEMORY_BATCH", 8))
+_DEBOUNCE = float(os.getenv("NUVIA_MEMORY_DEBOUNCE", 20))   # segundos de silencio antes de extraer
+_MAX_DELAY = float(os.getenv("NUVIA_MEMORY_MAX_DELAY", 90))  # nunca se retiene un candidato más que esto
+_MAX_PENDING = 50
+_MAX_RETRIES = 3  # fallos de extracción que aguanta una frase antes de descartarse
+
+# Intenciones que son órdenes: no contienen hechos sobre el usuario
+_COMMAND_INTENTS = {
+    "open_app", "close_app", "get_time", "system_control", "window_control",
+    "send_whatsapp", "suggest_context", "hello_nuevi", "recall", "recall_conversation", "remember",
+}
+
+# Señales de que la frase afirma algo sobre el usuario (texto ya normalizado, sin tildes)
+_FACT_CUES = re.compile(
+    r"\b(me gusta\w*|me encanta\w*|me llamo|prefiero|odio|no soporto|mi|mis|soy|tengo|vivo|trabajo|estudio"
+    r"|estoy (?:trabajando|haciendo|aprendiendo|estudiando)|mi proyecto|naci|cumpleanos|cumplo"
+    r"|recuerda\w*|acuerdate|no olvides|anota|apunta|guarda"
+    r"|manana|pasado manana|lunes|martes|miercoles|jueves|viernes|sabado|domingo|la semana que viene)\b"
+)
+_QUESTION_START = re.compile(r"^(que|cual|cuales|como|cuando|donde|quien|quienes|cuanto|cuantos|por que|sabes|puedes)\b")
+
+_BATCH_PROMPT = """
+Eres el módulo de memoria persistente del asistente Nuvia.
+Recibes varias frases del usuario numeradas. Extrae SOLO la información que valga la pena recordar
+a largo plazo (gustos, datos personales, proyectos, recordatorios). Ignora órdenes, preguntas y charla.
+Si una frase corrige un dato de otra, quédate con el más reciente.
+
+Tipos permitidos: preference, personal_info, project_info, reminder_info.
+Responde con una lista JSON (vacía si no hay nada) de objetos {"type", "key", "value"}:
+"key" en snake_case corto y "value" limpio y resumido.
+
+Frases:
+{utterances}
+"""
+
+_BATCH_SCHEMA = {
+    "type": "ARRAY",
+    "items": {
+        "type": "OBJECT",
+        "properties": {
+            "type": {"type": "STRING", "enum": [t for t in MEMORY_TYPES if t != "general"]},
+            "key": {"type": "STRING"},
+            "value": {"type": "STRING"},
+        },
+        "required": ["type", "key", "value"],
+    },
+}
+
+
+def is_memory_candidate(text: str, intent: str | None = None) -> bool:
+    """Prefiltro local y barato: ¿puede esta frase contener un hecho que recordar?"""
+    if intent in _COMMAND_INTENTS:
+        return False
+    normalized = normalize_text(text)
+    if len(normalized.split()) < 3:
+        return False
+    if _QUESTION_START.match(normalized) and "?" in (text or "") and not re.search(r"\bme (gusta|encanta)", normalized):
+        return False
+    return bool(_FACT_CUES.search(normalized))
+
+
+def extract_batch(utterances: list[str]) -> list[dict]:
+    """Una sola llamada de fondo para todo el lote; retorna [{type, key, value}]."""
+    numbered = "\n".join(f"{i}. {u}" for i, u in enumerate(utterances, 1))
+    response = get_client().generate(
+        _BATCH_PROMPT.replace("{utterances}", numbered),
+        config={'response_mime_type': 'application/json', 'response_schema': _BATCH_SCHEMA},
+        task="memory", priority=Priority.BACKGROUND, call_site="memory_extraction",
+    )
+    data = json.loads(response.text or "[]")
+    if isinstance(data, dict):
+        data = [data]
+    return [d for d in data if isinstance(d, dict) and d.get("key") and d.get("value")]
+
+
+class MemoryExtractionPipeline:
+    """
+    Acumula frases candidatas y las extrae en lote: cuando se llega a 'batch_size',
+    tras 'debounce' segundos sin frases nuevas, o como mucho 'max_delay' después
+    del primer candidato. Los hechos de un lote se guardan en una sola transacción.
+    """
+
+    def __init__(self, batch_size: int = _BATCH_SIZE, debounce: float = _DEBOUNCE,
+                 max_delay: float = _MAX_DELAY, extractor=extract_batch, store=None):
+        self.batch_size = batch_size
+        self.debounce = debounce
+        self.max_delay = max_delay
+        self.extractor = extractor
+        self._store = store
+        self._pending = []
+        self._first_at = None
+        self._timer = None
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._failures = {}  # frase -> extracciones fallidas (las descartadas por carga no cuentan)
+        self.stats = {"submitted": 0, "skipped": 0, "batches": 0, "facts": 0, "retried": 0, "dropped": 0}
+
+    @property
+    def store(self):
+        return self._store or get_store()
+
+    def submit(self, text: str, intent: str | None = None) -> bool:
+        """Encola la frase si pasa el prefiltro. Retorna True si quedó como candidata."""
+        with self._lock:
+            self.stats["submitted"] += 1
+            if not is_memory_candidate(text, intent):
+                self.stats["skipped"] += 1
+                return False
+            self._pending.append(text)
+            if self._first_at is None:
+                self._first_at = time.monotonic()
+            if len(self._pending) >= self.batch_size:
+                self._cancel_timer()
+                threading.Thread(target=self.flush, daemon=True).start()
+            else:
+                self._schedule()
+            return True
+
+    def _schedule(self):
+        """(Re)programa el vaciado: debounce, sin pasar de max_delay desde el primer candidato."""
+        self._cancel_timer()
+        delay = min(self.debounce, max(0.0, self._first_at + self.max_delay - time.monotonic()))
+        self._timer = threading.Timer(delay, self.flush)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _cancel_timer(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+    def flush(self) -> int:
+        """Extrae y guarda lo pendiente ahora mismo. Retorna cuántos hechos se guardaron."""
+        with self._flush_lock:
+            with self._lock:
+                batch, self._pending = self._pending, []
+                self._first_at = None
+                self._cancel_timer()
+            if not batch:
+                return 0
+            try:
+                facts = [f for f in self.extractor(batch) or []
+                         if isinstance(f, dict) and f.get("key") and f.get("value")]
+                self.store.upsert_many([(f.get("type") or "general", f["key"], f["value"]) for f in facts])
+            except (LoadShedError, CircuitOpenError) as e:
+                # No llegó a enviarse: se reintenta sin gastar intentos
+                logger.info(f"Extracción de memoria aplazada: {e}")
+                self._requeue(batch)
+                return 0
+            except Exception as e:
+                logger.warning(f"Error extrayendo memoria del lote, se reintentará: {e}")
+                self._requeue(batch, failed=True)
+                return 0
+
+            with self._lock:
+                for text in batch:
+                    self._failures.pop(text, None)
+            self.stats["batches"] += 1
+            self.stats["facts"] += len(facts)
+            for fact in facts:
+                print(f"[Nuvia Memory] Guardado: {fact['key']} = {fact['value']}")
+            logger.info(f"Lote de memoria: {len(batch)} frases → {len(facts)} hechos (1 llamada)")
+            return len(facts)
+
+    def _requeue(self, batch: list[str], failed: bool = False):
+        """Devuelve el lote a la cola; con 'failed' cada frase gasta un intento (como mucho _MAX_RETRIES)."""
+        with self._lock:
+            if failed:
+                kept = []
+                for text in batch:
+                    self._failures[text] = self._failures.get(text, 0) + 1
+                    if self._failures[text] < _MAX_RETRIES:
+                        kept.append(text)
+                    else:
+                        del self._failures[text]
+                        self.stats["dropped"] += 1
+                        logger.warning(f"Frase descartada tras {_MAX_RETRIES} extracciones fallidas: {text!r}")
+                batch = kept
+            self.stats["retried"] += len(batch)
+            self._pending = (batch + self._pending)[-_MAX_PENDING:]
+            if not self._pending:
+                return
+            self._first_at = time.monotonic()
+            self._schedule()
+
+
+_pipeline = MemoryExtractionPipeline()
+
+def get_pipeline() -> MemoryExtractionPipeline:
+    return _pipeline
+
+
+if __name__ == "__main__":
+    # Prueba rápida del prefiltro
+    for frase in ["qué hora es", "cierra Chrome", "me encanta el café sin azúcar", "mi perro se llama Toby",
+                  "¿qué es un agujero negro?", "mañana tengo dentista a las 5", "cuéntame un chiste"]:
+        print(f"{frase!r:40} → {is_memory_candidate(frase)}")
@@ -0,0 +1,211 @@
+"""
+ai/memory_store.py — Almacén de memoria en SQLite (WAL) con una tabla por tipo y caché de lectura
+"""
+
+import json
+import time
+import pathlib
+import sqlite3
+import threading
+import logging
+
+logger = logging.getLogger("NuviaMemory")
+
+_BASE_DIR = pathlib.Path(__file__).parent.parent
+_DB_FILE = _BASE_DIR / "memory.db"
+_JSON_FILE = _BASE_DIR / "memory.json"
+
+# Tipos de memoria con tabla propia; cualquier otro va a "general"
+MEMORY_TYPES = ("preference", "personal_info", "project_info", "reminder_info", "general")
+
+
+def _table(memory_type: str) -> str:
+    return f"mem_{memory_type if memory_type in MEMORY_TYPES else 'general'}"
+
+
+class MemoryStore:
+    """
+    Hechos {tipo: {clave: valor}} persistidos en SQLite. Cada tipo tiene su tabla
+    con la clave como PRIMARY KEY (búsqueda O(log n)); las escrituras son upserts
+    transaccionales, así los hilos concurrentes no pisan sus cambios. Las lecturas
+    salen de una caché en memoria que se mantiene al día en cada escritura.
+    """
+
+    def __init__(self, path: pathlib.Path | str = _DB_FILE, json_path: pathlib.Path | str | None = _JSON_FILE):
+        self.path = pathlib.Path(path)
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+        self._cache = None
+        self._cache_lock = threading.Lock()
+        self._listeners = []
+        self._init_schema()
+        if json_path:
+            self._migrate_json(pathlib.Path(json_path))
+
+    # ── Conexión ──────────────────────────────────────────────────────────────
+
+    def _conn(self) -> sqlite3.Connection:
+        """Una conexión por hilo (sqlite3 no comparte conexiones entre hilos)."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _init_schema(self):
+        conn = self._conn()
+        with conn:
+            for memory_type in MEMORY_TYPES:
+                conn.execute(f"""CREATE TABLE IF NOT EXISTS {_table(memory_type)} (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL,
+                    updated_at REAL NOT NULL
+                )""")
+            conn.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT)")
+
+    def _migrate_json(self, json_path: pathlib.Path):
+        """Importa una sola vez el antiguo memory.json y lo deja como copia .migrated."""
+        if not json_path.exists():
+            return
+        conn = self._conn()
+        if conn.execute("SELECT 1 FROM meta WHERE name = 'json_migrated'").fetchone():
+            return
+        try:
+            data = json.loads(json_path.read_text(encoding="utf-8"))
+        except Exception as e:
+            logger.warning(f"No se pudo leer {json_path.name} para migrarlo: {e}")
+            return
+        items = [(t, k, v) for t, facts in data.items() if isinstance(facts, dict) for k, v in facts.items()]
+        with self._write_lock, conn:
+            self._upsert_rows(conn, items)
+            conn.execute("INSERT OR REPLACE INTO meta (name, value) VALUES ('json_migrated', ?)",
+                         (str(time.time()),))
+        json_path.replace(json_path.with_name(json_path.name + ".migrated"))
+        self._invalidate()
+        logger.info(f"Memoria migrada de {json_path.name} a SQLite ({len(items)} hechos)")
+
+    # ── Escritura ─────────────────────────────────────────────────────────────
+
+    def subscribe(self, listener):
+        """
+        Registra listener(evento, items) para mantener índices al día.
+        Eventos: "upsert" y "delete" con [(tipo, clave, valor)], o "reset" (todo cambió).
+        Se llama con el lock de escritura tomado (en orden de commit): no debe escribir en la memoria.
+        """
+        self._listeners.append(listener)
+
+    def _notify(self, event: str, items=None):
+        for listener in list(self._listeners):
+            try:
+                listener(event, items)
+            except Exception as e:
+                logger.warning(f"Error notificando cambio de memoria: {e}")
+
+    @staticmethod
+    def _upsert_rows(conn, items):
+        now = time.time()
+        for memory_type, key, value in items:
+            conn.execute(
+                f"INSERT INTO {_table(memory_type)} (key, value, updated_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET value = excluded.value, updated_at = excluded.updated_at",
+                (str(key), _to_text(value), now),
+            )
+
+    def upsert(self, memory_type: str, key: str, value):
+        self.upsert_many([(memory_type, key, value)])
+
+    def upsert_many(self, items: list[tuple]):
+        """Guarda varios (tipo, clave, valor) en una sola transacción."""
+        if not items:
+            return
+        conn = self._conn()
+        normalized = [(_type_name(t), str(k), _to_text(v)) for t, k, v in items]
+        # Caché y avisos dentro del lock de escritura: se aplican en el mismo orden que los commits
+        with self._write_lock:
+            with conn:
+                self._upsert_rows(conn, items)
+            with self._cache_lock:
+                if self._cache is not None:
+                    for memory_type, key, value in normalized:
+                        self._cache.setdefault(memory_type, {})[key] = value
+            self._notify("upsert", normalized)
+
+    def delete(self, memory_type: str, key: str) -> bool:
+        conn = self._conn()
+        with self._write_lock:
+            with conn:
+                deleted = conn.execute(f"DELETE FROM {_table(memory_type)} WHERE key = ?", (key,)).rowcount > 0
+            with self._cache_lock:
+                if self._cache is not None:
+                    self._cache.get(_type_name(memory_type), {}).pop(key, None)
+            if deleted:
+                self._notify("delete", [(_type_name(memory_type), key, None)])
+        return deleted
+
+    def replace_all(self, data: dict):
+        """Sustituye toda la memoria por 'data' de forma atómica (compatibilidad con save_memory)."""
+        items = [(t, k, v) for t, facts in data.items() if isinstance(facts, dict) for k, v in facts.items()]
+        conn = self._conn()
+        with self._write_lock:
+            with conn:
+                for memory_type in MEMORY_TYPES:
+                    conn.execute(f"DELETE FROM {_table(memory_type)}")
+                self._upsert_rows(conn, items)
+            self._invalidate()
+            self._notify("reset")
+
+    # ── Lectura ───────────────────────────────────────────────────────────────
+
+    def _invalidate(self):
+        with self._cache_lock:
+            self._cache = None
+
+    def _snapshot(self) -> dict:
+        with self._cache_lock:
+            if self._cache is None:
+                conn = self._conn()
+                cache = {}
+                for memory_type in MEMORY_TYPES:
+                    rows = conn.execute(f"SELECT key, value FROM {_table(memory_type)} ORDER BY updated_at").fetchall()
+                    if rows:
+                        cache[memory_type] = dict(rows)
+                self._cache = cache
+            return self._cache
+
+    def get(self, memory_type: str, key: str) -> str | None:
+        with self._cache_lock:
+            cached = self._cache
+        if cached is not None:
+            return cached.get(_type_name(memory_type), {}).get(key)
+        row = self._conn().execute(f"SELECT value FROM {_table(memory_type)} WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def all(self) -> dict:
+        """Copia de toda la memoria como {tipo: {clave: valor}}."""
+        snapshot = self._snapshot()
+        with self._cache_lock:
+            return {t: dict(facts) for t, facts in snapshot.items() if facts}
+
+    def count(self) -> int:
+        return sum(len(facts) for facts in self.all().values())
+
+
+def _type_name(memory_type: str) -> str:
+    return memory_type if memory_type in MEMORY_TYPES else "general"
+
+def _to_text(value) -> str:
+    return value if isinstance(value, str) else json.dumps(value, ensure_ascii=False)
+
+
+_store = None
+_store_lock = threading.Lock()
+
+def get_store() -> MemoryStore:
+    """Instancia compartida (se crea y migra en el primer uso)."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = MemoryStore()
+        return _store
@@ -0,0 +1,254 @@
+"""
+ai/reminders.py — Recordatorios: cola de prioridad persistida (SQLite) con un único hilo planificador
+"""
+
+import re
+import time
+import pathlib
+import sqlite3
+import logging
+import threading
+from datetime import datetime, timedelta
+
+from core.text import normalize_text
+
+logger = logging.getLogger("NuviaReminders")
+
+_DB_FILE = pathlib.Path(__file__).parent.parent / "reminders.db"
+_DEFAULT_HOUR = 9  # "mañana" sin hora → a las 9:00
+_LATE_GRACE = 6 * 3600  # recordatorios vencidos con el programa cerrado: se avisan si no pasaron más de 6 h
+# Espera máxima de una vez: en Windows wait() falla por encima de threading.TIMEOUT_MAX (~49 días)
+_MAX_WAIT = 3600
+
+_WEEKDAYS = ["lunes", "martes", "miercoles", "jueves", "viernes", "sabado", "domingo"]
+_MONTHS = ["enero", "febrero", "marzo", "abril", "mayo", "junio", "julio", "agosto",
+           "septiembre", "octubre", "noviembre", "diciembre"]
+_NUMBERS = {"un": 1, "una": 1, "uno": 1, "dos": 2, "tres": 3, "cuatro": 4, "cinco": 5, "diez": 10,
+            "quince": 15, "veinte": 20, "treinta": 30, "media": 0.5}
+
+
+def _number(token: str) -> float | None:
+    if token.isdigit():
+        return float(token)
+    return _NUMBERS.get(token)
+
+
+def parse_due(text: str, now: datetime | None = None) -> datetime | None:
+    """
+    Extrae el momento de un recordatorio en español: "en 20 minutos", "dentro de una hora",
+    "mañana a las 5 de la tarde", "el viernes a las 10:30", "el 25 de diciembre", "hoy a las 18".
+    Retorna None si el texto no menciona ningún momento.
+    """
+    now = now or datetime.now()
+    t = normalize_text(text or "", strip_fillers=False)
+
+    # Relativos: "en 20 minutos", "dentro de 2 horas", "en media hora"
+    match = re.search(r"\b(?:en|dentro de)\s+(\w+)\s+(minuto|minutos|hora|horas|dia|dias)\b", t)
+    if match and _number(match.group(1)) is not None:
+        amount = _number(match.group(1))
+        unit = match.group(2)
+        delta = timedelta(minutes=amount) if unit.startswith("minuto") else \
+            timedelta(hours=amount) if unit.startswith("hora") else timedelta(days=amount)
+        return (now + delta).replace(microsecond=0)
+
+    # Día
+    day = None
+    if "pasado manana" in t:
+        day = now.date() + timedelta(days=2)
+    elif re.search(r"(?<!de la )(?<!por la )(?<!esta )\bmanana\b", t):
+        day = now.date() + timedelta(days=1)
+    elif re.search(r"\b(hoy|esta tarde|esta noche|esta manana)\b", t):
+        day = now.date()
+    else:
+        match = (re.search(r"\b(\d{1,2}) de (" + "|".join(_MONTHS) + r")\b", t)
+                 or re.search(r"\b(\d{1,2})/(\d{1,2})\b", text or ""))
+        if match:
+            try:
+                month = _MONTHS.index(match.group(2)) + 1 if match.group(2) in _MONTHS else int(match.group(2))
+                candidate = datetime(now.year, month, int(match.group(1))).date()
+                if candidate < now.date():
+                    candidate = candidate.replace(year=now.year + 1)
+                day = candidate
+            except (ValueError, IndexError):
+                day = None
+        if day is None:
+            for i, name in enumerate(_WEEKDAYS):
+                if re.search(rf"\b{name}\b", t):
+                    ahead = (i - now.weekday()) % 7 or 7
+                    day = now.date() + timedelta(days=ahead)
+                    break
+
+    # Hora: "a las 5", "a las 17:30", "a la 1 y media", "al mediodia"
+    hour = minute = None
+    match = re.search(r"\ba (?:las|la)\s+(\d{1,2})(?:\s(\d{2}))?(?:\s+y\s+(media|cuarto))?", t)
+    if match:
+        hour = int(match.group(1))
+        minute = int(match.group(2) or 0)
+        if match.group(3):
+            minute = 30 if match.group(3) == "media" else 15
+        if re.search(r"de la (tarde|noche)|\bpm\b", t) and hour < 12:
+            hour += 12
+        elif not re.search(r"de la manana|\bam\b", t) and 1 <= hour <= 7:
+            hour += 12  # "a las 5" sin más: se asume la tarde
+    elif "mediodia" in t:
+        hour, minute = 12, 0
+    elif "esta noche" in t:
+        hour, minute = 21, 0
+    elif "esta tarde" in t:
+        hour, minute = 17, 0
+
+    if day is None and hour is None:
+        return None
+    if hour is not None and not (0 <= hour <= 23 and 0 <= minute <= 59):
+        return None
+    if day is None:
+        due = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+        return due if due > now else due + timedelta(days=1)
+    if hour is None:
+        hour, minute = _DEFAULT_HOUR, 0
+    return datetime(day.year, day.month, day.day, hour, minute)
+
+
+class ReminderScheduler:
+    """
+    Cola de prioridad persistida en SQLite (índice por vencimiento) y un solo hilo
+    que duerme hasta el siguiente vencimiento. En memoria solo vive el próximo
+    recordatorio, así miles de pendientes no cuestan nada; añadir uno más próximo
+    despierta al hilo para reprogramarse. Tras reiniciar, los pendientes siguen en la base.
+    """
+
+    def __init__(self, path: pathlib.Path | str = _DB_FILE, on_fire=None):
+        self.path = pathlib.Path(path)
+        self.on_fire = on_fire
+        self._cond = threading.Condition()
+        self._thread = None
+        self._running = False
+        self._armed_due = None  # vencimiento por el que duerme el hilo ahora mismo
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, timeout=10)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        with self._conn:
+            self._conn.execute("""CREATE TABLE IF NOT EXISTS reminders (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                due REAL NOT NULL,
+                text TEXT NOT NULL,
+                source_key TEXT UNIQUE,
+                created_at REAL NOT NULL,
+                fired_at REAL
+            )""")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_reminders_pending ON reminders (fired_at, due)")
+
+    # ── API ───────────────────────────────────────────────────────────────────
+
+    def add(self, text: str, due: datetime | float, source_key: str | None = None) -> int:
+        """Programa un recordatorio. Con 'source_key' repetida se reprograma el existente."""
+        due_ts = due.timestamp() if isinstance(due, datetime) else float(due)
+        with self._cond:
+            with self._conn:
+                cursor = self._conn.execute(
+                    "INSERT INTO reminders (due, text, source_key, created_at) VALUES (?, ?, ?, ?) "
+                    "ON CONFLICT(source_key) DO UPDATE SET due = excluded.due, text = excluded.text, fired_at = NULL",
+                    (due_ts, text, source_key, time.time()),
+                )
+            # Solo se despierta al hilo si el nuevo vence antes que el que espera
+            if self._armed_due is None or due_ts < self._armed_due:
+                self._cond.notify()
+        logger.info(f"Recordatorio programado para {datetime.fromtimestamp(due_ts):%d/%m %H:%M}: {text}")
+        return cursor.lastrowid
+
+    def cancel(self, reminder_id: int) -> bool:
+        with self._cond:
+            with self._conn:
+                deleted = self._conn.execute("DELETE FROM reminders WHERE id = ? AND fired_at IS NULL",
+                                             (reminder_id,)).rowcount > 0
+            self._cond.notify()
+        return deleted
+
+    def pending(self, limit: int = 20) -> list[dict]:
+        with self._cond:
+            rows = self._conn.execute(
+                "SELECT id, due, text FROM reminders WHERE fired_at IS NULL ORDER BY due LIMIT ?", (limit,)
+            ).fetchall()
+        return [{"id": r[0], "due": r[1], "text": r[2]} for r in rows]
+
+    def pending_count(self) -> int:
+        with self._cond:
+            return self._conn.execute("SELECT COUNT(*) FROM reminders WHERE fired_at IS NULL").fetchone()[0]
+
+    # ── Hilo planificador ─────────────────────────────────────────────────────
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="nuvia-reminders", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        with self._cond:
+            self._running = False
+            self._cond.notify()
+
+    def _next(self):
+        return self._conn.execute(
+            "SELECT id, due, text FROM reminders WHERE fired_at IS NULL ORDER BY due LIMIT 1"
+        ).fetchone()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                if not self._running:
+                    return
+                row = self._next()
+                if row is None:
+                    self._armed_due = float("inf")
+                    self._cond.wait()  # nada pendiente: solo despierta add() o stop()
+                    continue
+                delay = row[1] - time.time()
+                if delay > 0:
+                    self._armed_due = row[1]
+                    self._cond.wait(min(delay, _MAX_WAIT))
+                    continue  # puede haber llegado uno más próximo (o la espera se acotó): se vuelve a mirar
+                self._armed_due = None
+                with self._conn:
+                    self._conn.execute("UPDATE reminders SET fired_at = ? WHERE id = ?", (time.time(), row[0]))
+            self._fire(row)
+
+    def _fire(self, row):
+        reminder_id, due, text = row
+        late = time.time() - due
+        if late > _LATE_GRACE:
+            logger.info(f"Recordatorio vencido hace {late / 3600:.0f} h descartado: {text}")
+            return
+        logger.info(f"Recordatorio #{reminder_id}: {text}")
+        if self.on_fire:
+            try:
+                self.on_fire(text, late > 60)
+            except Exception as e:
+                logger.error(f"Error entregando recordatorio: {e}")
+
+
+def reminder_listener(scheduler: ReminderScheduler):
+    """
+    Listener para MemoryStore.subscribe: cada reminder_info guardado con un momento
+    reconocible se programa (la clave de memoria evita duplicados).
+    """
+    def _on_change(event: str, items):
+        if event != "upsert":
+            return
+        for memory_type, key, value in items:
+            if memory_type != "reminder_info":
+                continue
+            due = parse_due(value)
+            if due is not None and due.timestamp() > time.time():
+                scheduler.add(value, due, source_key=f"memory:{key}")
+    return _on_change
+
+
+if __name__ == "__main__":
+    # Prueba rápida del parser
+    ahora = datetime(2025, 3, 12, 10, 0)  # miércoles
+    for frase in ["en 20 minutos revisar el horno", "mañana a las 5 dentista", "el viernes a las 10:30 reunión",
+                  "el 25 de diciembre llamar a mamá", "hoy a las 18 gimnasio", "a las 9 de la mañana tomar la pastilla",
+                  "pasado mañana pagar la luz", "el 3/4 renovar el DNI", "mañana por la mañana correr",
+                  "a las 10:05 llamar", "comprar pan"]:
+        print(f"{frase!r:45} → {parse_due(frase, ahora)}")
@@ -0,0 +1,146 @@
+"""
+ai/router.py — Enrutador de modelos por tarea con métricas de latencia y peticiones de cobertura (hedging)
+"""
+
+import os
+import time
+import random
+import threading
+from collections import deque
+
+from ai.client import DEFAULT_MODEL
+
+# Tareas conocidas y su modelo principal / secundario.
+# Se pueden sobreescribir con NUVIA_MODELS_<TAREA>="modelo_principal,modelo_secundario".
+_SECONDARY_MODEL = os.getenv("NUVIA_SECONDARY_MODEL", "models/gemini-flash-lite-latest")
+_DEFAULT_ROUTES = {
+    "classification": [DEFAULT_MODEL, _SECONDARY_MODEL],
+    "memory": [DEFAULT_MODEL, _SECONDARY_MODEL],
+    "chat": [DEFAULT_MODEL, _SECONDARY_MODEL],
+    "summary": [_SECONDARY_MODEL, DEFAULT_MODEL],  # resúmenes de sesión: basta el modelo ligero
+    "vision": [DEFAULT_MODEL],
+}
+
+_WINDOW = 200          # muestras por modelo
+_MIN_SAMPLES = 20      # muestras mínimas antes de fiarse del p95
+_MAX_ERROR_RATE = 0.5  # por encima, el secundario pasa a ser el principal
+
+
+def _routes_from_env() -> dict:
+    routes = {task: list(models) for task, models in _DEFAULT_ROUTES.items()}
+    for task in routes:
+        value = os.getenv(f"NUVIA_MODELS_{task.upper()}")
+        if value:
+            routes[task] = [m.strip() for m in value.split(",") if m.strip()]
+    return routes
+
+
+def percentile(values: list[float], q: float) -> float | None:
+    """Percentil por rango más cercano (q en 0..100)."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(q / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+class ModelStats:
+    """Ventana deslizante de latencias y errores de un modelo."""
+
+    def __init__(self, window: int = _WINDOW):
+        self._latencies = deque(maxlen=window)
+        self._outcomes = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, latency: float, ok: bool):
+        with self._lock:
+            if ok:
+                self._latencies.append(latency)
+            self._outcomes.append(ok)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            latencies = list(self._latencies)
+            outcomes = list(self._outcomes)
+        return {
+            "samples": len(outcomes),
+            "error_rate": (outcomes.count(False) / len(outcomes)) if outcomes else 0.0,
+            "p50": percentile(latencies, 50),
+            "p95": percentile(latencies, 95),
+            "p99": percentile(latencies, 99),
+        }
+
+
+class ModelRouter:
+    """
+    Elige el modelo de cada tarea y decide cuándo lanzar una petición de cobertura:
+    si el principal supera su p95 sin responder, se pide lo mismo al secundario
+    y gana la primera respuesta válida.
+    """
+
+    def __init__(self, routes: dict | None = None):
+        self.routes = routes or _routes_from_env()
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def stats_for(self, model: str) -> ModelStats:
+        with self._lock:
+            if model not in self._stats:
+                self._stats[model] = ModelStats()
+            return self._stats[model]
+
+    def models_for(self, task: str) -> list[str]:
+        """Modelos de la tarea en orden de preferencia (degrada el principal si falla mucho)."""
+        models = list(self.routes.get(task) or self.routes["chat"])
+        if len(models) > 1:
+            primary = self.stats_for(models[0]).snapshot()
+            if primary["samples"] >= _MIN_SAMPLES and primary["error_rate"] > _MAX_ERROR_RATE:
+                models[0], models[1] = models[1], models[0]
+        return models
+
+    def hedge_delay(self, model: str) -> float | None:
+        """Segundos a esperar antes de cubrir la petición (p95 del modelo), o None sin datos."""
+        snapshot = self.stats_for(model).snapshot()
+        if snapshot["samples"] < _MIN_SAMPLES:
+            return None
+        return snapshot["p95"]
+
+    def record(self, model: str, latency: float, ok: bool):
+        self.stats_for(model).record(latency, ok)
+
+    def report(self) -> dict:
+        with self._lock:
+            models = list(self._stats)
+        return {model: self.stats_for(model).snapshot() for model in models}
+
+
+_router = ModelRouter()
+
+def get_router() -> ModelRouter:
+    return _router
+
+
+if __name__ == "__main__":
+    # Prueba rápida contra el backend local: latencia con cola pesada (5% de peticiones lentas)
+    from ai.client import LLMClient, LocalBackend
+    from ai.scheduler import RequestScheduler
+
+    def _latency():
+        return random.uniform(0.5, 1.5) if random.random() < 0.05 else random.uniform(0.01, 0.03)
+
+    def _run(hedging: bool, n: int = 400) -> list[float]:
+        router = ModelRouter({"chat": ["principal", "secundario"]})
+        # Cuota ilimitada: aquí solo se mide la cola de latencia, no el limitador
+        scheduler = RequestScheduler(requests_per_minute=1e6, burst=1e6, max_concurrency=8)
+        client = LLMClient(LocalBackend(latency=_latency), router=router, hedging=hedging, scheduler=scheduler)
+        latencies = []
+        for _ in range(n):
+            start = time.monotonic()
+            client.generate_text("hola", task="chat")
+            latencies.append(time.monotonic() - start)
+        return latencies, client
+
+    for hedging in (False, True):
+        latencies, client = _run(hedging)
+        print(f"hedging={hedging}: p50={percentile(latencies, 50):.3f}s "
+              f"p99={percentile(latencies, 99):.3f}s llamadas={client.backend.calls}")
@@ -0,0 +1,145 @@
+"""
+ai/scheduler.py — Planificador de llamadas al modelo con prioridades, limitador de cuota y descarte de carga
+"""
+
+import os
+import heapq
+import itertools
+import logging
+import threading
+import time
+from enum import IntEnum
+
+logger = logging.getLogger("NuviaLLM")
+
+
+class Priority(IntEnum):
+    """Clase de prioridad de una llamada (menor valor = más urgente)."""
+    INTERACTIVE = 0  # el usuario está esperando (clasificar, responder)
+    BACKGROUND = 1   # trabajo diferible (extracción de memoria, resúmenes)
+    PREFETCH = 2     # especulativo (sugerencias precalculadas)
+
+
+class LoadShedError(Exception):
+    """Petición de baja prioridad descartada porque la cuota o la cola están saturadas."""
+
+
+class TokenBucket:
+    """Cubo de fichas: 'rate' fichas por segundo hasta un máximo de 'capacity'."""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def try_take(self, reserve: float = 0.0) -> bool:
+        """Toma una ficha si quedan al menos 1 + 'reserve' (la reserva es para lo interactivo)."""
+        self._refill()
+        if self._tokens >= 1.0 + reserve:
+            self._tokens -= 1.0
+            return True
+        return False
+
+    def time_until(self, reserve: float = 0.0) -> float:
+        self._refill()
+        missing = 1.0 + reserve - self._tokens
+        return max(0.0, missing / self.rate) if self.rate > 0 else 1.0
+
+
+class RequestScheduler:
+    """
+    Reparte la cuota y la concurrencia entre clases de prioridad:
+    - Las llamadas esperan en una cola por (prioridad, orden de llegada).
+    - Las de fondo y precarga no pueden gastar las últimas 'interactive_reserve' fichas.
+    - Si su cola está llena o esperan más de su límite, se descartan (LoadShedError).
+    Las interactivas nunca se descartan.
+    """
+
+    _MAX_QUEUE = {Priority.BACKGROUND: 20, Priority.PREFETCH: 4}
+    _MAX_WAIT = {Priority.BACKGROUND: 30.0, Priority.PREFETCH: 5.0}
+
+    def __init__(self, requests_per_minute: float | None = None, burst: float | None = None,
+                 max_concurrency: int | None = None, interactive_reserve: float = 2.0):
+        rpm = requests_per_minute or float(os.getenv("NUVIA_LLM_RPM", 60))
+        self.bucket = TokenBucket(rate=rpm / 60.0, capacity=burst or float(os.getenv("NUVIA_LLM_BURST", 10)))
+        self.max_concurrency = max_concurrency or int(os.getenv("NUVIA_LLM_CONCURRENCY", 4))
+        self.interactive_reserve = interactive_reserve
+        self.shed = {p: 0 for p in Priority}
+        self._active = 0
+        self._waiters = []
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+
+    def acquire(self, priority: Priority = Priority.INTERACTIVE, timeout: float | None = None):
+        """
+        Bloquea hasta obtener ficha y hueco de concurrencia. Hay que llamar a release() después.
+        Lanza LoadShedError si una petición no interactiva no puede atenderse a tiempo.
+        """
+        max_wait = self._MAX_WAIT.get(priority)
+        if timeout is not None:
+            max_wait = min(max_wait, timeout) if max_wait is not None else timeout
+        deadline = time.monotonic() + max_wait if max_wait is not None else None
+        reserve = 0.0 if priority == Priority.INTERACTIVE else self.interactive_reserve
+        entry = (int(priority), next(self._seq))
+
+        with self._cond:
+            queued = sum(1 for p, _ in self._waiters if p == priority)
+            if priority in self._MAX_QUEUE and queued >= self._MAX_QUEUE[priority]:
+                self._shed(priority, "cola llena")
+            heapq.heappush(self._waiters, entry)
+            try:
+                while True:
+                    wait_for = 1.0
+                    if self._waiters[0] == entry and self._active < self.max_concurrency:
+                        if self.bucket.try_take(reserve):
+                            heapq.heappop(self._waiters)
+                            self._active += 1
+                            self._cond.notify_all()
+                            return
+                        wait_for = max(0.01, self.bucket.time_until(reserve))
+                    if deadline is not None:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            self._shed(priority, "espera excesiva")
+                        wait_for = min(wait_for, remaining)
+                    self._cond.wait(wait_for)
+            except BaseException:
+                if entry in self._waiters:
+                    self._waiters.remove(entry)
+                    heapq.heapify(self._waiters)
+                    self._cond.notify_all()
+                raise
+
+    def try_acquire(self, priority: Priority = Priority.INTERACTIVE) -> bool:
+        """Intenta obtener hueco sin esperar (p. ej. para una petición de cobertura)."""
+        reserve = 0.0 if priority == Priority.INTERACTIVE else self.interactive_reserve
+        with self._cond:
+            if self._waiters or self._active >= self.max_concurrency:
+                return False
+            if not self.bucket.try_take(reserve):
+                return False
+            self._active += 1
+            return True
+
+    def release(self):
+        with self._cond:
+            self._active = max(0, self._active - 1)
+            self._cond.notify_all()
+
+    def _shed(self, priority: Priority, reason: str):
+        self.shed[priority] += 1
+        raise LoadShedError(f"Llamada {priority.name.lower()} descartada ({reason})")
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                "active": self._active,
+                "queued": len(self._waiters),
+                "shed": {p.name.lower(): n for p, n in self.shed.items()},
+            }
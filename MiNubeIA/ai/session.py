@@ -0,0 +1,201 @@
+"""
+ai/session.py — Sesión de conversación multi-turno con presupuesto de tokens y resumen incremental
+"""
+
+import os
+import re
+import logging
+import threading
+from collections import deque
+
+from ai.client import get_client
+from ai.scheduler import Priority, LoadShedError
+from core.text import estimate_tokens, truncate_tokens, fold_accents
+
+logger = logging.getLogger("NuviaSession")
+
+_TURNS_BUDGET = int(os.getenv("NUVIA_SESSION_TOKENS", 600))
+_SUMMARY_BUDGET = int(os.getenv("NUVIA_SESSION_SUMMARY_TOKENS", 200))
+
+# Señales de que la frase depende de lo ya hablado: pronombres y deícticos ("eso", "él"),
+# referencias al turno anterior ("lo que dijiste") y continuaciones ("¿y en Francia?", "dime más").
+# "él"/"ella" se comprueban antes de quitar tildes para no confundir "él" con el artículo.
+_FOLLOW_UP_PRONOUNS = re.compile(r"(?<!\w)(él|ella|ellos|ellas)(?!\w)")
+_FOLLOW_UP = re.compile(
+    r"\b(eso|esto|aquello|ese|esa|esos|esas|anterior|antes|dijiste|dije|mencionaste|hablamos"
+    r"|lo mismo|otra vez|otro|otra|tambien|entonces|mas|continua|sigue"
+    r"|\w+(?:melo|mela|melos|melas|selo|sela|selos|selas)"
+    r"|hazlo|dilo|explicalo|repitelo|resumelo|traducelo|amplialo)\b"
+)
+_CONTINUATION = re.compile(r"^(y|pero|o sea|entonces)\b")
+
+def is_follow_up(text: str) -> bool:
+    """True si la frase necesita la conversación previa para entenderse."""
+    lowered = (text or "").lower()
+    if _FOLLOW_UP_PRONOUNS.search(lowered):
+        return True
+    folded = re.sub(r"[^a-z0-9 ]+", " ", fold_accents(lowered)).strip()
+    return bool(folded) and bool(_FOLLOW_UP.search(folded) or _CONTINUATION.search(folded))
+
+
+_SUMMARY_PROMPT = """
+Eres el módulo de resumen de conversación de Nuvia.
+Actualiza el resumen con los turnos nuevos. Conserva nombres, datos, decisiones y temas abiertos;
+omite saludos y relleno. Responde solo con el resumen, en español y en menos de {max_words} palabras.
+
+Resumen actual:
+{summary}
+
+Turnos nuevos:
+{turns}
+"""
+
+
+def _format_turns(turns) -> str:
+    return "\n".join(f"Usuario: {user}\nNuevi: {answer}" for user, answer in turns)
+
+
+def summarize_turns(summary: str, turns: list[tuple[str, str]], max_tokens: int) -> str:
+    """Resumidor por defecto: una llamada de fondo al modelo barato de la tarea 'summary'."""
+    prompt = (_SUMMARY_PROMPT
+              .replace("{max_words}", str(max(20, max_tokens * 3 // 5)))
+              .replace("{summary}", summary or "(vacío)")
+              .replace("{turns}", _format_turns(turns)))
+    return get_client().generate_text(prompt, task="summary", priority=Priority.BACKGROUND,
+                                       call_site="session_summary")
+
+
+class ConversationSession:
+    """
+    Mantiene los últimos turnos literales dentro de 'turns_budget' tokens.
+    Los turnos que salen de la ventana se condensan en un resumen acumulado
+    (como mucho 'summary_budget' tokens) en un hilo de fondo, así el prompt
+    tiene tamaño acotado sea cual sea la duración de la sesión.
+    """
+
+    def __init__(self, turns_budget: int = _TURNS_BUDGET, summary_budget: int = _SUMMARY_BUDGET,
+                 summarizer=summarize_turns):
+        self.turns_budget = turns_budget
+        self.summary_budget = summary_budget
+        self.summarizer = summarizer
+        self.summary = ""
+        self._turns = deque()        # (usuario, respuesta) literales
+        self._turns_tokens = 0
+        self._evicted = []           # turnos pendientes de resumir
+        self._compacting = False
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _turn_tokens(turn) -> int:
+        return estimate_tokens(_format_turns([turn]))
+
+    def add_turn(self, user_text: str, answer: str):
+        """Registra un intercambio y lanza la compactación si se supera el presupuesto."""
+        if not user_text or not answer:
+            return
+        # Un turno suelto nunca puede ocupar más que la ventana entera
+        turn = (truncate_tokens(user_text, self.turns_budget // 2),
+                truncate_tokens(answer, self.turns_budget // 2))
+        with self._lock:
+            self._turns.append(turn)
+            self._turns_tokens += self._turn_tokens(turn)
+            while self._turns_tokens > self.turns_budget and len(self._turns) > 1:
+                old = self._turns.popleft()
+                self._turns_tokens -= self._turn_tokens(old)
+                self._evicted.append(old)
+            start = bool(self._evicted) and not self._compacting
+            if start:
+                self._compacting = True
+        if start:
+            threading.Thread(target=self._compact, daemon=True).start()
+
+    def _compact(self):
+        """Condensa los turnos expulsados en el resumen (en segundo plano)."""
+        while True:
+            with self._lock:
+                pending, self._evicted = self._evicted, []
+                summary = self.summary
+                if not pending:
+                    self._compacting = False
+                    return
+            try:
+                new_summary = (self.summarizer(summary, pending, self.summary_budget) or "").strip()
+            except LoadShedError as e:
+                logger.info(f"Resumen aplazado por carga: {e}")
+                new_summary = None
+            except Exception as e:
+                logger.warning(f"No se pudo resumir la conversación: {e}")
+                new_summary = None
+            with self._lock:
+                if new_summary:
+                    self.summary = truncate_tokens(new_summary, self.summary_budget)
+                    logger.info(f"Resumen de sesión actualizado ({estimate_tokens(self.summary)} tokens, "
+                                f"{len(pending)} turnos compactados)")
+                else:
+                    # Se reintenta con el siguiente turno; lo pendiente también está acotado
+                    self._evicted = pending + self._evicted
+                    while sum(map(self._turn_tokens, self._evicted)) > self.turns_budget and self._evicted:
+                        self._evicted.pop(0)
+                    self._compacting = False
+                    return
+
+    def history_block(self) -> str:
+        """Texto a anteponer al prompt: resumen + turnos recientes (vacío si no hay historia)."""
+        with self._lock:
+            summary = self.summary
+            turns = list(self._turns)
+            turns_tokens = self._turns_tokens
+        if not summary and not turns:
+            return ""
+        parts = []
+        if summary:
+            parts.append(f"Resumen de la conversación hasta ahora: {summary}")
+        if turns:
+            parts.append("Últimos turnos:\n" + _format_turns(turns))
+        logger.info(f"Historial de sesión: {estimate_tokens(summary) + turns_tokens} tokens "
+                    f"(resumen {estimate_tokens(summary)}, {len(turns)} turnos recientes)")
+        return "\n".join(parts)
+
+    def history_for(self, text: str) -> str:
+        """
+        Historial solo para las preguntas que dependen de él (ver is_follow_up()).
+        Las preguntas autónomas van sin historial y pueden servirse desde la caché de ask().
+        """
+        return self.history_block() if is_follow_up(text) else ""
+
+    def clear(self):
+        with self._lock:
+            self.summary = ""
+            self._turns.clear()
+            self._turns_tokens = 0
+            self._evicted = []
+
+
+if __name__ == "__main__":
+    # Prueba rápida: 50 turnos con un resumidor local; el historial no crece
+    import time
+
+    def _fake_summarizer(summary, turns, max_tokens):
+        return (summary + " " + " ".join(user for user, _ in turns)).strip()
+
+    session = ConversationSession(turns_budget=120, summary_budget=60, summarizer=_fake_summarizer)
+    for i in range(50):
+        session.add_turn(f"Pregunta número {i} sobre el proyecto", f"Respuesta detallada número {i} de Nuevi.")
+        time.sleep(0.01)
+    block = session.history_block()
+    print(block)
+    print(f"Tokens del historial: {estimate_tokens(block)}")
+
+    for question in ["¿Qué es la fotosíntesis?", "¿Y eso para qué sirve?", "¿Quién es él?",
+                     "explícamelo otra vez", "¿Cuál es la capital de Francia?", "dime más"]:
+        print(f"{question!r:36} → {'con historial' if session.history_for(question) else 'sin historial'}")
+
+    # Una pregunta frecuente repetida en el tercer turno sale de la caché de ask()
+    import ai.gemini as gemini
+    calls = []
+    gemini._generate = lambda prompt, *args, **kwargs: calls.append(prompt) or f"Respuesta {len(calls)}"
+    chat = ConversationSession(summarizer=_fake_summarizer)
+    for question in ["¿Qué es la fotosíntesis?", "¿Y eso para qué sirve?", "¿Qué es la fotosíntesis?"]:
+        answer = gemini.ask(question, history=chat.history_for(question))
+        chat.add_turn(question, answer)
+    print(f"Llamadas al modelo en 3 turnos: {len(calls)} (la repetida salió de la caché: {len(calls) == 2})")
@@ -0,0 +1,93 @@
+"""
+ai/turn.py — Turno combinado: clasificar, responder y extraer memoria en una sola llamada a Gemini
+"""
+
+import json
+
+from ai.client import get_client
+from ai.classifier import intents_prompt, intent_schema_properties, sanitize_classification
+from ai.memory import memory_context as relevant_memory
+
+# Intenciones que se resuelven con el texto de "answer" sin ejecutar el plugin
+DIRECT_ANSWER_INTENTS = {"general_chat", "recall", "remember"}
+
+_TURN_PROMPT = """
+Eres Nuevi, la asistente IA personal de Ramiro. En UNA sola respuesta debes:
+1. Clasificar la intención del mensaje.
+2. Si la intención es {answer_intents}, redactar la respuesta para el usuario
+   (concisa, amigable, en español, máximo 3 oraciones). Para el resto deja "answer" vacío.
+3. Decidir si el mensaje contiene información que deba guardarse en memoria a largo plazo
+   (preference, personal_info, project_info, reminder_info o none).
+
+{intents}
+Datos de la memoria del usuario relacionados con el mensaje:
+{memory_context}
+
+Contexto actual: {context_summary}
+
+Conversación reciente:
+{history}
+
+Reglas:
+- Si no estás seguro de la intención, usa 'general_chat'.
+- Para recall responde solo con la memoria; si no hay nada relevante dilo con naturalidad.
+"""
+
+_MEMORY_SCHEMA = {
+    "type": "OBJECT",
+    "properties": {
+        "store": {"type": "BOOLEAN"},
+        "type": {"type": "STRING", "enum": ["preference", "personal_info", "project_info", "reminder_info", "none"]},
+        "key": {"type": "STRING", "description": "clave corta en snake_case"},
+        "value": {"type": "STRING", "description": "información limpia y resumida"},
+    },
+    # Con store=false el modelo deja key y value vacíos, pero nunca los omite
+    "required": ["store", "type", "key", "value"],
+}
+
+def _turn_schema() -> dict:
+    properties = dict(intent_schema_properties())
+    properties["answer"] = {"type": "STRING", "description": "respuesta para el usuario o cadena vacía"}
+    properties["memory"] = _MEMORY_SCHEMA
+    return {"type": "OBJECT", "properties": properties, "required": ["intent", "answer", "memory"]}
+
+def run_turn(text: str, context_summary: str = "", history: str = "",
+             answer_intents: set = DIRECT_ANSWER_INTENTS) -> dict | None:
+    """
+    Resuelve intención, parámetros, respuesta directa y memoria a guardar con una única petición.
+    Retorna {"intent", "parameters", "answer", "memory"} o None si la llamada falla
+    (el orquestador vuelve entonces al flujo de llamadas separadas).
+    'history' es el bloque de ConversationSession.history_block().
+    'answer_intents' son las intenciones cuya respuesta se redacta aquí; sin general_chat,
+    la charla se devuelve sin respuesta para hablarla en streaming.
+    """
+    try:
+        # Solo los hechos relevantes (BM25 local): el prompt no crece con toda la memoria
+        memory_context = relevant_memory(text) or "(ninguno)"
+        # replace() y no format(): el bloque de intenciones contiene llaves JSON
+        prompt = (_TURN_PROMPT
+                  .replace("{answer_intents}", " o ".join(sorted(answer_intents)))
+                  .replace("{intents}", intents_prompt())
+                  .replace("{memory_context}", memory_context)
+                  .replace("{context_summary}", context_summary or "desconocido")
+                  .replace("{history}", history or "(inicio de la conversación)"))
+        response = get_client().generate(
+            text,
+            config={
+                'system_instruction': prompt,
+                'response_mime_type': 'application/json',
+                'response_schema': _turn_schema(),
+            },
+            task="chat",
+            call_site="run_turn",
+        )
+        data = json.loads(response.text)
+        if not isinstance(data, dict) or not data.get("intent"):
+            return None
+        turn = sanitize_classification(data, text)
+        turn["answer"] = (data.get("answer") or "").strip() if turn["intent"] in answer_intents else ""
+        turn["memory"] = data.get("memory") or {}
+        return turn
+    except Exception as e:
+        print(f"[Nuvia Turn] Error: {e}")
+        return None
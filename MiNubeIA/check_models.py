@@ -1,6 +1,7 @@
 from google import genai
 import os
 from dotenv import load_dotenv
+from ai.router import get_router
 
 load_dotenv()
 api_key = os.getenv("GEMINI_API_KEY")
@@ -11,9 +12,16 @@ if not api_key:
 
 client = genai.Client(api_key=api_key)
 
+# Modelos que usa el router para cada tarea (marcados con * en el listado)
+routed = {}
+for task, models in get_router().routes.items():
+    for m in models:
+        routed.setdefault(m, []).append(task)
+
 print("--- Modelos disponibles para tu API Key ---")
 try:
     for model in client.models.list():
-        print(f"ID: {model.name} | Display Name: {model.display_name}")
+        mark = f" * [{', '.join(routed[model.name])}]" if model.name in routed else ""
+        print(f"ID: {model.name} | Display Name: {model.display_name}{mark}")
 except Exception as e:
     print(f"Error al listar modelos: {e}")
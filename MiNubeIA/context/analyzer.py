@@ -3,15 +3,76 @@ context/analyzer.py — Analiza el contexto activo y toma capturas si es necesar
 """
 
 import os
-import pathlib
 import logging
-from mss import mss
-from datetime import datetime
+import threading
+from collections.abc import Mapping
+
+from context.capture import get_capturer, Capture
+from core.cache import PerceptualCache
+from ai.scheduler import Priority
 
 logger = logging.getLogger("NuviaContext")
 
-# Carpeta para capturas efímeras
-CONTEXT_ASSETS = pathlib.Path(__file__).parent.parent / "assets" / "context"
+# Sugerencias por (app, rol, huella de la pantalla): una pantalla casi igual
+# (≤ tolerancia bits de 64) reutiliza la respuesta sin volver a subir la imagen.
+_suggestion_cache = PerceptualCache(
+    max_entries=64,
+    ttl=float(os.getenv("NUVIA_SUGGEST_CACHE_TTL", 600)),
+    tolerance=int(os.getenv("NUVIA_SUGGEST_HASH_TOLERANCE", 6)),
+)
+
+
+def suggestion_cache_stats() -> dict:
+    return _suggestion_cache.stats()
+
+
+class LazyContext(Mapping):
+    """
+    Contexto de solo lectura para plugins y prompts. Los campos baratos (app, título,
+    resumen) se calculan al crearlo; la captura de pantalla solo se toma la primera vez
+    que alguien lee 'has_screenshot', 'screenshot' (Capture en memoria) o 'screenshot_path'.
+    """
+
+    _LAZY_KEYS = ("has_screenshot", "screenshot", "screenshot_path")
+
+    def __init__(self, data: dict, capture=None):
+        self._data = dict(data)
+        self._capture = capture
+        self._captured = capture is None
+        self._lock = threading.Lock()
+        for key in self._LAZY_KEYS:
+            self._data.setdefault(key, False if key == "has_screenshot" else None)
+
+    def _ensure_capture(self):
+        with self._lock:
+            if self._captured:
+                return
+            self._captured = True
+            shot = self._capture()
+            self._data["has_screenshot"] = shot is not None
+            self._data["screenshot"] = shot
+            self._data["screenshot_path"] = shot.path if shot else None
+
+    @property
+    def captured(self) -> bool:
+        """True si ya se tomó (o no hacía falta) la captura."""
+        return self._captured
+
+    def __getitem__(self, key):
+        if key in self._LAZY_KEYS:
+            self._ensure_capture()
+        return self._data[key]
+
+    def __iter__(self):
+        return iter(self._data)
+
+    def __len__(self):
+        return len(self._data)
+
+    def __repr__(self):
+        shown = {k: v for k, v in self._data.items() if k not in self._LAZY_KEYS or self._captured}
+        return f"LazyContext({shown}, captura={'tomada' if self._captured else 'pendiente'})"
+
 
 class ContextAnalyzer:
     """
@@ -25,15 +86,14 @@ class ContextAnalyzer:
             "Figma", "Blender", "Unity", "Unrealeditor", "Cursor",
             "Chrome", "Edge" # Añadimos navegadores por utilidad
         ]
-        
-        CONTEXT_ASSETS.mkdir(parents=True, exist_ok=True)
 
-    def analyze(self, context_data: dict) -> dict:
+    def analyze(self, context_data: dict) -> LazyContext:
         """
-        Analiza los datos del detector y añade captura de pantalla si la app es relevante.
+        Analiza los datos del detector. Si la app es relevante, la captura de pantalla
+        queda preparada pero no se toma hasta que un plugin o prompt de visión la pida.
         """
         if not context_data:
-            return {"summary": "No hay una ventana activa detectada."}
+            return LazyContext({"summary": "No hay una ventana activa detectada."})
 
         app_name = context_data.get("app_name", "")
         window_title = context_data.get("window_title", "")
@@ -41,64 +101,64 @@ class ContextAnalyzer:
         result = {
             "app_name": app_name,
             "window_title": window_title,
-            "has_screenshot": False,
-            "screenshot_path": None,
             "summary": f"El usuario está usando {app_name} en la ventana '{window_title}'."
         }
 
-        # Comprobar si debemos tomar captura
-        if any(creative in app_name for creative in self.creative_apps):
-            screenshot_path = self._take_screenshot()
-            if screenshot_path:
-                result["has_screenshot"] = True
-                result["screenshot_path"] = screenshot_path
-                result["summary"] += " He tomado una captura de pantalla para analizar el contenido visualmente."
+        # Solo las apps relevantes admiten captura; se toma en el primer acceso
+        if self.is_relevant(app_name):
+            return LazyContext(result, capture=lambda: self._take_screenshot(self._current_rect(context_data)))
+        return LazyContext(result)
+
+    @staticmethod
+    def _current_rect(context_data: dict):
+        """Rectángulo de la ventana al momento de capturar (pudo moverse o cambiar de tamaño)."""
+        window_id = context_data.get("window_id")
+        if window_id is not None:
+            from context.tracker import get_tracker
+            rect = get_tracker().window_rect(window_id)
+            if rect:
+                return rect
+        return context_data.get("rect")
+
+    def _take_screenshot(self, rect=None) -> Capture | None:
+        """Captura la ventana activa (o la pantalla principal), reescalada y codificada en memoria."""
+        return get_capturer().capture(rect)
+
+    def expert_role(self, app_name: str) -> str:
+        """Rol de experto con el que se piden las sugerencias según la app."""
+        if "Code" in app_name or "Cursor" in app_name:
+            return "Senior Software Developer"
+        elif "Premiere" in app_name or "AfterFX" in app_name:
+            return "Editor de Video Profesional"
+        elif any(x in app_name for x in ["Photoshop", "Illustrator", "Figma"]):
+            return "Diseñador Gráfico y de UI/UX experto"
+        return "Asistente experto"
 
-        return result
+    def is_relevant(self, app_name: str) -> bool:
+        """¿La app merece captura de pantalla y sugerencias?"""
+        return any(creative in (app_name or "") for creative in self.creative_apps)
 
-    def _take_screenshot(self) -> str | None:
-        """Toma captura de la pantalla principal."""
-        try:
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            filename = CONTEXT_ASSETS / f"ctx_{timestamp}.png"
-            
-            with mss() as sct:
-                # Captura la pantalla 1
-                sct.shot(output=str(filename))
-                
-            logger.info(f"Captura de contexto guardada: {filename}")
-            return str(filename)
-        except Exception as e:
-            logger.error(f"Error al tomar captura: {e}")
+    def cached_suggestions(self, context_data: dict, screenshot: Capture | None) -> dict | None:
+        """Sugerencias ya calculadas para una pantalla casi igual, o None."""
+        if screenshot is None or screenshot.phash is None:
             return None
+        app_name = context_data.get("app_name", "")
+        return _suggestion_cache.get((app_name, self.expert_role(app_name)), screenshot.phash)
 
-    def clean_old_screenshots(self, max_files=10):
-        """Mantiene la carpeta limpia eliminando capturas viejas."""
-        files = sorted(CONTEXT_ASSETS.glob("ctx_*.png"), key=os.path.getmtime)
-        while len(files) > max_files:
-            try:
-                os.remove(files.pop(0))
-            except:
-                pass
-
-    def generate_context_suggestions(self, context_data: dict, screenshot_path: str = None) -> dict:
+    def request_suggestions(self, context_data: dict, screenshot_path: str = None,
+                            screenshot: Capture | None = None, priority: Priority = Priority.INTERACTIVE,
+                            call_site: str = "generate_context_suggestions") -> dict:
         """
-        Genera sugerencias inteligentes basadas en la app activa usando Gemini.
+        Pide las sugerencias al modelo (sin mirar la caché) y las guarda por huella.
+        Lanza una excepción si la llamada falla (p. ej. descartada por carga o con
+        el circuito abierto) o si la respuesta no es un JSON válido.
         """
         import json
         from ai.gemini import ask
 
         app_name = context_data.get("app_name", "")
         window_title = context_data.get("window_title", "")
-        
-        # Determinar el rol del experto
-        role = "Asistente experto"
-        if "Code" in app_name or "Cursor" in app_name:
-            role = "Senior Software Developer"
-        elif "Premiere" in app_name or "AfterFX" in app_name:
-            role = "Editor de Video Profesional"
-        elif any(x in app_name for x in ["Photoshop", "Illustrator", "Figma"]):
-            role = "Diseñador Gráfico y de UI/UX experto"
+        role = self.expert_role(app_name)
 
         prompt = f"""
         Actúa como un {role}.
@@ -115,25 +175,62 @@ class ContextAnalyzer:
         }}
         """
 
+        # Llamada multimodal a Gemini
+        if screenshot is not None:
+            raw_response = ask(prompt, image_data=screenshot.data, mime_type=screenshot.mime_type,
+                               call_site=call_site, priority=priority, raise_errors=True)
+        else:
+            raw_response = ask(prompt, image_path=screenshot_path, call_site=call_site, priority=priority,
+                               raise_errors=True)
+
+        # Limpieza básica de JSON si Gemini incluye markdown
+        clean_json = raw_response.strip()
+        if "```json" in clean_json:
+            clean_json = clean_json.split("```json")[1].split("```")[0].strip()
+
+        suggestions = json.loads(clean_json)
+        if screenshot is not None and screenshot.phash is not None:
+            _suggestion_cache.put((app_name, role), screenshot.phash, suggestions)
+        return suggestions
+
+    def generate_context_suggestions(self, context_data: dict, screenshot_path: str = None,
+                                     screenshot: Capture | None = None) -> dict:
+        """
+        Genera sugerencias inteligentes basadas en la app activa usando Gemini.
+        Con 'screenshot' (Capture) la imagen se envía desde memoria, sin leer disco,
+        y si la pantalla apenas cambió desde una petición anterior (o el prefetch de
+        context/prefetch.py ya la analizó) se responde desde caché.
+        """
+        cached = self.cached_suggestions(context_data, screenshot)
+        if cached is not None:
+            logger.info("Pantalla sin cambios: sugerencias desde caché")
+            return cached
+
         try:
-            # Llamada multimodal a Gemini
-            raw_response = ask(prompt, image_path=screenshot_path)
-            
-            # Limpieza básica de JSON si Gemini incluye markdown
-            clean_json = raw_response.strip()
-            if "```json" in clean_json:
-                clean_json = clean_json.split("```json")[1].split("```")[0].strip()
-            
-            return json.loads(clean_json)
+            return self.request_suggestions(context_data, screenshot_path, screenshot)
         except Exception as e:
             logger.error(f"Error generando sugerencias contextuales: {e}")
             return {
-                "mode": role,
+                "mode": self.expert_role(context_data.get("app_name", "")),
                 "suggestions": "No pude analizar tu pantalla en este momento, pero parece que estás concentrado en tu trabajo.",
                 "priority_actions": []
             }
 
+
+_analyzer = None
+_analyzer_lock = threading.Lock()
+
+def get_analyzer() -> ContextAnalyzer:
+    """Analizador compartido por el orquestador, los plugins y el prefetch."""
+    global _analyzer
+    with _analyzer_lock:
+        if _analyzer is None:
+            _analyzer = ContextAnalyzer()
+        return _analyzer
+
 if __name__ == "__main__":
     # Prueba rápida
     analyzer = ContextAnalyzer()
-    print(analyzer.analyze({"app_name": "Code", "window_title": "analyzer.py - MiNubeIA"}))
+    context = analyzer.analyze({"app_name": "Code", "window_title": "analyzer.py - MiNubeIA"})
+    print(context)
+    print(context.get("screenshot"), context)
@@ -0,0 +1,215 @@
+"""
+context/capture.py — Capturas para prompts de visión: recorte a la ventana, reescalado y codificación en memoria
+"""
+
+import io
+import os
+import time
+import atexit
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from core.artifacts import get_artifacts
+
+logger = logging.getLogger("NuviaContext")
+
+# Lado mayor de la imagen enviada al modelo: por encima no mejora la lectura y solo pesa más
+_MAX_SIDE = int(os.getenv("NUVIA_CAPTURE_MAX_SIDE", 1280))
+_FORMAT = os.getenv("NUVIA_CAPTURE_FORMAT", "JPEG").upper()  # JPEG o WEBP
+_QUALITY = int(os.getenv("NUVIA_CAPTURE_QUALITY", 80))
+# Guardar también en disco (depuración); por defecto la captura solo vive en memoria.
+# Se guardan en el almacén de artefactos (categoría "context"), con presupuesto de espacio.
+_SAVE = os.getenv("NUVIA_SAVE_CAPTURES", "0") == "1"
+_MIN_CROP = 64  # ventanas más pequeñas (minimizadas, fuera de pantalla) → pantalla completa
+
+_MIME_TYPES = {"JPEG": "image/jpeg", "WEBP": "image/webp", "PNG": "image/png"}
+_HASH_SIZE = 8  # dHash de 8x8 → 64 bits
+
+
+def dhash(image, size: int = _HASH_SIZE) -> int:
+    """
+    Huella perceptual (difference hash): escala de grises reducida a (size+1)×size
+    y un bit por cada par de píxeles vecinos (¿el de la izquierda es más claro?).
+    Pantallas casi iguales (cursor, reloj, un carácter) dan huellas a poca distancia de Hamming.
+    """
+    from PIL import Image
+
+    small = image.convert("L").resize((size + 1, size), Image.BILINEAR)
+    pixels = list(small.getdata())
+    value = 0
+    for row in range(size):
+        offset = row * (size + 1)
+        for col in range(size):
+            value = (value << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    return value
+
+
+def hamming(a: int, b: int) -> int:
+    return (a ^ b).bit_count()
+
+
+class Capture:
+    """Imagen lista para el modelo: bytes codificados, su tipo MIME y tamaños."""
+
+    def __init__(self, data: bytes, mime_type: str, size: tuple, source_size: tuple,
+                 image=None, path: str | None = None, elapsed_ms: float = 0.0, phash: int | None = None):
+        self.data = data
+        self.mime_type = mime_type
+        self.size = size
+        self.source_size = source_size
+        self.image = image  # PIL.Image reescalada (para huellas o miniaturas sin volver a decodificar)
+        self.path = path
+        self.elapsed_ms = elapsed_ms
+        self.phash = phash  # dHash de 64 bits para reconocer pantallas sin cambios
+
+    def __len__(self):
+        return len(self.data)
+
+    def __repr__(self):
+        return (f"Capture({self.mime_type}, {self.size[0]}x{self.size[1]} de "
+                f"{self.source_size[0]}x{self.source_size[1]}, {len(self.data) // 1024} KB, "
+                f"{self.elapsed_ms:.0f} ms)")
+
+
+def _clip(rect, monitor: dict) -> dict | None:
+    """Intersección de (izq, arriba, der, abajo) con el escritorio virtual, en formato mss."""
+    if not rect:
+        return None
+    left, top, right, bottom = rect
+    left = max(left, monitor["left"])
+    top = max(top, monitor["top"])
+    right = min(right, monitor["left"] + monitor["width"])
+    bottom = min(bottom, monitor["top"] + monitor["height"])
+    if right - left < _MIN_CROP or bottom - top < _MIN_CROP:
+        return None
+    return {"left": left, "top": top, "width": right - left, "height": bottom - top}
+
+
+class ScreenCapturer:
+    """
+    Un único grabber de mss, propiedad de un hilo de captura dedicado: mss no se
+    puede compartir entre hilos, crearlo en cada captura cuesta más que la captura
+    misma y cada orden llega en un hilo nuevo (que dejaría su grabber sin cerrar).
+    Recorta a la ventana activa si se conoce su rectángulo, reescala y codifica en memoria.
+    """
+
+    def __init__(self, max_side: int = _MAX_SIDE, fmt: str = _FORMAT, quality: int = _QUALITY,
+                 save: bool = _SAVE):
+        self.max_side = max_side
+        self.fmt = fmt if fmt in _MIME_TYPES else "JPEG"
+        self.quality = quality
+        self.save = save
+        self._sct = None  # solo lo toca el hilo de captura
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _worker(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="nuvia-capture")
+                atexit.register(self.close)
+            return self._executor
+
+    def close(self):
+        """Cierra el grabber (en su hilo) y detiene el hilo de captura."""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.submit(self._close_grabber).result()
+            executor.shutdown()
+
+    def _close_grabber(self):
+        if self._sct is not None:
+            self._sct.close()
+            self._sct = None
+
+    def grab(self, rect=None):
+        """Captura cruda (PIL.Image RGB) de la ventana 'rect' o, si no hay, del monitor principal."""
+        return self._worker().submit(self._grab, rect).result()
+
+    def _grab(self, rect):
+        from PIL import Image
+
+        if self._sct is None:
+            from mss import mss
+            self._sct = mss()
+        sct = self._sct
+        region = _clip(rect, sct.monitors[0]) or sct.monitors[1]
+        shot = sct.grab(region)
+        return Image.frombytes("RGB", shot.size, shot.bgra, "raw", "BGRX")
+
+    def encode(self, image) -> tuple:
+        """Reescala (lado mayor ≤ max_side) y codifica en memoria. Retorna (bytes, tamaño, imagen reescalada)."""
+        from PIL import Image
+
+        if max(image.size) > self.max_side:
+            image = image.copy()
+            image.thumbnail((self.max_side, self.max_side), Image.LANCZOS)
+        buffer = io.BytesIO()
+        if self.fmt == "PNG":
+            image.save(buffer, format="PNG", optimize=True)
+        else:
+            image.save(buffer, format=self.fmt, quality=self.quality)
+        return buffer.getvalue(), image.size, image
+
+    def capture(self, rect=None) -> Capture | None:
+        """Captura lista para enviar al modelo, o None si falló."""
+        start = time.perf_counter()
+        try:
+            raw = self.grab(rect)
+            data, size, image = self.encode(raw)
+            phash = dhash(image)
+        except Exception as e:
+            logger.error(f"Error al tomar captura: {e}")
+            return None
+
+        path = None
+        if self.save:
+            path = self._write(data, size)
+        result = Capture(data, _MIME_TYPES[self.fmt], size, raw.size, image=image, path=path,
+                         elapsed_ms=(time.perf_counter() - start) * 1000, phash=phash)
+        logger.info(f"Captura de contexto: {result}")
+        return result
+
+    def _write(self, data: bytes, size: tuple) -> str | None:
+        try:
+            extension = "jpg" if self.fmt == "JPEG" else self.fmt.lower()
+            return str(get_artifacts().put("context", data, extension, meta={"size": list(size)}))
+        except OSError as e:
+            logger.warning(f"No se pudo guardar la captura: {e}")
+            return None
+
+
+_capturer = None
+_capturer_lock = threading.Lock()
+
+def get_capturer() -> ScreenCapturer:
+    global _capturer
+    with _capturer_lock:
+        if _capturer is None:
+            _capturer = ScreenCapturer()
+        return _capturer
+
+
+if __name__ == "__main__":
+    # Prueba rápida: reescalado y codificación de una imagen 4K sintética
+    from PIL import Image
+
+    capturer = ScreenCapturer()
+    source = Image.effect_noise((3840, 2160), 40).convert("RGB")
+    for fmt in ["PNG", "JPEG", "WEBP"]:
+        capturer.fmt = fmt
+        start = time.perf_counter()
+        if fmt == "PNG":
+            buffer = io.BytesIO()
+            source.save(buffer, format="PNG")
+            data, size = buffer.getvalue(), source.size
+        else:
+            data, size, _ = capturer.encode(source)
+        print(f"{fmt:5} {size[0]}x{size[1]}: {len(data) // 1024} KB en {(time.perf_counter() - start) * 1000:.0f} ms")
+
+    # Huella perceptual: la misma imagen con un pequeño cambio queda a pocos bits
+    tocada = source.copy()
+    tocada.paste((255, 255, 255), (100, 100, 140, 120))
+    print(f"dHash distancia (cambio pequeño): {hamming(dhash(source), dhash(tocada))} bits")
@@ -4,46 +4,37 @@ context/detector.py — Detecta la aplicación y ventana activa en Windows
 
 import time
 from datetime import datetime
-import psutil
-import win32gui
-import win32process
 import logging
 
+from context.tracker import get_tracker
+
 logger = logging.getLogger("NuviaContext")
 
 class ActiveWindowDetector:
     """
     Clase para obtener información sobre la ventana y proceso actualmente en foco.
+    Lee del FocusTracker (hilo en segundo plano), así el comando no espera a Win32 ni a psutil.
     """
 
-    @staticmethod
-    def get_current_context() -> dict:
+    def __init__(self, tracker=None):
+        self.tracker = tracker or get_tracker()
+
+    def get_current_context(self) -> dict:
         """
         Retorna un diccionario con el nombre de la app, el título de la ventana y el proceso.
         """
         try:
-            # Obtener el handle de la ventana activa
-            hwnd = win32gui.GetForegroundWindow()
-            if not hwnd:
+            record = self.tracker.current()
+            if not record:
                 return {}
 
-            # Obtener el título de la ventana
-            window_title = win32gui.GetWindowText(hwnd)
-
-            # Obtener el PID del proceso
-            _, pid = win32process.GetWindowThreadProcessId(hwnd)
-            
-            # Obtener info del proceso usando psutil
-            process = psutil.Process(pid)
-            process_name = process.name()
-            # A veces el nombre de la app es más amigable si quitamos el .exe
-            app_name = process_name.replace(".exe", "").capitalize()
-
             return {
-                "app_name": app_name,
-                "window_title": window_title,
-                "process_name": process_name,
-                "timestamp": datetime.now().isoformat()
+                "app_name": record["app_name"],
+                "window_title": record["window_title"],
+                "process_name": record["process_name"],
+                "window_id": record.get("window_id"),
+                "rect": record.get("rect"),
+                "timestamp": record["timestamp"]
             }
         except Exception as e:
             logger.error(f"Error detectando contexto: {e}")
@@ -54,6 +45,10 @@ class ActiveWindowDetector:
                 "timestamp": datetime.now().isoformat()
             }
 
+    def recent_focus(self, minutes: float = 60) -> dict:
+        """Segundos por aplicación en los últimos 'minutes' minutos."""
+        return self.tracker.time_by_app(since=time.time() - minutes * 60)
+
 if __name__ == "__main__":
     # Prueba rápida
     detector = ActiveWindowDetector()
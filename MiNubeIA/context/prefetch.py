@@ -0,0 +1,164 @@
+"""
+context/prefetch.py — Precalcula sugerencias de contexto en segundo plano al cambiar de aplicación
+"""
+
+import os
+import time
+import logging
+import threading
+from collections import deque
+
+from ai.client import CircuitOpenError
+from ai.scheduler import Priority, LoadShedError
+from context.analyzer import get_analyzer
+from context.tracker import get_tracker
+
+logger = logging.getLogger("NuviaContext")
+
+_ENABLED = os.getenv("NUVIA_PREFETCH", "0") == "1"  # opcional: cada precálculo es una llamada de visión
+_DEBOUNCE = float(os.getenv("NUVIA_PREFETCH_DEBOUNCE", 20))   # segundos con el mismo foco antes de precalcular
+_PER_HOUR = int(os.getenv("NUVIA_PREFETCH_PER_HOUR", 12))     # tope de llamadas de prefetch por hora
+
+
+class HourlyBudget:
+    """
+    Ventana deslizante de una hora: como mucho 'per_hour' gastos en los últimos 3600 s.
+    Se consulta con remaining() antes de la llamada y se carga con spend() si la petición llegó a enviarse.
+    """
+
+    def __init__(self, per_hour: int):
+        self.per_hour = per_hour
+        self._spent = deque()
+        self._lock = threading.Lock()
+
+    def _expire(self, now: float):
+        while self._spent and now - self._spent[0] >= 3600:
+            self._spent.popleft()
+
+    def spend(self):
+        now = time.monotonic()
+        with self._lock:
+            self._expire(now)
+            self._spent.append(now)
+
+    def remaining(self) -> int:
+        now = time.monotonic()
+        with self._lock:
+            self._expire(now)
+            return max(0, self.per_hour - len(self._spent))
+
+
+class ContextPrefetcher:
+    """
+    Escucha los cambios de foco del FocusTracker. Cuando el usuario se queda
+    'debounce' segundos en una app relevante, toma la captura y pide las
+    sugerencias con prioridad PREFETCH (el planificador las descarta si hay
+    carga). El resultado queda en la caché por huella del analizador, así que
+    "dame sugerencias" sobre esa pantalla responde al instante.
+    Un único hilo hace el trabajo; la captura en sí pasa por el hilo de context/capture.py.
+    """
+
+    def __init__(self, tracker=None, analyzer=None, debounce: float = _DEBOUNCE, per_hour: int = _PER_HOUR):
+        self.tracker = tracker or get_tracker()
+        self.analyzer = analyzer or get_analyzer()
+        self.debounce = debounce
+        self.budget = HourlyBudget(per_hour)
+        self._cond = threading.Condition()
+        self._pending = None  # (id de ventana, vence_en)
+        self._running = False
+        self._thread = None
+        self.stats = {"scheduled": 0, "prefetched": 0, "cached": 0, "over_budget": 0, "failed": 0}
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._running = True
+        self.tracker.subscribe(self._on_focus)
+        self._thread = threading.Thread(target=self._run, name="nuvia-prefetch", daemon=True)
+        self._thread.start()
+        logger.info(f"Prefetch de contexto activo ({self.debounce:.0f} s de foco, "
+                    f"{self.budget.per_hour} llamadas/hora)")
+
+    def stop(self):
+        with self._cond:
+            self._running = False
+            self._cond.notify()
+
+    def _on_focus(self, record: dict, previous):
+        """Cada cambio de foco reinicia la espera; las apps no relevantes la cancelan."""
+        with self._cond:
+            if record and self.analyzer.is_relevant(record.get("app_name", "")):
+                self._pending = (record["window_id"], time.monotonic() + self.debounce)
+                self.stats["scheduled"] += 1
+            else:
+                self._pending = None
+            self._cond.notify()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                if not self._running:
+                    return
+                if self._pending is None:
+                    self._cond.wait()
+                    continue
+                window_id, due = self._pending
+                delay = due - time.monotonic()
+                if delay > 0:
+                    self._cond.wait(delay)
+                    continue  # puede haber cambiado el foco mientras tanto
+                self._pending = None
+            record = self.tracker.current()
+            if record and record["window_id"] == window_id:
+                self.prefetch(record)
+
+    def prefetch(self, record: dict) -> str:
+        """Precalcula las sugerencias para el foco 'record'. Retorna el resultado para métricas."""
+        context = self.analyzer.analyze(record)
+        screenshot = context.get("screenshot")
+        if screenshot is None:
+            outcome = "failed"
+        elif self.analyzer.cached_suggestions(context, screenshot) is not None:
+            outcome = "cached"  # la pantalla no cambió desde la última vez: no se gasta presupuesto
+        elif not self.budget.remaining():
+            outcome = "over_budget"
+        else:
+            try:
+                self.analyzer.request_suggestions(context, screenshot=screenshot, priority=Priority.PREFETCH,
+                                                  call_site="prefetch_context_suggestions")
+                self.budget.spend()
+                outcome = "prefetched"
+            except (LoadShedError, CircuitOpenError) as e:
+                # La petición no llegó a enviarse: no gasta presupuesto
+                logger.info(f"Prefetch de sugerencias descartado: {e}")
+                outcome = "failed"
+            except Exception as e:
+                # JSON inválido, error de la API o timeout: la llamada se hizo (y se pagó)
+                self.budget.spend()
+                logger.info(f"Prefetch de sugerencias sin resultado: {e}")
+                outcome = "failed"
+        self.stats[outcome] += 1
+        logger.info(f"Prefetch de contexto ({record.get('app_name')}): {outcome}")
+        return outcome
+
+
+_prefetcher = None
+
+def start_prefetcher() -> ContextPrefetcher | None:
+    """Arranca el prefetch si NUVIA_PREFETCH=1; retorna None si está desactivado."""
+    global _prefetcher
+    if not _ENABLED:
+        return None
+    if _prefetcher is None:
+        _prefetcher = ContextPrefetcher()
+        _prefetcher.start()
+    return _prefetcher
+
+
+if __name__ == "__main__":
+    # Prueba rápida: presupuesto por hora
+    budget = HourlyBudget(3)
+    for _ in range(5):
+        if budget.remaining():
+            budget.spend()
+    print(f"Gastos: {len(budget._spent)}, quedan: {budget.remaining()}")
@@ -0,0 +1,276 @@
+"""
+context/tracker.py — Seguimiento en segundo plano de la ventana en foco con historial en memoria
+"""
+
+import sys
+import time
+import logging
+import threading
+from collections import deque
+from datetime import datetime
+
+logger = logging.getLogger("NuviaContext")
+
+_POLL_INTERVAL = 0.25  # s; GetForegroundWindow es barato, psutil solo se llama al cambiar de proceso
+_HISTORY = 256
+_PID_CACHE_SIZE = 512
+
+
+# ── Backends ──────────────────────────────────────────────────────────────────
+
+class FocusBackend:
+    """Interfaz de plataforma: qué ventana tiene el foco y a qué proceso pertenece."""
+
+    def foreground(self) -> tuple | None:
+        """Retorna (id_ventana, título, pid) de la ventana en foco, o None."""
+        raise NotImplementedError
+
+    def process_name(self, pid: int) -> str:
+        raise NotImplementedError
+
+    def process_identity(self, pid: int) -> tuple:
+        """(pid, momento de creación): distingue un proceso de otro que reutilice su PID."""
+        raise NotImplementedError
+
+    def window_rect(self, window_id) -> tuple | None:
+        """(izquierda, arriba, derecha, abajo) de la ventana en pantalla, o None."""
+        return None
+
+
+class Win32FocusBackend(FocusBackend):
+    """Backend de Windows (pywin32 + psutil)."""
+
+    def __init__(self):
+        import psutil
+        import win32gui
+        import win32process
+        self._psutil = psutil
+        self._win32gui = win32gui
+        self._win32process = win32process
+
+    def foreground(self):
+        hwnd = self._win32gui.GetForegroundWindow()
+        if not hwnd:
+            return None
+        _, pid = self._win32process.GetWindowThreadProcessId(hwnd)
+        return hwnd, self._win32gui.GetWindowText(hwnd), pid
+
+    def process_name(self, pid):
+        return self._psutil.Process(pid).name()
+
+    def process_identity(self, pid):
+        return pid, self._psutil.Process(pid).create_time()
+
+    def window_rect(self, window_id):
+        try:
+            return tuple(self._win32gui.GetWindowRect(window_id))
+        except Exception:
+            return None
+
+
+class FakeFocusBackend(FocusBackend):
+    """Sustituto para Linux y pruebas: el foco se fija a mano con set_focus()."""
+
+    def __init__(self, title: str = "Sin título", process_name: str = "N/A", pid: int = 0, rect=None):
+        self._lock = threading.Lock()
+        self._names = {}
+        self._starts = {}
+        self.lookups = 0
+        self.set_focus(title, process_name, pid, rect)
+
+    def set_focus(self, title: str, process_name: str, pid: int = 0, rect=None, window_id=None):
+        with self._lock:
+            self._state = (window_id if window_id is not None else hash((title, pid)), title, pid)
+            if self._names.get(pid) != process_name:
+                self._starts[pid] = time.monotonic()  # otro proceso con el mismo PID
+            self._names[pid] = process_name
+            self._rect = rect
+
+    def foreground(self):
+        with self._lock:
+            return self._state
+
+    def process_name(self, pid):
+        with self._lock:
+            self.lookups += 1
+            return self._names.get(pid, "N/A")
+
+    def process_identity(self, pid):
+        with self._lock:
+            return pid, self._starts.get(pid, 0.0)
+
+    def window_rect(self, window_id):
+        with self._lock:
+            return self._rect
+
+
+def default_backend() -> FocusBackend:
+    if sys.platform == "win32":
+        try:
+            return Win32FocusBackend()
+        except ImportError as e:
+            logger.warning(f"Backend Win32 no disponible ({e}); se usa el sustituto")
+    return FakeFocusBackend()
+
+
+# ── Tracker ───────────────────────────────────────────────────────────────────
+
+def _app_name(process_name: str) -> str:
+    # A veces el nombre de la app es más amigable si quitamos el .exe
+    return process_name.replace(".exe", "").capitalize()
+
+
+class FocusTracker:
+    """
+    Hilo que sondea el foco cada 'interval' segundos y registra cada cambio
+    (ventana o título) en un buffer circular. current() es una lectura O(1)
+    del último registro, sin llamadas al sistema en el hilo del comando.
+    """
+
+    def __init__(self, backend: FocusBackend | None = None, interval: float = _POLL_INTERVAL,
+                 history: int = _HISTORY):
+        self.backend = backend or default_backend()
+        self.interval = interval
+        self._history = deque(maxlen=history)
+        self._current = None
+        self._pid_names = {}
+        self._listeners = []
+        self._lock = threading.Lock()
+        self._sample_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="nuvia-focus", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def subscribe(self, listener):
+        """listener(registro_nuevo, registro_anterior) en cada cambio de foco (desde el hilo del tracker)."""
+        self._listeners.append(listener)
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.sample()
+            except Exception as e:
+                logger.error(f"Error siguiendo el foco: {e}")
+            self._stop.wait(self.interval)
+
+    def _process_name(self, pid: int) -> str:
+        # Clave (pid, creación): si Windows reutiliza el PID, el proceso nuevo no hereda el nombre viejo
+        key = self.backend.process_identity(pid)
+        name = self._pid_names.get(key)
+        if name is None:
+            name = self.backend.process_name(pid)
+            if len(self._pid_names) >= _PID_CACHE_SIZE:
+                self._pid_names.clear()
+            self._pid_names[key] = name
+        return name
+
+    def sample(self) -> dict | None:
+        """Lee el foco una vez; si cambió, abre un registro nuevo. Retorna el registro actual."""
+        with self._sample_lock:
+            record, previous = self._sample()
+        if previous is not False:
+            for listener in list(self._listeners):
+                try:
+                    listener(record, previous)
+                except Exception as e:
+                    logger.error(f"Error notificando cambio de foco: {e}")
+        return record
+
+    def _sample(self) -> tuple:
+        """Retorna (registro actual, registro anterior) o (actual, False) si el foco no cambió."""
+        state = self.backend.foreground()
+        if state is None:
+            return self._current, False
+        window_id, title, pid = state
+        current = self._current
+        if current and current["window_id"] == window_id and current["window_title"] == title:
+            return current, False
+
+        try:
+            process_name = self._process_name(pid)
+        except Exception:
+            process_name = "N/A"  # el proceso murió entre la lectura del foco y la consulta
+        now = time.time()
+        record = {
+            "app_name": _app_name(process_name),
+            "window_title": title,
+            "process_name": process_name,
+            "pid": pid,
+            "window_id": window_id,
+            "rect": self.backend.window_rect(window_id),
+            "since": now,
+            "timestamp": datetime.fromtimestamp(now).isoformat(),
+        }
+        with self._lock:
+            previous = self._current
+            if previous is not None:
+                previous["until"] = now
+            self._current = record
+            self._history.append(record)
+        return record, previous
+
+    def window_rect(self, window_id) -> tuple | None:
+        """Rectángulo actual de la ventana (se lee al momento: pudo moverse desde el cambio de foco)."""
+        try:
+            return self.backend.window_rect(window_id)
+        except Exception:
+            return None
+
+    def current(self) -> dict | None:
+        """Último registro de foco (copia). Si el hilo aún no arrancó, se sondea una vez."""
+        with self._lock:
+            current = self._current
+        if current is None:
+            current = self.sample()
+        return dict(current) if current else None
+
+    def history(self, since: float | None = None, limit: int | None = None) -> list[dict]:
+        """Registros recientes (más antiguos primero), opcionalmente desde un timestamp."""
+        with self._lock:
+            records = [dict(r) for r in self._history if since is None or r.get("until", time.time()) >= since]
+        return records[-limit:] if limit else records
+
+    def time_by_app(self, since: float | None = None) -> dict:
+        """Segundos en foco por aplicación desde 'since' (para "¿en qué estaba trabajando?")."""
+        now = time.time()
+        totals = {}
+        for record in self.history(since):
+            start = max(record["since"], since or 0)
+            totals[record["app_name"]] = totals.get(record["app_name"], 0.0) + max(0.0, record.get("until", now) - start)
+        return dict(sorted(totals.items(), key=lambda x: x[1], reverse=True))
+
+
+_tracker = None
+_tracker_lock = threading.Lock()
+
+def get_tracker() -> FocusTracker:
+    """Tracker compartido; se arranca en el primer uso."""
+    global _tracker
+    with _tracker_lock:
+        if _tracker is None:
+            _tracker = FocusTracker()
+            _tracker.start()
+        return _tracker
+
+
+if __name__ == "__main__":
+    # Prueba rápida con el backend sustituto
+    backend = FakeFocusBackend("main.py - MiNubeIA", "Code.exe", pid=10)
+    tracker = FocusTracker(backend, interval=0.05)
+    tracker.start()
+    for title, proc, pid in [("Figma", "Figma.exe", 20), ("YouTube - Chrome", "chrome.exe", 30), ("Figma", "Figma.exe", 20)]:
+        time.sleep(0.2)
+        backend.set_focus(title, proc, pid)
+    time.sleep(0.2)
+    print(tracker.current())
+    print(tracker.time_by_app())
+    print(f"Consultas de nombre de proceso: {backend.lookups}")
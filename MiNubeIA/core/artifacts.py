@@ -0,0 +1,230 @@
+"""
+core/artifacts.py — Almacén de archivos generados (capturas, imágenes) direccionado por contenido y con presupuesto
+"""
+
+import os
+import json
+import time
+import hashlib
+import pathlib
+import sqlite3
+import logging
+import threading
+
+logger = logging.getLogger("NuviaArtifacts")
+
+_ROOT = pathlib.Path(__file__).parent.parent / "assets"
+_INDEX_FILE = "artifacts.db"
+
+# Presupuesto por categoría: (bytes, archivos). Al pasarse, el conserje borra los de acceso más antiguo.
+_BUDGETS = {
+    "context": (int(os.getenv("NUVIA_CONTEXT_BUDGET_MB", 50)) * 1024 * 1024, 200),
+    "generated": (int(os.getenv("NUVIA_GENERATED_BUDGET_MB", 500)) * 1024 * 1024, 1000),
+}
+_DEFAULT_BUDGET = (100 * 1024 * 1024, 500)
+
+# Archivos con nombre por fecha de versiones anteriores: se adoptan una vez en el almacén
+_LEGACY = {"context": "ctx_*.*", "generated": "nuvia_*.jpg"}
+
+
+class ArtifactStore:
+    """
+    Archivos en assets/<categoría>/<2 primeros hex>/<hash>.<ext>:
+    - El nombre es el hash del contenido: dos capturas o imágenes idénticas son un solo archivo
+      y no hay colisiones por nombres con la misma marca de tiempo.
+    - Un índice SQLite guarda tamaño, fechas y metadatos; el uso por categoría se lleva
+      en memoria, así comprobar el presupuesto no recorre directorios.
+    - Un hilo conserje borra en segundo plano lo que exceda el presupuesto (LRU por último acceso).
+    """
+
+    def __init__(self, root: pathlib.Path | str = _ROOT, budgets: dict | None = None):
+        self.root = pathlib.Path(root)
+        self.budgets = dict(_BUDGETS if budgets is None else budgets)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.root / _INDEX_FILE, check_same_thread=False, timeout=10)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        with self._conn:
+            self._conn.execute("""CREATE TABLE IF NOT EXISTS artifacts (
+                category TEXT NOT NULL,
+                hash TEXT NOT NULL,
+                ext TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL,
+                meta TEXT,
+                PRIMARY KEY (category, hash)
+            )""")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_artifacts_lru ON artifacts (category, accessed_at)")
+        self._usage = {
+            category: [total, count] for category, total, count in self._conn.execute(
+                "SELECT category, SUM(size), COUNT(*) FROM artifacts GROUP BY category"
+            )
+        }
+        self._wake = threading.Event()
+        self._running = False
+        self._thread = None
+
+    def budget(self, category: str) -> tuple:
+        return self.budgets.get(category, _DEFAULT_BUDGET)
+
+    def _path(self, category: str, digest: str, ext: str) -> pathlib.Path:
+        return self.root / category / digest[:2] / f"{digest}.{ext}"
+
+    # ── API ───────────────────────────────────────────────────────────────────
+
+    def put(self, category: str, data: bytes, ext: str, meta: dict | None = None) -> pathlib.Path:
+        """Guarda 'data' (o reutiliza el archivo idéntico ya guardado) y retorna su ruta."""
+        digest = hashlib.sha1(data).hexdigest()
+        path = self._path(category, digest, ext)
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT ext FROM artifacts WHERE category = ? AND hash = ?",
+                                     (category, digest)).fetchone()
+            if row is not None and path.exists():
+                with self._conn:
+                    self._conn.execute("UPDATE artifacts SET accessed_at = ? WHERE category = ? AND hash = ?",
+                                       (now, category, digest))
+                return path
+
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_suffix(".tmp")
+            tmp.write_bytes(data)
+            os.replace(tmp, path)
+            with self._conn:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO artifacts (category, hash, ext, size, created_at, accessed_at, meta) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (category, digest, ext, len(data), now, now, json.dumps(meta or {}, ensure_ascii=False)),
+                )
+            usage = self._usage.setdefault(category, [0, 0])
+            if row is None:
+                usage[0] += len(data)
+                usage[1] += 1
+            over = self._over_budget(category)
+        if over:
+            self._wake.set()
+        return path
+
+    def touch(self, path: pathlib.Path | str):
+        """Marca un artefacto como usado (lo aleja del desalojo)."""
+        path = pathlib.Path(path)
+        with self._lock, self._conn:
+            self._conn.execute("UPDATE artifacts SET accessed_at = ? WHERE category = ? AND hash = ?",
+                               (time.time(), path.parent.parent.name, path.stem))
+
+    def usage(self, category: str | None = None) -> dict:
+        """{categoría: {"bytes", "count", "max_bytes", "max_count"}}."""
+        with self._lock:
+            categories = [category] if category else list(self._usage)
+            return {
+                c: {"bytes": self._usage.get(c, [0, 0])[0], "count": self._usage.get(c, [0, 0])[1],
+                    "max_bytes": self.budget(c)[0], "max_count": self.budget(c)[1]}
+                for c in categories
+            }
+
+    def _over_budget(self, category: str) -> bool:
+        total, count = self._usage.get(category, (0, 0))
+        max_bytes, max_count = self.budget(category)
+        return total > max_bytes or count > max_count
+
+    # ── Conserje ──────────────────────────────────────────────────────────────
+
+    def start(self):
+        """Arranca el conserje; en la primera pasada adopta archivos sueltos de versiones anteriores."""
+        if self._thread is not None:
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="nuvia-janitor", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._running = False
+        self._wake.set()
+
+    def _run(self):
+        try:
+            self._adopt_legacy()
+        except Exception as e:
+            logger.warning(f"No se pudieron adoptar los archivos antiguos: {e}")
+        self._wake.set()
+        while True:
+            self._wake.wait()
+            self._wake.clear()
+            if not self._running:
+                return
+            try:
+                self.enforce()
+            except Exception as e:
+                logger.error(f"Error aplicando el presupuesto de artefactos: {e}")
+
+    def enforce(self, category: str | None = None) -> int:
+        """Borra los artefactos de acceso más antiguo hasta volver al presupuesto. Retorna los borrados."""
+        removed = 0
+        for name in [category] if category else list(self._usage):
+            while True:
+                with self._lock:
+                    if not self._over_budget(name):
+                        break
+                    victims = self._conn.execute(
+                        "SELECT hash, ext, size FROM artifacts WHERE category = ? ORDER BY accessed_at LIMIT 20",
+                        (name,),
+                    ).fetchall()
+                    if not victims:
+                        self._usage[name] = [0, 0]
+                        break
+                    usage = self._usage[name]
+                    for digest, ext, size in victims:
+                        if not self._over_budget(name):
+                            break
+                        self._path(name, digest, ext).unlink(missing_ok=True)
+                        with self._conn:
+                            self._conn.execute("DELETE FROM artifacts WHERE category = ? AND hash = ?", (name, digest))
+                        usage[0] -= size
+                        usage[1] -= 1
+                        removed += 1
+        if removed:
+            logger.info(f"Conserje: {removed} artefactos borrados por presupuesto")
+        return removed
+
+    def _adopt_legacy(self):
+        for category, pattern in _LEGACY.items():
+            directory = self.root / category
+            if not directory.is_dir():
+                continue
+            adopted = 0
+            for path in sorted(directory.glob(pattern), key=os.path.getmtime):
+                if not path.is_file():
+                    continue
+                self.put(category, path.read_bytes(), path.suffix.lstrip(".").lower() or "bin",
+                         meta={"legacy_name": path.name})
+                path.unlink()
+                adopted += 1
+            if adopted:
+                logger.info(f"{adopted} archivos antiguos de '{category}' movidos al almacén de artefactos")
+
+
+_store = None
+_store_lock = threading.Lock()
+
+def get_artifacts() -> ArtifactStore:
+    """Almacén compartido; el conserje arranca en el primer uso."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = ArtifactStore()
+            _store.start()
+        return _store
+
+
+if __name__ == "__main__":
+    # Prueba rápida: deduplicación y presupuesto en una carpeta temporal
+    import tempfile
+
+    store = ArtifactStore(tempfile.mkdtemp(), budgets={"context": (10_000, 5)})
+    first = store.put("context", b"captura" * 100, "jpg")
+    again = store.put("context", b"captura" * 100, "jpg")
+    print(f"Deduplicado: {first == again} → {first.name}")
+    for i in range(12):
+        store.put("context", os.urandom(1500) + bytes([i]), "jpg")
+    print(f"Borrados: {store.enforce()}, uso: {store.usage('context')}")
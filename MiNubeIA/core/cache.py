@@ -0,0 +1,269 @@
+"""
+core/cache.py — Caché LRU con caducidad (TTL) y persistencia opcional en disco
+"""
+
+import json
+import atexit
+import logging
+import os
+import pathlib
+import threading
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger("NuviaCache")
+
+_SAVE_DELAY = 2.0  # s; los cambios se agrupan y se escriben en segundo plano
+
+
+class TTLCache:
+    """
+    Caché clave → valor con desalojo LRU y caducidad por entrada.
+    Si se indica 'path', el contenido se guarda en JSON y sobrevive a reinicios;
+    la escritura se agrupa y la hace un temporizador 'save_delay' segundos después
+    del primer cambio (y flush() al salir), nunca el hilo que llama a put().
+    'version' permite invalidar todo el contenido cuando cambia lo que lo generó
+    (por ejemplo, el conjunto de plugins).
+    """
+
+    def __init__(self, max_entries: int = 256, ttl: float = 3600, path: pathlib.Path | None = None, version: str = "",
+                 save_delay: float = _SAVE_DELAY):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.path = pathlib.Path(path) if path else None
+        self.version = version
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()  # clave -> (expira_en, valor)
+        self._lock = threading.Lock()
+        self.save_delay = save_delay
+        self._dirty = False
+        self._timer = None
+        self._save_lock = threading.Lock()  # ordena las escrituras del temporizador y de flush()
+        if self.path:
+            self._load()
+            atexit.register(self.flush)
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            expires_at, value = entry
+            if expires_at < time.time():
+                del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value, ttl: float | None = None):
+        with self._lock:
+            self._data[key] = (time.time() + (ttl if ttl is not None else self.ttl), value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+            self._save()
+
+    def set_version(self, version: str):
+        """Vacía la caché si la versión cambió."""
+        with self._lock:
+            if version == self.version:
+                return
+            if self._data:
+                logger.info(f"Versión cambiada ({self.version or '-'} → {version}), vaciando caché.")
+            self.version = version
+            self._data.clear()
+            self._save()
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._save()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"entries": len(self._data), "hits": self.hits, "misses": self.misses}
+
+    def __len__(self):
+        return len(self._data)
+
+    # ── Persistencia ──────────────────────────────────────────────────────────
+
+    def _load(self):
+        if not self.path.exists():
+            return
+        try:
+            raw = json.loads(self.path.read_text(encoding="utf-8"))
+        except Exception as e:
+            logger.warning(f"Caché ilegible en {self.path}, se descarta: {e}")
+            return
+        file_version = raw.get("version", "")
+        if self.version and file_version != self.version:
+            return
+        # Sin versión explícita adoptamos la del archivo; set_version() decidirá después
+        self.version = file_version
+        now = time.time()
+        for key, expires_at, value in raw.get("entries", []):
+            if expires_at > now:
+                self._data[key] = (expires_at, value)
+
+    def _save(self):
+        """Programa la escritura diferida. Se llama con el lock tomado."""
+        if not self.path:
+            return
+        self._dirty = True
+        if self._timer is None:
+            self._timer = threading.Timer(self.save_delay, self.flush)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def flush(self):
+        """Escribe ya los cambios pendientes (atómico: archivo temporal + replace)."""
+        with self._save_lock:
+            with self._lock:
+                timer, self._timer = self._timer, None
+                if not self._dirty:
+                    return
+                self._dirty = False
+                payload = {
+                    "version": self.version,
+                    "entries": [[k, exp, v] for k, (exp, v) in self._data.items()],
+                }
+            if timer is not None and timer is not threading.current_thread():
+                timer.cancel()
+            self._write(payload)
+
+    def _write(self, payload: dict):
+        try:
+            tmp = self.path.with_suffix(self.path.suffix + ".tmp")
+            tmp.write_text(json.dumps(payload, ensure_ascii=False), encoding="utf-8")
+            os.replace(tmp, self.path)
+        except Exception as e:
+            logger.error(f"No se pudo guardar la caché en {self.path}: {e}")
+
+
+class SingleFlight:
+    """
+    Fusiona llamadas concurrentes con la misma clave: solo la primera ejecuta
+    la función y las demás esperan y reciben el mismo resultado (o excepción).
+    """
+
+    class _Call:
+        def __init__(self):
+            self.event = threading.Event()
+            self.result = None
+            self.error = None
+
+    def __init__(self):
+        self.shared = 0
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, fn):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = self._Call()
+            else:
+                self.shared += 1
+
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.event.set()
+
+
+class PerceptualCache:
+    """
+    Caché por huella perceptual: dentro de un mismo 'scope' (p. ej. app y rol),
+    una huella a distancia de Hamming ≤ 'tolerance' de otra guardada es un acierto.
+    Las huellas se reparten en tolerance+1 bandas de bits: dos huellas que difieren
+    en ≤ tolerance bits coinciden exactamente en al menos una banda, así que solo se
+    comparan las entradas que comparten cubeta con la consulta.
+    """
+
+    def __init__(self, max_entries: int = 64, ttl: float = 600, tolerance: int = 6, bits: int = 64):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.tolerance = tolerance
+        self.hits = 0
+        self.misses = 0
+        self._bands = tolerance + 1
+        self._band_bits = -(-bits // self._bands)
+        self._mask = (1 << self._band_bits) - 1
+        self._entries = OrderedDict()  # id -> (scope, huella, expira_en, valor)
+        self._buckets = {}             # (scope, banda, valor de la banda) -> {id}
+        self._next_id = 0
+        self._lock = threading.Lock()
+
+    def _bucket_keys(self, scope, phash: int):
+        return [(scope, i, (phash >> (i * self._band_bits)) & self._mask) for i in range(self._bands)]
+
+    def get(self, scope, phash: int, default=None):
+        """Valor de la entrada más parecida dentro de la tolerancia (o 'default')."""
+        now = time.time()
+        with self._lock:
+            candidates = set()
+            for key in self._bucket_keys(scope, phash):
+                candidates |= self._buckets.get(key, set())
+            best, best_distance = None, self.tolerance + 1
+            for entry_id in candidates:
+                entry_scope, entry_hash, expires_at, _ = self._entries[entry_id]
+                if expires_at < now:
+                    continue
+                distance = (entry_hash ^ phash).bit_count()
+                if distance < best_distance:
+                    best, best_distance = entry_id, distance
+            if best is None:
+                self.misses += 1
+                return default
+            self._entries.move_to_end(best)
+            self.hits += 1
+            return self._entries[best][3]
+
+    def put(self, scope, phash: int, value, ttl: float | None = None):
+        with self._lock:
+            entry_id = self._next_id
+            self._next_id += 1
+            self._entries[entry_id] = (scope, phash, time.time() + (ttl if ttl is not None else self.ttl), value)
+            for key in self._bucket_keys(scope, phash):
+                self._buckets.setdefault(key, set()).add(entry_id)
+            while len(self._entries) > self.max_entries:
+                self._evict(next(iter(self._entries)))
+
+    def _evict(self, entry_id):
+        scope, phash, _, _ = self._entries.pop(entry_id)
+        for key in self._bucket_keys(scope, phash):
+            bucket = self._buckets.get(key)
+            if bucket is not None:
+                bucket.discard(entry_id)
+                if not bucket:
+                    del self._buckets[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._buckets.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+    def __len__(self):
+        return len(self._entries)
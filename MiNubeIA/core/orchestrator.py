@@ -4,16 +4,27 @@ Coordina voz, contexto, clasificación, plugins, memoria e IA.
 Sincronizado con la interfaz tkinter (CloudWindow).
 """
 
+import os
 import logging
 import threading
 import time
 from voice.listen import VoiceListener
-from voice.speak import speak, set_voice_callbacks
-from ai.classifier import classify_intent
-from ai.gemini import ask
-from ai.memory import process_memory_storage, query_memory
+from voice.speak import speak, set_voice_callbacks, interrupt_speech
+from ai.classifier import classify_intent, classify_local, learn_classification
+from ai.gemini import ask, ask_stream
+from ai.memory import query_memory, store_memory_item
+from ai.memory_pipeline import get_pipeline
+from ai.turn import run_turn, DIRECT_ANSWER_INTENTS
+from ai.session import ConversationSession
+from ai.episodic import get_episodic_log
+from ai.memory_store import get_store
+from ai.reminders import ReminderScheduler, reminder_listener
+from ai.accounting import get_accountant
 from context.detector import ActiveWindowDetector
-from context.analyzer import ContextAnalyzer
+from context.analyzer import get_analyzer
+from context.prefetch import start_prefetcher
+from system.app_index import get_app_index
+from system.window_index import get_window_index
 from core.plugin_manager import plugin_manager
 from ui.nube import CloudWindow
 
@@ -21,6 +32,13 @@ from ui.nube import CloudWindow
 logging.basicConfig(level=logging.INFO, format='%(asctime)s [%(levelname)s] %(name)s: %(message)s')
 logger = logging.getLogger("NuviaOrchestrator")
 
+# Turno combinado (una sola llamada a Gemini por frase). NUVIA_COMBINED_TURN=0 vuelve al flujo clásico.
+_COMBINED_TURN = os.getenv("NUVIA_COMBINED_TURN", "1") != "0"
+# Respuestas de Gemini habladas oración a oración según llegan. NUVIA_STREAMING=0 lo desactiva.
+_STREAMING = os.getenv("NUVIA_STREAMING", "1") != "0"
+# Con streaming, el turno combinado solo clasifica la charla general: la respuesta se habla según llega
+_TURN_ANSWER_INTENTS = DIRECT_ANSWER_INTENTS - {"general_chat"} if _STREAMING else DIRECT_ANSWER_INTENTS
+
 class Orchestrator:
     """
     Orquestador central que implementa la arquitectura de 7 pasos:
@@ -35,8 +53,19 @@ class Orchestrator:
         
         # 2. Componentes de Contexto
         self.detector = ActiveWindowDetector()
-        self.analyzer = ContextAnalyzer()
+        self.analyzer = get_analyzer()
         
+        # Cancelación del turno en curso cuando llega un comando nuevo
+        self._cancel_event = threading.Event()
+        self._turn_lock = threading.Lock()
+
+        # Historial de la conversación (turnos recientes + resumen acotado)
+        self.session = ConversationSession()
+
+        # Recordatorios: los reminder_info con fecha que entran en memoria se programan solos
+        self.reminders = ReminderScheduler(on_fire=self._on_reminder)
+        get_store().subscribe(reminder_listener(self.reminders))
+
         # 3. Gestor de Plugins
         # LLamamos a load_plugins aquí para evitar que el import circular en plugins/
         # bloquee la inicialización del singleton en core/plugin_manager
@@ -62,6 +91,15 @@ class Orchestrator:
         
         # Iniciar listener en hilo separado (no bloqueante)
         self.listener.start()
+        self.reminders.start()
+
+        # Índice de aplicaciones para open_app: se carga del disco y se refresca en segundo plano
+        get_app_index()
+        # Índice de ventanas para window_control: se refresca en segundo plano tras cada cambio de foco
+        get_window_index()
+
+        # Sugerencias de contexto precalculadas al cambiar de app (opcional, NUVIA_PREFETCH=1)
+        self.prefetcher = start_prefetcher()
         
         # Iniciar la interfaz web
         # NOTA: webview.start() bloquea el hilo principal.
@@ -88,6 +126,14 @@ class Orchestrator:
 
     # --- Callbacks de Sincronización UI ---
 
+    def _on_reminder(self, text: str, late: bool):
+        """Entrega un recordatorio vencido (lo llama el hilo del ReminderScheduler)."""
+        try:
+            self.ui.set_state("reminder")
+        except: pass
+        prefix = "Ramiro, se me pasó avisarte antes: " if late else "Ramiro, te recuerdo: "
+        speak(prefix + text)
+
     def _update_ui_listening(self):
         """Notifica a la UI que estamos escuchando."""
         try:
@@ -124,58 +170,151 @@ class Orchestrator:
         logger.info(f"Entrada recibida: '{text}'")
         self._update_ui_thinking()
 
+        # Un comando nuevo cancela la respuesta anterior (stream en curso y habla pendiente)
+        with self._turn_lock:
+            self._cancel_event.set()
+            cancel_event = threading.Event()
+            self._cancel_event = cancel_event
+        interrupt_speech()
+
         # Ejecutar el flujo pesado en un hilo para no congelar la UI si hay red lenta
-        threading.Thread(target=self._orchestrate_flow, args=(text,), daemon=True).start()
+        threading.Thread(target=self._orchestrate_flow, args=(text, cancel_event), daemon=True).start()
 
-    def _orchestrate_flow(self, text: str):
+    def _orchestrate_flow(self, text: str, cancel_event: threading.Event | None = None):
         """Flujo de decisión lógica (Paso 2 al 7)."""
+        cancel_event = cancel_event or threading.Event()
         try:
             # 1. Obtener contexto actual (Windows Apps/Ventanas)
             raw_context = self.detector.get_current_context()
             context = self.analyzer.analyze(raw_context)
 
-            # 2. Clasificar intención usando el Classifier (Gemini)
-            intent_data = classify_intent(text)
-            intent = intent_data.get("intent", "general_chat")
-            params = intent_data.get("parameters", {})
-            logger.info(f"Intención detectada: {intent}")
-
-            # 3. Almacenamiento proactivo en memoria (Background)
-            threading.Thread(target=process_memory_storage, args=(text,), daemon=True).start()
-
-            # 4. DECISIÓN DE EJECUCIÓN
-            
-            # A. ¿Es un intent local soportado por un plugin?
-            response_data = plugin_manager.execute_plugin(intent, params, context)
-            
-            if response_data:
-                # El plugin devolvió (fuente, texto, extra)
-                _, response_text, _ = response_data
-            else:
-                # B. Si no hay plugin, intentamos memoria o Gemini directo
-                memory_ans = query_memory(text)
-                if memory_ans:
-                    response_text = memory_ans
-                else:
-                    # Fallback a Gemini con el contexto de la aplicación abierta
-                    prompt = text
-                    if context.get("summary"):
-                        prompt = f"[CONTEXTO ACTUAL: {context['summary']}]\n{text}"
-                    response_text = ask(prompt)
+            # 2-4. Clasificar, memorizar y ejecutar (turno combinado o llamadas separadas)
+            response_text = self._combined_flow(text, context, cancel_event) if _COMBINED_TURN else None
+            if response_text is None:
+                response_text = self._classic_flow(text, context, cancel_event)
 
             # 5. ENTREGA DE RESPUESTA (Voz)
-            # El speak activará automáticamente la boca vía los callbacks configurados
-            logger.info(f"Nuevi responde: {response_text}")
-            speak(response_text)
+            # "" significa que la respuesta ya se habló por streaming
+            if response_text and not cancel_event.is_set():
+                # El speak activará automáticamente la boca vía los callbacks configurados
+                logger.info(f"Nuevi responde: {response_text}")
+                self._record_turn(text, response_text)
+                speak(response_text)
 
         except Exception as e:
             logger.error(f"Error crítico en el orquestador: {e}")
             speak("Lo siento Ramiro, tuve un problema interno al procesar eso.")
             self._update_ui_idle()
 
+    def _combined_flow(self, text: str, context: dict, cancel_event: threading.Event) -> str | None:
+        """
+        Resuelve la frase con una sola llamada a Gemini (intención + respuesta + memoria).
+        Retorna None si el turno combinado falla y hay que usar el flujo clásico.
+        """
+        # Comandos ya conocidos se clasifican sin red y no necesitan respuesta generada
+        local = classify_local(text)
+        if local and local.get("intent") not in DIRECT_ANSWER_INTENTS:
+            logger.info(f"Intención detectada (local): {local['intent']}")
+            get_pipeline().submit(text, local["intent"])
+            return self._execute_intent(local, text, context, cancel_event)
+
+        turn = run_turn(text, context.get("summary", ""), history=self.session.history_block(),
+                        answer_intents=_TURN_ANSWER_INTENTS)
+        if not turn:
+            return None
+        logger.info(f"Intención detectada (turno combinado): {turn['intent']}")
+        learn_classification(text, {"intent": turn["intent"], "parameters": turn["parameters"]})
+        try:
+            store_memory_item(turn["memory"])
+        except Exception as e:
+            # Guardar memoria es un efecto secundario: nunca debe hacer fallar la respuesta
+            logger.warning(f"No se pudo guardar la memoria del turno: {e}")
+
+        if turn["intent"] in _TURN_ANSWER_INTENTS and turn["answer"]:
+            return turn["answer"]
+        return self._execute_intent(turn, text, context, cancel_event)
+
+    def _classic_flow(self, text: str, context: dict, cancel_event: threading.Event) -> str:
+        """Flujo de llamadas separadas: clasificar, encolar para memoria (por lotes) y ejecutar."""
+        # 2. Clasificar intención usando el Classifier (Gemini)
+        intent_data = classify_intent(text)
+        logger.info(f"Intención detectada: {intent_data.get('intent', 'general_chat')}")
+
+        # 3. Almacenamiento proactivo en memoria: prefiltro local + extracción por lotes en segundo plano
+        get_pipeline().submit(text, intent_data.get("intent"))
+
+        return self._execute_intent(intent_data, text, context, cancel_event)
+
+    def _execute_intent(self, intent_data: dict, text: str, context: dict,
+                        cancel_event: threading.Event) -> str:
+        """
+        4. DECISIÓN DE EJECUCIÓN: plugin local, memoria o Gemini directo.
+        Retorna el texto a decir, o "" si ya se dijo por streaming.
+        """
+        intent = intent_data.get("intent", "general_chat")
+        params = intent_data.get("parameters", {})
+
+        # La charla general se responde en streaming en lugar de esperar al plugin
+        if _STREAMING and intent == "general_chat":
+            return self._stream_answer(params.get("message") or text, context, cancel_event)
+
+        # A. ¿Es un intent local soportado por un plugin?
+        response_data = plugin_manager.execute_plugin(intent, params, context)
+
+        if response_data:
+            # El plugin devolvió (fuente, texto, extra)
+            _, response_text, _ = response_data
+            return response_text
+
+        # B. Si no hay plugin, intentamos memoria o Gemini directo
+        memory_ans = query_memory(text)
+        if memory_ans:
+            return memory_ans
+
+        if _STREAMING:
+            return self._stream_answer(text, context, cancel_event)
+
+        # Fallback a Gemini con el contexto de la aplicación abierta
+        return ask(self._contextual_prompt(text, context), history=self.session.history_for(text))
+
+    def _contextual_prompt(self, text: str, context: dict) -> str:
+        if context.get("summary"):
+            return f"[CONTEXTO ACTUAL: {context['summary']}]\n{text}"
+        return text
+
+    def _stream_answer(self, text: str, context: dict, cancel_event: threading.Event) -> str:
+        """Habla la respuesta de Gemini oración a oración mientras se genera."""
+        def _say(sentence: str):
+            if not cancel_event.is_set():
+                speak(sentence)
+
+        answer = ask_stream(self._contextual_prompt(text, context), _say, cancel_event=cancel_event,
+                            history=self.session.history_for(text))
+        logger.info(f"Nuevi responde (streaming): {answer}")
+        if answer and not cancel_event.is_set():
+            self._record_turn(text, answer)
+        return ""
+
+    def _record_turn(self, text: str, answer: str):
+        """Guarda el intercambio en la sesión (contexto inmediato) y en la memoria episódica."""
+        self.session.add_turn(text, answer)
+        try:
+            get_episodic_log().append(text, answer)
+        except Exception as e:
+            logger.warning(f"No se pudo registrar el turno en la memoria episódica: {e}")
+
     def stop(self):
         """Detiene todos los servicios."""
         if hasattr(self, 'listener'):
             self.listener.stop()
         self.ui.close()
+        get_pipeline().flush()
+        self.reminders.stop()
+        if getattr(self, 'prefetcher', None):
+            self.prefetcher.stop()
+        try:
+            path = get_accountant().dump()
+            logger.info(f"Contabilidad de llamadas al modelo guardada en {path}")
+        except Exception as e:
+            logger.warning(f"No se pudo guardar la contabilidad de llamadas: {e}")
         logger.info("Orquestador detenido.")
@@ -3,6 +3,8 @@ core/plugin_manager.py — Gestor dinámico de plugins para intenciones
 """
 
 import os
+import json
+import hashlib
 import importlib
 import pkgutil
 import logging
@@ -13,11 +15,15 @@ class PluginManager:
     """
     Carga y administra plugins dinámicamente desde la carpeta /plugins.
     Cada plugin debe definir 'intent_name' y una función 'execute'.
+    Opcionalmente 'description' y 'parameters' ({nombre: descripción} o {nombre: [valores]}),
+    con los que se genera el catálogo de intenciones del clasificador.
     """
 
     def __init__(self, plugins_folder="plugins"):
         self.plugins_folder = plugins_folder
         self.plugins = {}
+        self.metadata = {}
+        self.version = ""
         # load_plugins() se debe llamar explícitamente después de la inicialización para evitar importaciones circulares
 
     def load_plugins(self):
@@ -44,12 +50,29 @@ class PluginManager:
                 if hasattr(module, "intent_name") and hasattr(module, "execute"):
                     intent = module.intent_name
                     self.plugins[intent] = module.execute
+                    self.metadata[intent] = {
+                        "description": getattr(module, "description", "") or intent,
+                        "parameters": dict(getattr(module, "parameters", {}) or {}),
+                    }
                     logger.info(f"Plugin registrado: [{intent}] desde {module_name}")
                 else:
                     logger.warning(f"Módulo {module_name} ignorado: falta intent_name o execute")
             except Exception as e:
                 logger.error(f"Error cargando plugin {module_name}: {e}")
 
+        self.version = self._compute_version()
+        logger.info(f"Conjunto de plugins versión {self.version}")
+
+    def _compute_version(self) -> str:
+        """Huella de las intenciones registradas y sus metadatos; cambia al añadir, quitar o editar plugins."""
+        signature = json.dumps(self.intent_catalog(), sort_keys=True, ensure_ascii=False)
+        return hashlib.sha1(signature.encode("utf-8")).hexdigest()[:12]
+
+    def intent_catalog(self) -> dict:
+        """Retorna {intent: {"description", "parameters"}} de los plugins registrados."""
+        return {intent: self.metadata.get(intent, {"description": intent, "parameters": {}})
+                for intent in sorted(self.plugins)}
+
     def execute_plugin(self, intent_name, params, context=None, memory=None):
         """
         Ejecuta el plugin correspondiente a la intención.
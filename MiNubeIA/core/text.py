@@ -0,0 +1,58 @@
+"""
+core/text.py — Normalización de texto en español compartida por cachés e índices locales
+"""
+
+import re
+import unicodedata
+
+# Muletillas y vocativos que no cambian la intención de una frase
+_FILLER_PHRASES = [
+    "por favor", "porfa", "porfavor", "a ver", "oye", "hey", "eh", "em", "mmm",
+    "bueno", "pues", "nuvia", "nuevi",
+]
+
+_NON_ALNUM = re.compile(r"[^a-z0-9]+")
+_FILLER_RE = re.compile(r"\b(?:" + "|".join(re.escape(f) for f in _FILLER_PHRASES) + r")\b")
+_SPACES = re.compile(r"\s+")
+
+
+def fold_accents(text: str) -> str:
+    """Quita tildes y diéresis (á → a, ü → u, ñ → n)."""
+    decomposed = unicodedata.normalize("NFKD", text)
+    return "".join(c for c in decomposed if not unicodedata.combining(c))
+
+
+def normalize_text(text: str, strip_fillers: bool = True) -> str:
+    """
+    Normaliza una frase para usarla como clave: minúsculas, sin tildes,
+    sin puntuación y (opcionalmente) sin muletillas.
+    """
+    if not text:
+        return ""
+    clean = fold_accents(text.lower())
+    clean = _NON_ALNUM.sub(" ", clean)
+    if strip_fillers:
+        stripped = _SPACES.sub(" ", _FILLER_RE.sub(" ", clean)).strip()
+        # Si la frase era solo muletillas ("oye nuvia") la conservamos tal cual
+        if stripped:
+            return stripped
+    return _SPACES.sub(" ", clean).strip()
+
+
+def tokenize(text: str, strip_fillers: bool = True) -> list[str]:
+    """Divide el texto normalizado en palabras."""
+    normalized = normalize_text(text, strip_fillers=strip_fillers)
+    return normalized.split() if normalized else []
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimación barata de tokens (≈ 4 caracteres por token en español)."""
+    return (len(text) + 3) // 4 if text else 0
+
+
+def truncate_tokens(text: str, max_tokens: int) -> str:
+    """Recorta el texto al presupuesto de tokens estimado, sin partir palabras."""
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    cut = text[:max_tokens * 4]
+    return cut.rsplit(" ", 1)[0] if " " in cut else cut
@@ -0,0 +1,91 @@
+"""
+core/vectors.py — Embeddings locales por n-gramas de caracteres con hashing (solo CPU)
+"""
+
+import heapq
+import math
+import zlib
+
+from core.text import normalize_text
+
+_DIMENSIONS = 1 << 18
+
+
+def embed(text: str, ngram_sizes=(3, 4), strip_fillers: bool = True) -> dict[int, float]:
+    """
+    Convierte un texto en un vector disperso {dimensión: peso} normalizado (L2).
+    Usa crc32 para que los índices sean estables entre ejecuciones.
+    """
+    normalized = normalize_text(text, strip_fillers=strip_fillers)
+    if not normalized:
+        return {}
+    padded = f" {normalized} "
+    counts = {}
+    for n in ngram_sizes:
+        for i in range(len(padded) - n + 1):
+            dim = zlib.crc32(padded[i:i + n].encode("utf-8")) % _DIMENSIONS
+            counts[dim] = counts.get(dim, 0.0) + 1.0
+    norm = math.sqrt(sum(v * v for v in counts.values()))
+    return {dim: v / norm for dim, v in counts.items()}
+
+
+def cosine(a: dict[int, float], b: dict[int, float]) -> float:
+    """Similitud coseno entre dos vectores ya normalizados."""
+    if len(a) > len(b):
+        a, b = b, a
+    return sum(v * b.get(dim, 0.0) for dim, v in a.items())
+
+
+class SparseIndex:
+    """
+    Índice invertido dimensión → [(id, peso)] para búsqueda exacta por coseno
+    sin recorrer todos los vectores. Admite altas y bajas incrementales.
+    """
+
+    def __init__(self):
+        self._postings = {}
+        self._vectors = {}
+
+    def add(self, item_id, vector: dict[int, float]):
+        if item_id in self._vectors:
+            self.remove(item_id)
+        self._vectors[item_id] = vector
+        for dim, weight in vector.items():
+            self._postings.setdefault(dim, []).append((item_id, weight))
+
+    def remove(self, item_id):
+        vector = self._vectors.pop(item_id, None)
+        if not vector:
+            return
+        for dim in vector:
+            postings = self._postings.get(dim)
+            if postings:
+                postings[:] = [p for p in postings if p[0] != item_id]
+                if not postings:
+                    del self._postings[dim]
+
+    def search(self, vector: dict[int, float], k: int = 5, min_score: float = 0.0,
+               max_query_dims: int | None = None, max_df: float | None = None) -> list[tuple]:
+        """
+        Retorna [(id, similitud)] de los k vecinos más cercanos.
+        Búsqueda aproximada opcional: solo las 'max_query_dims' dimensiones de más peso
+        de la consulta, saltando las que aparecen en más de 'max_df' (fracción) de los vectores.
+        """
+        dims = vector.items()
+        if max_query_dims:
+            dims = sorted(dims, key=lambda x: x[1], reverse=True)[:max_query_dims]
+        df_limit = max_df * len(self._vectors) if max_df and len(self._vectors) > 50 else None
+        scores = {}
+        for dim, weight in dims:
+            postings = self._postings.get(dim, ())
+            if df_limit is not None and len(postings) > df_limit:
+                continue
+            for item_id, other in postings:
+                scores[item_id] = scores.get(item_id, 0.0) + weight * other
+        return heapq.nlargest(k, ((i, s) for i, s in scores.items() if s >= min_score), key=lambda x: x[1])
+
+    def vector(self, item_id) -> dict[int, float] | None:
+        return self._vectors.get(item_id)
+
+    def __len__(self):
+        return len(self._vectors)
@@ -5,17 +5,29 @@ plugins/close_app.py — Plugin para cerrar aplicaciones
 from system.process_manager import close_app
 
 intent_name = "close_app"
+description = "Cerrar una aplicación abierta (force: yes solo si el usuario pide forzar el cierre)"
+parameters = {"app": "nombre", "force": ["yes", "no"]}
 
 def execute(params, context=None, memory=None):
     """
-    Cierra una aplicación basada en el parámetro 'app'.
+    Cierra una aplicación basada en el parámetro 'app'. Los procesos que no
+    responden solo se matan si el usuario pidió forzar el cierre ('force').
     """
     app_name = params.get("app", "")
     if not app_name:
         return ("system", "No especificaste qué aplicación cerrar.", None)
 
-    success = close_app(app_name)
-    if success:
-        return ("system", f"He cerrado {app_name}, Ramiro.", None)
-    else:
+    force = params.get("force") == "yes"
+    report = close_app(app_name, kill=force)
+    if not report["name"]:
+        if report["suggestion"]:
+            return ("system", f"No encontré {app_name} abierto. ¿Te refieres a {report['suggestion']}?", report)
         return ("system", f"No encontré el proceso {app_name} activo.", None)
+    closed = len(report["exited"]) + len(report["killed"])
+    if report["alive"] and not force:
+        return ("system", f"{app_name} no responde. ¿Quieres que fuerce el cierre?", report)
+    if report["alive"] or report["denied"]:
+        if closed:
+            return ("system", f"Cerré parte de {app_name}, pero algunos procesos siguen abiertos.", report)
+        return ("system", f"No pude cerrar {app_name}; puede que necesite permisos de administrador.", report)
+    return ("system", f"He cerrado {app_name}, Ramiro.", report)
@@ -5,6 +5,8 @@ plugins/general_chat.py — Plugin para conversaciones generales y preguntas de
 from ai.gemini import ask
 
 intent_name = "general_chat"
+description = "Conversación general o preguntas a la IA"
+parameters = {"message": "texto del usuario"}
 
 def execute(params, context=None, memory=None):
     message = params.get("message", "")
@@ -16,5 +18,5 @@ def execute(params, context=None, memory=None):
     if context and context.get("summary"):
         prompt = f"[Contexto: {context['summary']}]\n{message}"
         
-    ans = ask(prompt)
+    ans = ask(prompt, call_site="general_chat")
     return ("ai", ans, None)
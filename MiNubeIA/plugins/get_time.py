@@ -5,6 +5,8 @@ plugins/get_time.py — Plugin para obtener la hora y fecha
 from datetime import datetime
 
 intent_name = "get_time"
+description = "Consultar la hora o la fecha actual"
+parameters = {}
 
 def execute(params, context=None, memory=None):
     now = datetime.now()
@@ -3,6 +3,8 @@ plugins/hello_nuevi.py — Plugin de prueba para verificar la escalabilidad
 """
 
 intent_name = "hello_nuevi"
+description = "Prueba del sistema de plugins (solo si el usuario pide probar los plugins)"
+parameters = {}
 
 def execute(params, context=None, memory=None):
     """
@@ -5,21 +5,28 @@ plugins/open_app.py — Plugin para abrir aplicaciones
 import os
 import subprocess
 from system.commands import _find_app_path, _open
+from system.app_index import get_app_index
 
 intent_name = "open_app"
+description = "Abrir una aplicación (o enseñar otro nombre para ella: 'el editor es Visual Studio Code')"
+parameters = {"app": "nombre", "alias": "otro nombre que el usuario le da a la app, solo si lo corrige o lo enseña"}
 
 def execute(params, context=None, memory=None):
     """
-    Abre una aplicación basada en el parámetro 'app'.
+    Abre una aplicación basada en el parámetro 'app'. Si el usuario enseña un
+    nombre ('alias'), se recuerda para esa app una vez abierta.
     """
     app_name = params.get("app", "").lower()
+    alias = params.get("alias", "")
     if not app_name:
         return ("system", "No me dijiste qué aplicación abrir.", None)
 
     path = _find_app_path(app_name)
     
     if path:
-        _open(f'start "" "{path}"', shell=True)
+        if _open(f'start "" "{path}"', shell=True) and alias:
+            get_app_index().learn(alias, path)
+            return ("system", f"Abriendo {app_name}. Desde ahora, '{alias}' abrirá {app_name}.", None)
         return ("system", f"Abriendo {app_name}, Ramiro.", None)
     else:
         # Fallback a comando directo si no hay acceso directo
@@ -5,6 +5,8 @@ plugins/recall.py — Plugin para buscar información en la memoria histórica
 from ai.memory import query_memory
 
 intent_name = "recall"
+description = "Buscar algo que el usuario pidió recordar"
+parameters = {"query": "búsqueda en memoria"}
 
 def execute(params, context=None, memory=None):
     query = params.get("query", "")
@@ -0,0 +1,30 @@
+"""
+plugins/recall_conversation.py — Plugin para buscar en conversaciones pasadas (memoria episódica)
+"""
+
+from datetime import datetime
+
+from ai.episodic import get_episodic_log, parse_period
+
+intent_name = "recall_conversation"
+description = "Buscar qué dijo el usuario sobre un tema en conversaciones pasadas (ej: qué te dije ayer de X)"
+parameters = {
+    "query": "tema a buscar en las conversaciones",
+    "period": "periodo mencionado (hoy, ayer, la semana pasada, el mes pasado...) o vacío",
+}
+
+def execute(params, context=None, memory=None):
+    query = params.get("query", "")
+    if not query:
+        return ("system", "¿Sobre qué tema quieres que busque en nuestras conversaciones?", None)
+
+    since, until = parse_period(params.get("period") or "")
+    hits = get_episodic_log().search(query, k=3, since=since, until=until)
+    if not hits:
+        return ("memory", f"No encuentro conversaciones sobre {query} en ese periodo, Ramiro.", None)
+
+    partes = []
+    for hit in sorted(hits, key=lambda h: h["t"]):
+        fecha = datetime.fromtimestamp(hit["t"]).strftime("%d/%m")
+        partes.append(f"el {fecha} me dijiste: \"{hit['u']}\"")
+    return ("memory", "Encontré esto: " + "; ".join(partes) + ".", hits)
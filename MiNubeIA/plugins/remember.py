@@ -5,12 +5,14 @@ plugins/remember.py — Plugin para guardar información en memoria explícitame
 from ai.memory import process_memory_storage
 
 intent_name = "remember"
+description = "Guardar explícitamente información en memoria"
+parameters = {"info": "información a guardar"}
 
 def execute(params, context=None, memory=None):
     info = params.get("info", "")
     if not info:
         return ("system", "No me dijiste qué quieres que recuerde.", None)
     
-    # Procesamos el guardado
+    # Petición explícita: se extrae al momento, sin esperar al lote del pipeline de memoria
     process_memory_storage(info)
     return ("system", f"Entendido, Ramiro. He guardado eso en mi memoria: {info}", None)
@@ -3,16 +3,20 @@ plugins/suggest_context.py — Plugin para generar sugerencias expertas basadas
 """
 
 intent_name = "suggest_context"
+description = "Sugerencias sobre lo que el usuario tiene en pantalla"
+parameters = {"action": ["analyze"]}
 
 def execute(params, context=None, memory=None):
     if not context or not context.get("has_screenshot"):
         return ("system", "Lo siento, no tengo suficiente información visual de tu pantalla ahora mismo para darte sugerencias.", None)
     
-    from context.analyzer import ContextAnalyzer
-    analyzer = ContextAnalyzer()
+    from context.analyzer import get_analyzer
+    analyzer = get_analyzer()
     
     # Generar sugerencias usando la visión (Gemini Multimodal internamente)
-    suggestions_data = analyzer.generate_context_suggestions(context, context.get("screenshot_path"))
+    suggestions_data = analyzer.generate_context_suggestions(
+        context, context.get("screenshot_path"), screenshot=context.get("screenshot")
+    )
     
     mode = suggestions_data.get("mode", "Asistente")
     text = suggestions_data.get("suggestions", "No tengo sugerencias claras ahora mismo.")
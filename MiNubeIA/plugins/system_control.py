@@ -5,6 +5,8 @@ plugins/system_control.py — Plugin para control de energía (apagado/reinicio)
 import os
 
 intent_name = "system_control"
+description = "Apagar, reiniciar o cancelar el apagado del equipo"
+parameters = {"action": ["shutdown", "restart", "cancel_shutdown"]}
 
 def execute(params, context=None, memory=None):
     """
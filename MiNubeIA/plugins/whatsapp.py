@@ -5,6 +5,8 @@ plugins/whatsapp.py — Plugin para enviar mensajes de WhatsApp
 from system.whatsapp import send_whatsapp
 
 intent_name = "send_whatsapp"
+description = "Enviar un mensaje de WhatsApp"
+parameters = {"number": "ej: 34600112233", "message": "texto"}
 
 def execute(params, context=None, memory=None):
     number = params.get("number", "")
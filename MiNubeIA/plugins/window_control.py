@@ -5,19 +5,22 @@ plugins/window_control.py — Plugin para manipular estados de ventana
 from system.window_manager import minimize_window, maximize_window, switch_to_window
 
 intent_name = "window_control"
+description = "Minimizar, maximizar o cambiar a la ventana de una aplicación"
+parameters = {"app": "nombre", "action": ["minimize", "maximize", "switch"]}
 
 def execute(params, context=None, memory=None):
     app_name = params.get("app", "")
     action = params.get("action", "")
     
-    if action == "minimize":
-        minimize_window(app_name)
-        return ("system", f"Minimizando {app_name}.", None)
-    elif action == "maximize":
-        maximize_window(app_name)
-        return ("system", f"Maximizando {app_name}.", None)
-    elif action == "switch":
-        switch_to_window(app_name)
-        return ("system", f"Cambiando a la ventana de {app_name}.", None)
-        
-    return ("system", "No entendí qué quieres hacer con la ventana.", None)
+    actions = {
+        "minimize": (minimize_window, f"Minimizando {app_name}."),
+        "maximize": (maximize_window, f"Maximizando {app_name}."),
+        "switch": (switch_to_window, f"Cambiando a la ventana de {app_name}."),
+    }
+    if action not in actions:
+        return ("system", "No entendí qué quieres hacer con la ventana.", None)
+
+    handler, message = actions[action]
+    if handler(app_name):
+        return ("system", message, None)
+    return ("system", f"No encontré ninguna ventana abierta de {app_name}.", None)
@@ -0,0 +1,307 @@
+"""
+system/app_index.py — Índice persistente de aplicaciones instaladas (accesos directos y ejecutables) para open_app
+"""
+
+import os
+import json
+import time
+import bisect
+import difflib
+import pathlib
+import logging
+import threading
+
+from core.text import normalize_text
+
+logger = logging.getLogger("NuviaSystem")
+
+_INDEX_FILE = pathlib.Path(__file__).parent.parent / "app_index.json"
+_VERSION = 1
+_EXTENSIONS = (".lnk", ".exe")
+_MISS_REFRESH_INTERVAL = 30  # s; un fallo de búsqueda refresca el índice como mucho con esta frecuencia
+_ALIAS_TTL = float(os.getenv("NUVIA_ALIAS_DAYS", 90)) * 86400  # un alias no confirmado de nuevo caduca
+# Ejecutables que nunca son "la aplicación" (desinstaladores, instaladores, ayudantes)
+_NOISE = ("unins", "uninstall", "desinstalar", "setup", "installer", "update", "crash", "helper", "elevate")
+
+
+def default_roots() -> list[tuple]:
+    """(carpeta, profundidad máxima): el Menú Inicio entero y Program Files solo en sus primeros niveles."""
+    return [
+        (os.path.join(os.environ.get("ProgramData", "C:\\ProgramData"), "Microsoft\\Windows\\Start Menu\\Programs"), 8),
+        (os.path.join(os.environ.get("AppData", ""), "Microsoft\\Windows\\Start Menu\\Programs"), 8),
+        ("C:\\Program Files", 3),
+        ("C:\\Program Files (x86)", 3),
+    ]
+
+
+class _Matcher:
+    """Entradas normalizadas + índice de prefijos por palabra (lista ordenada con bisect)."""
+
+    def __init__(self, entries: list[tuple]):
+        self.entries = entries  # (nombre normalizado, compacto sin espacios, ruta, es_lnk)
+        self.by_token = {}
+        for i, (name, _, _, _) in enumerate(entries):
+            for token in set(name.split()):
+                self.by_token.setdefault(token, []).append(i)
+        self.tokens = sorted(self.by_token)
+
+    def with_prefix(self, prefix: str) -> set:
+        ids = set()
+        i = bisect.bisect_left(self.tokens, prefix)
+        while i < len(self.tokens) and self.tokens[i].startswith(prefix):
+            ids.update(self.by_token[self.tokens[i]])
+            i += 1
+        return ids
+
+
+class AppIndex:
+    """
+    Índice de .lnk y .exe bajo las carpetas raíz, guardado en app_index.json.
+    - Por cada carpeta se guarda su mtime y su listado: al refrescar solo se vuelven
+      a listar las carpetas cuyo mtime cambió (instalar o borrar algo lo cambia).
+    - Las búsquedas no tocan el disco: prefijo por palabra, subcadena y, como
+      último recurso, parecido aproximado; los accesos directos ganan a los .exe.
+    - Las correcciones explícitas del usuario enseñan alias ("el editor" → Visual Studio Code);
+      una nueva corrección los reemplaza, forget() los borra y caducan a los _ALIAS_TTL.
+    """
+
+    def __init__(self, roots: list[tuple] | None = None, path: pathlib.Path | str | None = _INDEX_FILE):
+        self.roots = roots if roots is not None else default_roots()
+        self.path = pathlib.Path(path) if path else None
+        self._dirs = {}
+        self._aliases = {}
+        self._matcher = _Matcher([])
+        self._refresh_lock = threading.Lock()
+        self._last_refresh = 0.0
+        self.ready = threading.Event()
+        self._load()
+
+    # ── Persistencia ──────────────────────────────────────────────────────────
+
+    def _load(self):
+        if not self.path or not self.path.exists():
+            return
+        try:
+            raw = json.loads(self.path.read_text(encoding="utf-8"))
+        except Exception as e:
+            logger.warning(f"Índice de apps ilegible en {self.path}, se reconstruye: {e}")
+            return
+        if raw.get("version") != _VERSION:
+            return
+        self._dirs = raw.get("dirs", {})
+        # Los alias de versiones anteriores (ruta suelta, aprendidos de cualquier lanzamiento) se descartan
+        self._aliases = {q: a for q, a in raw.get("aliases", {}).items() if isinstance(a, dict)}
+        self._rebuild()
+        self.ready.set()
+
+    def _save(self):
+        if not self.path:
+            return
+        try:
+            tmp = self.path.with_suffix(".tmp")
+            tmp.write_text(json.dumps({"version": _VERSION, "dirs": self._dirs, "aliases": self._aliases},
+                                      ensure_ascii=False), encoding="utf-8")
+            os.replace(tmp, self.path)
+        except OSError as e:
+            logger.error(f"No se pudo guardar el índice de apps: {e}")
+
+    # ── Refresco incremental ──────────────────────────────────────────────────
+
+    def refresh(self) -> int:
+        """Revisa los mtimes y vuelve a listar solo las carpetas cambiadas. Retorna cuántas se listaron."""
+        with self._refresh_lock:
+            start = time.monotonic()
+            seen = set()
+            listed = 0
+            stack = [(root, 0, max_depth) for root, max_depth in self.roots if root]
+            while stack:
+                directory, depth, max_depth = stack.pop()
+                try:
+                    mtime = os.stat(directory).st_mtime
+                except OSError:
+                    continue
+                seen.add(directory)
+                cached = self._dirs.get(directory)
+                if cached is None or cached["mtime"] != mtime:
+                    cached = self._list(directory, mtime)
+                    self._dirs[directory] = cached
+                    listed += 1
+                if depth < max_depth:
+                    stack.extend((os.path.join(directory, sub), depth + 1, max_depth) for sub in cached["subdirs"])
+
+            removed = [d for d in self._dirs if d not in seen]
+            for directory in removed:
+                del self._dirs[directory]
+            if listed or removed:
+                self._rebuild()
+                self._save()
+            self._last_refresh = time.monotonic()
+            self.ready.set()
+            logger.info(f"Índice de apps: {len(self._matcher.entries)} entradas, {listed} carpetas listadas, "
+                        f"{len(seen)} revisadas ({(time.monotonic() - start) * 1000:.0f} ms)")
+            return listed
+
+    @staticmethod
+    def _list(directory: str, mtime: float) -> dict:
+        files, subdirs = [], []
+        try:
+            with os.scandir(directory) as it:
+                for entry in it:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            subdirs.append(entry.name)
+                        elif entry.name.lower().endswith(_EXTENSIONS):
+                            files.append(entry.name)
+                    except OSError:
+                        continue
+        except OSError:
+            pass
+        return {"mtime": mtime, "files": files, "subdirs": subdirs}
+
+    def refresh_async(self):
+        threading.Thread(target=self.refresh, name="nuvia-app-index", daemon=True).start()
+
+    def _rebuild(self):
+        entries = []
+        for directory, listing in self._dirs.items():
+            for file in listing["files"]:
+                stem, ext = os.path.splitext(file)
+                name = normalize_text(stem, strip_fillers=False)
+                if not name or any(noise in name.replace(" ", "") for noise in _NOISE):
+                    continue
+                entries.append((name, name.replace(" ", ""), os.path.join(directory, file), ext.lower() == ".lnk"))
+        self._matcher = _Matcher(entries)
+
+    # ── Búsqueda ──────────────────────────────────────────────────────────────
+
+    def find(self, query: str, wait: float = 10.0) -> str | None:
+        """Ruta del acceso directo o ejecutable que mejor encaja con 'query', o None."""
+        normalized = normalize_text(query, strip_fillers=False)
+        if not normalized:
+            return None
+        alias = self._alias(normalized)
+        if alias:
+            return alias
+
+        if not self.ready.is_set():
+            self.ready.wait(wait)  # primera ejecución: el índice se está construyendo
+        path = self._best(normalized)
+        if path is None and time.monotonic() - self._last_refresh > _MISS_REFRESH_INTERVAL:
+            # ¿Recién instalada? Un refresco incremental solo lista lo que cambió
+            self.refresh()
+            path = self._best(normalized)
+        return path
+
+    def _best(self, normalized: str) -> str | None:
+        matcher = self._matcher
+        candidates = None
+        for token in normalized.split():
+            ids = matcher.with_prefix(token)
+            candidates = ids if candidates is None else candidates & ids
+        if not candidates:
+            compact = normalized.replace(" ", "")
+            candidates = {i for i, entry in enumerate(matcher.entries) if compact in entry[1]}
+        if not candidates:
+            # Aproximado ("spotfy"): solo contra las palabras con la misma inicial
+            compact = normalized.replace(" ", "")
+            lo = bisect.bisect_left(matcher.tokens, compact[0])
+            hi = bisect.bisect_left(matcher.tokens, chr(ord(compact[0]) + 1))
+            close = difflib.get_close_matches(compact, matcher.tokens[lo:hi], n=3, cutoff=0.75)
+            candidates = set().union(*(matcher.by_token[t] for t in close)) if close else set()
+        if not candidates:
+            return None
+        return matcher.entries[max(candidates, key=lambda i: self._score(matcher.entries[i], normalized))][2]
+
+    @staticmethod
+    def _score(entry: tuple, normalized: str) -> float:
+        """
+        Palabras completas > prefijos > subcadena/aproximado; dentro del mismo nivel
+        un .lnk gana a un .exe, y cada palabra de más resta ("Google Chrome" antes
+        que "Chrome Remote Desktop" y el acceso directo antes que chrome.exe).
+        """
+        name, _, _, is_lnk = entry
+        words, query = name.split(), normalized.split()
+        if all(q in words for q in query):
+            score = 200 + (10 if name == normalized else 0)
+        elif all(any(w.startswith(q) for w in words) for q in query):
+            score = 100
+        else:
+            score = 0
+        if is_lnk:
+            score += 50
+        if name.startswith(normalized):
+            score += 5
+        return score - 8 * max(0, len(words) - len(query))
+
+    # ── Alias ─────────────────────────────────────────────────────────────────
+
+    def _alias(self, normalized: str) -> str | None:
+        alias = self._aliases.get(normalized)
+        if alias is None:
+            return None
+        if time.time() - alias["at"] < _ALIAS_TTL and os.path.exists(alias["path"]):
+            return alias["path"]
+        self.forget(normalized)  # caducado o la app ya no está
+        return None
+
+    def learn(self, query: str, path: str):
+        """Recuerda que 'query' es 'path' (solo ante una corrección explícita del usuario)."""
+        normalized = normalize_text(query, strip_fillers=False)
+        if not normalized:
+            return
+        self._aliases[normalized] = {"path": path, "at": time.time()}
+        with self._refresh_lock:
+            self._save()
+
+    def forget(self, query: str) -> bool:
+        """Borra el alias de 'query'. Retorna si existía."""
+        normalized = normalize_text(query, strip_fillers=False)
+        if self._aliases.pop(normalized, None) is None:
+            return False
+        with self._refresh_lock:
+            self._save()
+        return True
+
+    def __len__(self):
+        return len(self._matcher.entries)
+
+
+_index = None
+_index_lock = threading.Lock()
+
+def get_app_index() -> AppIndex:
+    """Índice compartido; al crearlo se refresca en segundo plano (los datos guardados sirven mientras)."""
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = AppIndex()
+            _index.refresh_async()
+        return _index
+
+
+if __name__ == "__main__":
+    # Prueba rápida sobre un árbol sintético
+    import tempfile
+
+    base = pathlib.Path(tempfile.mkdtemp())
+    menu, program_files = base / "Start Menu", base / "Program Files"
+    for rel in ["Google Chrome.lnk", "Visual Studio Code/Visual Studio Code.lnk", "Spotify.lnk",
+                "Chrome Remote Desktop.lnk", "Visual Studio Code/Uninstall Visual Studio Code.lnk"]:
+        (menu / rel).parent.mkdir(parents=True, exist_ok=True)
+        (menu / rel).touch()
+    for i in range(2000):
+        (program_files / f"Vendor{i}" / "bin").mkdir(parents=True)
+        (program_files / f"Vendor{i}" / "bin" / f"tool{i}.exe").touch()
+    (program_files / "Google" / "Chrome").mkdir(parents=True)
+    (program_files / "Google" / "Chrome" / "chrome.exe").touch()
+
+    index = AppIndex([(str(menu), 8), (str(program_files), 3)], path=base / "app_index.json")
+    index.refresh()
+    print(f"Refresco sin cambios: {index.refresh()} carpetas listadas")
+    index.learn("el editor", str(menu / "Visual Studio Code" / "Visual Studio Code.lnk"))
+    for query in ["chrome", "visual studio", "code", "spotfy", "tool1234", "el editor", "photoshop"]:
+        start = time.perf_counter()
+        found = index.find(query)
+        print(f"{query!r:16} → {found and pathlib.Path(found).name} ({(time.perf_counter() - start) * 1000:.2f} ms)")
+    index.forget("el editor")
+    print(f"Tras forget: 'el editor' → {index.find('el editor')}")
@@ -34,29 +34,19 @@ def execute_intent(intent_data: dict, context=None, memory=None):
 # ── Utilidades compartidas (usadas por plugins) ──────────────────────
 
 def _find_app_path(name: str) -> str | None:
-    """Busca el ejecutable de una app en el Menú Inicio."""
-    search_paths = [
-        os.path.join(os.environ.get("ProgramData", "C:\\ProgramData"), "Microsoft\\Windows\\Start Menu\\Programs"),
-        os.path.join(os.environ.get("AppData", ""), "Microsoft\\Windows\\Start Menu\\Programs"),
-        "C:\\Program Files",
-        "C:\\Program Files (x86)"
-    ]
+    """Busca el acceso directo o ejecutable de una app en el índice persistente (system/app_index.py)."""
+    from system.app_index import get_app_index
+    return get_app_index().find(name)
 
-    for base_path in search_paths:
-        if not os.path.exists(base_path): continue
-        for root, dirs, files in os.walk(base_path):
-            for file in files:
-                if file.lower().endswith((".lnk", ".exe")) and name in file.lower():
-                    return os.path.join(root, file)
-    return None
-
-def _open(*args, shell=False):
-    """Abre un proceso sin bloquear."""
+def _open(*args, shell=False) -> bool:
+    """Abre un proceso sin bloquear. Retorna False si no se pudo lanzar."""
     try:
         subprocess.Popen(
             args[0] if shell else list(args),
             shell=shell,
             creationflags=subprocess.CREATE_NO_WINDOW if not shell else 0,
         )
+        return True
     except Exception as e:
         print(f"[Nuvia CMD] Error: {e}")
+        return False
@@ -0,0 +1,284 @@
+"""
+system/process_index.py — Índice nombre → PIDs de los procesos en ejecución y cierre por lotes con verificación
+"""
+
+import os
+import time
+import difflib
+import logging
+import threading
+
+from core.text import normalize_text
+
+logger = logging.getLogger("NuviaSystem")
+
+_REFRESH_INTERVAL = float(os.getenv("NUVIA_PROCESS_REFRESH", 5))  # s; process_iter es caro, no hace falta más
+_TERMINATE_TIMEOUT = 3.0
+_KILL_TIMEOUT = 2.0
+# Procesos del sistema que Nuvia nunca cierra aunque el nombre coincida
+_PROTECTED = {"system", "idle", "registry", "smss", "csrss", "wininit", "winlogon", "services", "lsass",
+              "svchost", "dwm", "fontdrvhost", "sihost", "ctfmon"}
+
+
+def normalize_process_name(name: str) -> str:
+    """'Chrome.exe' → 'chrome', 'Code - Insiders.exe' → 'code insiders'."""
+    name = (name or "").lower()
+    if name.endswith(".exe"):
+        name = name[:-4]
+    return normalize_text(name, strip_fillers=False)
+
+
+# ── Backends ──────────────────────────────────────────────────────────────────
+
+class ProcessBackend:
+    """Interfaz de plataforma: listar procesos y cerrarlos."""
+
+    def snapshot(self) -> list[tuple]:
+        """[(pid, nombre)] de los procesos en ejecución."""
+        raise NotImplementedError
+
+    def terminate(self, pids: list[int], expected: str, timeout: float, kill: bool) -> dict:
+        """
+        Cierra los PIDs (cuyo nombre normalizado debe seguir siendo 'expected') y espera.
+        Retorna {"exited": [...], "killed": [...], "alive": [...], "denied": [...]}.
+        """
+        raise NotImplementedError
+
+
+class PsutilProcessBackend(ProcessBackend):
+    """Backend real con psutil: terminate() a todos, una sola espera y kill() a los que queden."""
+
+    def __init__(self):
+        import psutil
+        self._psutil = psutil
+
+    def snapshot(self):
+        result = []
+        for proc in self._psutil.process_iter(["pid", "name"]):
+            if proc.info["name"]:
+                result.append((proc.info["pid"], proc.info["name"]))
+        return result
+
+    def terminate(self, pids, expected, timeout, kill):
+        psutil = self._psutil
+        report = {"exited": [], "killed": [], "alive": [], "denied": []}
+        procs = []
+        for pid in pids:
+            try:
+                proc = psutil.Process(pid)
+                if normalize_process_name(proc.name()) != expected:
+                    continue  # el PID se reutilizó desde la última instantánea
+                proc.terminate()  # intento de cierre suave
+                procs.append(proc)
+            except psutil.NoSuchProcess:
+                report["exited"].append(pid)
+            except psutil.AccessDenied:
+                report["denied"].append(pid)
+
+        gone, alive = psutil.wait_procs(procs, timeout=timeout)
+        report["exited"] += [p.pid for p in gone]
+        if alive and kill:
+            for proc in alive:
+                try:
+                    proc.kill()
+                except psutil.NoSuchProcess:
+                    pass
+                except psutil.AccessDenied:
+                    report["denied"].append(proc.pid)
+            gone, alive = psutil.wait_procs(alive, timeout=_KILL_TIMEOUT)
+            report["killed"] += [p.pid for p in gone]
+        report["alive"] = [p.pid for p in alive]
+        return report
+
+
+class FakeProcessBackend(ProcessBackend):
+    """Sustituto para Linux y pruebas: 'stubborn' ignora terminate() y solo cae con kill."""
+
+    def __init__(self, processes: dict | None = None, stubborn: set | None = None):
+        self.processes = dict(processes or {})
+        self.stubborn = set(stubborn or ())
+        self.snapshots = 0
+        self._lock = threading.Lock()
+
+    def start(self, pid: int, name: str):
+        with self._lock:
+            self.processes[pid] = name
+
+    def snapshot(self):
+        with self._lock:
+            self.snapshots += 1
+            return list(self.processes.items())
+
+    def terminate(self, pids, expected, timeout, kill):
+        report = {"exited": [], "killed": [], "alive": [], "denied": []}
+        with self._lock:
+            for pid in pids:
+                name = self.processes.get(pid)
+                if name is None:
+                    report["exited"].append(pid)
+                elif normalize_process_name(name) != expected:
+                    continue
+                elif pid not in self.stubborn:
+                    del self.processes[pid]
+                    report["exited"].append(pid)
+                elif kill:
+                    del self.processes[pid]
+                    report["killed"].append(pid)
+                else:
+                    report["alive"].append(pid)
+        return report
+
+
+def default_backend() -> ProcessBackend:
+    try:
+        return PsutilProcessBackend()
+    except ImportError as e:
+        logger.warning(f"psutil no disponible ({e}); se usa el sustituto")
+        return FakeProcessBackend()
+
+
+# ── Índice ────────────────────────────────────────────────────────────────────
+
+class ProcessIndex:
+    """
+    Instantánea nombre normalizado → {PIDs} refrescada por un hilo cada 'interval'
+    segundos, así cerrar una app no recorre todos los procesos en el momento.
+    Si el nombre pedido no está (proceso recién abierto), se refresca una vez al vuelo.
+    Solo se cierra por nombre exacto o prefijo; un parecido ("teams" ~ "steam") se
+    devuelve como sugerencia para que el usuario lo confirme.
+    """
+
+    def __init__(self, backend: ProcessBackend | None = None, interval: float = _REFRESH_INTERVAL):
+        self.backend = backend or default_backend()
+        self.interval = interval
+        self._by_name = {}
+        self._names = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self.refreshed_at = 0.0
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name="nuvia-processes", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.refresh()
+            except Exception as e:
+                logger.error(f"Error listando procesos: {e}")
+            self._stop.wait(self.interval)
+
+    def refresh(self):
+        by_name = {}
+        own_pid = os.getpid()
+        for pid, name in self.backend.snapshot():
+            normalized = normalize_process_name(name)
+            if normalized and normalized not in _PROTECTED and pid != own_pid:
+                by_name.setdefault(normalized, set()).add(pid)
+        with self._lock:
+            self._by_name = by_name
+            self._names = sorted(by_name)
+            self.refreshed_at = time.monotonic()
+
+    def match(self, query: str) -> tuple[str, set] | None:
+        """(nombre, PIDs) del proceso cuyo nombre es 'query' o empieza por él; exacto > prefijo."""
+        normalized = normalize_process_name(query)
+        if not normalized:
+            return None
+        with self._lock:
+            by_name, names = self._by_name, self._names
+        if normalized in by_name:
+            name = normalized
+        else:
+            compact = normalized.replace(" ", "")
+            candidates = [n for n in names if n.replace(" ", "").startswith(compact)]
+            if not candidates:
+                return None
+            name = min(candidates, key=len)  # "chrome" antes que "chromedriver"
+        return name, set(by_name[name])
+
+    def suggest(self, query: str) -> str | None:
+        """Nombre parecido a 'query' (subcadena o aproximado) para preguntar al usuario; nunca se cierra solo."""
+        normalized = normalize_process_name(query)
+        if not normalized:
+            return None
+        with self._lock:
+            names = self._names
+        compact = normalized.replace(" ", "")
+        candidates = [n for n in names if compact in n.replace(" ", "")] \
+            or difflib.get_close_matches(normalized, names, n=1, cutoff=0.75)
+        return min(candidates, key=len) if candidates else None
+
+    def pids(self, query: str) -> set:
+        found = self.match(query)
+        return found[1] if found else set()
+
+    def close(self, query: str, timeout: float = _TERMINATE_TIMEOUT, kill: bool = False) -> dict:
+        """
+        Cierra todos los procesos de la app en un solo lote y espera a que terminen;
+        los que no terminan solo se fuerzan con 'kill' (el usuario pidió forzar el cierre).
+        Retorna {"name", "exited", "killed", "alive", "denied", "elapsed_ms", "suggestion"}: "name" es
+        None si no había ninguno y "suggestion" el proceso parecido por el que preguntar, si lo hay.
+        """
+        start = time.monotonic()
+        found = self.match(query)
+        if found is None:
+            self.refresh()  # ¿recién abierto? la instantánea puede tener hasta 'interval' segundos
+            found = self.match(query)
+        if found is None:
+            return {"name": None, "exited": [], "killed": [], "alive": [], "denied": [], "elapsed_ms": 0.0,
+                    "suggestion": self.suggest(query)}
+
+        name, pids = found
+        logger.info(f"Cerrando {name}: {len(pids)} procesos")
+        report = self.backend.terminate(sorted(pids), name, timeout, kill)
+        finished = set(report["exited"]) | set(report["killed"])
+        with self._lock:
+            remaining = self._by_name.get(name, set()) - finished
+            if remaining:
+                self._by_name[name] = remaining
+            elif name in self._by_name:
+                del self._by_name[name]
+                self._names = sorted(self._by_name)
+        report["name"] = name
+        report["suggestion"] = None
+        report["elapsed_ms"] = round((time.monotonic() - start) * 1000, 1)
+        logger.info(f"Cierre de {name}: {len(report['exited'])} terminados, {len(report['killed'])} forzados, "
+                    f"{len(report['alive'])} siguen vivos, {len(report['denied'])} sin permiso "
+                    f"({report['elapsed_ms']:.0f} ms)")
+        return report
+
+
+_index = None
+_index_lock = threading.Lock()
+
+def get_process_index() -> ProcessIndex:
+    """Índice compartido; el hilo de refresco arranca en el primer uso."""
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = ProcessIndex()
+            _index.refresh()
+            _index.start()
+        return _index
+
+
+if __name__ == "__main__":
+    # Prueba rápida con el backend sustituto
+    backend = FakeProcessBackend({10: "chrome.exe", 11: "chrome.exe", 12: "chrome.exe", 20: "Code.exe",
+                                  30: "chromedriver.exe", 40: "svchost.exe"}, stubborn={12})
+    index = ProcessIndex(backend)
+    index.refresh()
+    for query in ["Chrome", "code", "crome", "svchost", "spotify"]:
+        print(f"{query!r:10} → {index.match(query)} (sugerencia: {index.suggest(query)})")
+    print(index.close("chrome"))
+    print(index.close("chrome", kill=True))
+    backend.start(50, "Spotify.exe")
+    print(index.close("spotify"))
@@ -2,37 +2,25 @@
 system/process_manager.py — Gestión de procesos del sistema operativo
 """
 
-import psutil
 import logging
 
+from system.process_index import get_process_index
+
 logger = logging.getLogger("NuviaSystem")
 
-def close_app(app_name: str) -> bool:
+def close_app(app_name: str, kill: bool = False) -> dict:
     """
-    Busca procesos que coincidan con app_name (parcial) y los cierra.
-    Retorna True si encontró y cerró al menos uno, False de lo contrario.
+    Cierra todos los procesos de la app cuyo nombre coincide con app_name (exacto o prefijo)
+    en un solo lote; los que no terminan a tiempo solo se fuerzan si 'kill'.
+    Retorna el informe de system/process_index.py:
+    {"name", "exited", "killed", "alive", "denied", "elapsed_ms", "suggestion"}.
     """
     if not app_name:
-        return False
-
-    name_lower = app_name.lower()
-    closed_any = False
+        return {"name": None, "exited": [], "killed": [], "alive": [], "denied": [], "elapsed_ms": 0.0,
+                "suggestion": None}
 
     logger.info(f"Intentando cerrar procesos que coincidan con: {app_name}")
-
-    for proc in psutil.process_iter(['name', 'pid']):
-        try:
-            # Comprobar si el nombre del proceso coincide
-            p_name = proc.info['name'].lower()
-            if name_lower in p_name:
-                logger.info(f"Cerrando proceso: {p_name} (PID: {proc.info['pid']})")
-                proc.terminate() # Intento de cierre suave
-                closed_any = True
-        except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess) as e:
-            logger.error(f"Error al cerrar proceso {proc.info.get('name')}: {e}")
-            continue
-
-    return closed_any
+    return get_process_index().close(app_name, kill=kill)
 
 if __name__ == "__main__":
     # Prueba rápida: Cierra el bloc de notas si está abierto
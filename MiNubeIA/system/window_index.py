@@ -0,0 +1,344 @@
+"""
+system/window_index.py — Índice de ventanas abiertas con búsqueda por título, proceso y foco reciente
+"""
+
+import os
+import time
+import difflib
+import logging
+import threading
+
+from core.text import normalize_text
+from system.process_index import normalize_process_name
+
+logger = logging.getLogger("NuviaSystem")
+
+_MAX_AGE = float(os.getenv("NUVIA_WINDOW_REFRESH", 30))  # s; además se refresca tras cada cambio de foco
+_FOCUS_DEBOUNCE = 0.3  # s; una ráfaga de cambios de foco (Alt+Tab) provoca una sola enumeración
+_PID_CACHE_SIZE = 512
+_RECENT_WINDOW = 30 * 60  # el foco de la última media hora cuenta para desempatar
+_IGNORED_TITLES = {"program manager", "nuvia", "nuevi"}
+
+
+# ── Backends ──────────────────────────────────────────────────────────────────
+
+class WindowBackend:
+    """Interfaz de plataforma: enumerar ventanas y actuar sobre ellas por id."""
+
+    def list_windows(self) -> list[tuple]:
+        """[(id, título, nombre de proceso)] de las ventanas de primer nivel visibles."""
+        raise NotImplementedError
+
+    def minimize(self, window_id) -> bool:
+        raise NotImplementedError
+
+    def maximize(self, window_id) -> bool:
+        raise NotImplementedError
+
+    def activate(self, window_id) -> bool:
+        raise NotImplementedError
+
+
+class PyGetWindowBackend(WindowBackend):
+    """Backend de Windows con pygetwindow; el proceso se resuelve con pywin32 + psutil si están."""
+
+    def __init__(self):
+        import pygetwindow
+        self._gw = pygetwindow
+        self._windows = {}
+        self._pid_names = {}
+        try:
+            import psutil
+            import win32process
+            self._psutil, self._win32process = psutil, win32process
+        except ImportError:
+            self._psutil = self._win32process = None
+
+    def _process_name(self, hwnd) -> str:
+        if self._win32process is None:
+            return ""
+        try:
+            _, pid = self._win32process.GetWindowThreadProcessId(hwnd)
+            proc = self._psutil.Process(pid)
+            # Clave (pid, creación): si Windows reutiliza el PID, el proceso nuevo no hereda el nombre viejo
+            key = (pid, proc.create_time())
+            name = self._pid_names.get(key)
+            if name is None:
+                name = proc.name()
+                if len(self._pid_names) >= _PID_CACHE_SIZE:
+                    self._pid_names.clear()
+                self._pid_names[key] = name
+            return name
+        except Exception:
+            return ""
+
+    def list_windows(self):
+        windows = {}
+        result = []
+        for window in self._gw.getAllWindows():
+            if not window.title:
+                continue
+            hwnd = window._hWnd
+            windows[hwnd] = window
+            result.append((hwnd, window.title, self._process_name(hwnd)))
+        self._windows = windows
+        return result
+
+    def _act(self, window_id, action: str) -> bool:
+        window = self._windows.get(window_id)
+        if window is None:
+            return False
+        getattr(window, action)()
+        return True
+
+    def minimize(self, window_id):
+        return self._act(window_id, "minimize")
+
+    def maximize(self, window_id):
+        return self._act(window_id, "maximize")
+
+    def activate(self, window_id):
+        return self._act(window_id, "activate")
+
+
+class FakeWindowBackend(WindowBackend):
+    """Sustituto para Linux y pruebas: ventanas fijadas a mano y registro de acciones."""
+
+    def __init__(self, windows: dict | None = None):
+        self.windows = dict(windows or {})  # id -> (título, proceso)
+        self.actions = []
+        self.enumerations = 0
+
+    def list_windows(self):
+        self.enumerations += 1
+        return [(wid, title, process) for wid, (title, process) in self.windows.items()]
+
+    def _act(self, window_id, action):
+        if window_id not in self.windows:
+            return False
+        self.actions.append((action, window_id))
+        return True
+
+    def minimize(self, window_id):
+        return self._act(window_id, "minimize")
+
+    def maximize(self, window_id):
+        return self._act(window_id, "maximize")
+
+    def activate(self, window_id):
+        return self._act(window_id, "activate")
+
+
+def default_backend() -> WindowBackend:
+    try:
+        return PyGetWindowBackend()
+    except (ImportError, NotImplementedError) as e:
+        logger.warning(f"pygetwindow no disponible ({e}); se usa el sustituto")
+        return FakeWindowBackend()
+
+
+# ── Índice ────────────────────────────────────────────────────────────────────
+
+class WindowIndex:
+    """
+    Lista de ventanas en caché, siempre caliente para los comandos: un hilo propio
+    la vuelve a enumerar 'debounce' segundos después de un cambio de foco (aviso
+    del FocusTracker) y cada 'max_age' segundos, así ni el hilo del tracker ni el
+    de la orden enumeran. Solo si una búsqueda no encuentra nada y hay un cambio
+    de foco sin enumerar aún (ventana recién abierta) se enumera en el momento.
+    La ventana elegida es la que mejor encaja por título y proceso; a igualdad,
+    la que el usuario usó más recientemente.
+    """
+
+    def __init__(self, backend: WindowBackend | None = None, tracker=None, max_age: float = _MAX_AGE,
+                 debounce: float = _FOCUS_DEBOUNCE):
+        self.backend = backend or default_backend()
+        self.tracker = tracker
+        self.max_age = max_age
+        self.debounce = debounce
+        self._entries = []
+        self._refreshed_at = 0.0
+        self._stale = True
+        self._lock = threading.Lock()
+        self._cond = threading.Condition()
+        self._due = None  # momento de la enumeración pedida por un cambio de foco
+        self._running = False
+        self._thread = None
+        if tracker is not None:
+            tracker.subscribe(self._on_focus)
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="nuvia-windows", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        with self._cond:
+            self._running = False
+            self._cond.notify()
+
+    def _on_focus(self, record, previous):
+        with self._lock:
+            self._stale = True
+        with self._cond:
+            self._due = time.monotonic() + self.debounce  # cada aviso aplaza la enumeración
+            self._cond.notify()
+
+    def _run(self):
+        next_at = time.monotonic()
+        while True:
+            with self._cond:
+                while self._running:
+                    due = next_at if self._due is None else min(next_at, self._due)
+                    delay = due - time.monotonic()
+                    if delay <= 0:
+                        break
+                    self._cond.wait(delay)
+                if not self._running:
+                    return
+                self._due = None
+            self._safe_refresh()
+            next_at = time.monotonic() + self.max_age
+
+    def _safe_refresh(self):
+        try:
+            self.refresh()
+        except Exception as e:
+            logger.error(f"Error enumerando ventanas: {e}")  # se usa la lista anterior
+            with self._lock:
+                self._stale = True
+
+    def refresh(self):
+        with self._lock:
+            self._stale = False  # un cambio de foco durante la enumeración la vuelve a marcar
+        entries = []
+        for window_id, title, process_name in self.backend.list_windows():
+            normalized = normalize_text(title, strip_fillers=False)
+            if not normalized or normalized in _IGNORED_TITLES:
+                continue
+            entries.append({
+                "id": window_id,
+                "title": title,
+                "words": normalized.split(),
+                "normalized": normalized,
+                "process": normalize_process_name(process_name),
+            })
+        with self._lock:
+            self._entries = entries
+            self._refreshed_at = time.monotonic()
+
+    def windows(self) -> list[dict]:
+        with self._lock:
+            # Sin hilo de refresco (o antes de la primera enumeración) se enumera al vuelo
+            stale = not self._refreshed_at or (self._thread is None and
+                                               time.monotonic() - self._refreshed_at > self.max_age)
+        if stale:
+            self._safe_refresh()
+        with self._lock:
+            return list(self._entries)
+
+    def _recent_focus(self) -> dict:
+        """id de ventana → último momento en que tuvo el foco (según el tracker)."""
+        if self.tracker is None:
+            return {}
+        last = {}
+        for record in self.tracker.history(since=time.time() - _RECENT_WINDOW):
+            last[record["window_id"]] = record.get("until", time.time())
+        return last
+
+    @staticmethod
+    def _match_score(entry: dict, query: str) -> float:
+        words, process = entry["words"], entry["process"]
+        terms = query.split()
+        score = 0.0
+        if all(t in words for t in terms):
+            score = 3.0
+        elif all(any(w.startswith(t) for w in words) for t in terms):
+            score = 2.0
+        elif query in entry["normalized"]:
+            score = 1.0
+        elif difflib.get_close_matches(query, words, n=1, cutoff=0.8):
+            score = 0.5
+        if process and (process == query or process.replace(" ", "") == query.replace(" ", "")):
+            score += 3.0
+        elif process and process.startswith(query):
+            score += 2.0
+        return score
+
+    def _scored(self, normalized: str) -> list[tuple]:
+        scored = [(self._match_score(e, normalized), e) for e in self.windows()]
+        return [(s, e) for s, e in scored if s > 0]
+
+    def find(self, query: str) -> dict | None:
+        """La ventana que mejor encaja con 'query' (título, proceso y foco reciente), o None."""
+        normalized = normalize_text(query, strip_fillers=False)
+        if not normalized:
+            return None
+        scored = self._scored(normalized)
+        if not scored:
+            with self._lock:
+                pending = self._stale
+            if not pending:
+                return None
+            self._safe_refresh()  # ¿ventana recién abierta? el refresco en segundo plano aún no llegó
+            scored = self._scored(normalized)
+            if not scored:
+                return None
+        recent = self._recent_focus()
+        now = time.time()
+        _, best = max(
+            scored,
+            key=lambda item: (
+                item[0] + (1.0 - min(now - recent[item[1]["id"]], _RECENT_WINDOW) / _RECENT_WINDOW
+                           if item[1]["id"] in recent else 0.0)
+            ),
+        )
+        return best
+
+    def act(self, query: str, action: str) -> dict | None:
+        """Aplica 'minimize', 'maximize' o 'activate' a la ventana elegida. Retorna la ventana o None."""
+        window = self.find(query)
+        if window is None or not getattr(self.backend, action)(window["id"]):
+            return None
+        return window
+
+
+_index = None
+_index_lock = threading.Lock()
+
+def get_window_index() -> WindowIndex:
+    """Índice compartido, enganchado a los cambios de foco del FocusTracker."""
+    global _index
+    with _index_lock:
+        if _index is None:
+            from context.tracker import get_tracker
+            _index = WindowIndex(tracker=get_tracker())
+            _index.start()
+        return _index
+
+
+if __name__ == "__main__":
+    # Prueba rápida con backends sustitutos
+    from context.tracker import FocusTracker, FakeFocusBackend
+
+    focus = FakeFocusBackend("Escritorio", "explorer.exe", pid=1)
+    tracker = FocusTracker(focus, interval=0.02)
+    backend = FakeWindowBackend({
+        1: ("main.py - MiNubeIA - Visual Studio Code", "Code.exe"),
+        2: ("YouTube - Google Chrome", "chrome.exe"),
+        3: ("Documentación de Python - Google Chrome", "chrome.exe"),
+        4: ("Nuvia", "python.exe"),
+    })
+    index = WindowIndex(backend, tracker, debounce=0.05)
+    index.start()
+    tracker.start()
+    for wid in [2, 3, 1]:
+        focus.set_focus(backend.windows[wid][0], backend.windows[wid][1], pid=wid, window_id=wid)
+        time.sleep(0.1)
+    for query in ["chrome", "youtube", "code", "visual", "crome", "spotify"]:
+        start = time.perf_counter()
+        window = index.find(query)
+        print(f"{query!r:10} → {window and window['title']} ({(time.perf_counter() - start) * 1000:.2f} ms)")
+    print(f"Enumeraciones: {backend.enumerations}")
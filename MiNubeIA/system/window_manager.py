@@ -2,58 +2,45 @@
 system/window_manager.py — Gestión de ventanas del sistema operativo
 """
 
-import pygetwindow as gw
 import logging
 
+from system.window_index import get_window_index
+
 logger = logging.getLogger("NuviaSystem")
 
 def get_active_window_title() -> str:
     """Retorna el título de la ventana activa."""
     try:
-        active = gw.getActiveWindow()
-        return active.title if active else "Escritorio"
+        from context.tracker import get_tracker
+        active = get_tracker().current()
+        return active["window_title"] if active else "Escritorio"
     except Exception as e:
         logger.error(f"Error obteniendo ventana activa: {e}")
         return "Desconocido"
 
-def minimize_window(app_name: str) -> bool:
-    """Minimiza la primera ventana que coincida con app_name."""
+def _apply(app_name: str, action: str, done: str) -> bool:
+    """Aplica la acción a la ventana que mejor coincida con app_name (ver system/window_index.py)."""
     try:
-        windows = gw.getWindowsWithTitle(app_name)
-        if windows:
-            windows[0].minimize()
-            logger.info(f"Ventana '{app_name}' minimizada.")
+        window = get_window_index().act(app_name, action)
+        if window:
+            logger.info(f"Ventana '{window['title']}' {done}.")
             return True
         return False
     except Exception as e:
-        logger.error(f"Error minimizando ventana: {e}")
+        logger.error(f"Error aplicando '{action}' a la ventana '{app_name}': {e}")
         return False
 
+def minimize_window(app_name: str) -> bool:
+    """Minimiza la ventana que mejor coincida con app_name."""
+    return _apply(app_name, "minimize", "minimizada")
+
 def maximize_window(app_name: str) -> bool:
-    """Maximiza la primera ventana que coincida con app_name."""
-    try:
-        windows = gw.getWindowsWithTitle(app_name)
-        if windows:
-            windows[0].maximize()
-            logger.info(f"Ventana '{app_name}' maximizada.")
-            return True
-        return False
-    except Exception as e:
-        logger.error(f"Error maximizando ventana: {e}")
-        return False
+    """Maximiza la ventana que mejor coincida con app_name."""
+    return _apply(app_name, "maximize", "maximizada")
 
 def switch_to_window(app_name: str) -> bool:
-    """Cambia el foco a la primera ventana que coincida con app_name."""
-    try:
-        windows = gw.getWindowsWithTitle(app_name)
-        if windows:
-            windows[0].activate()
-            logger.info(f"Cambiado foco a ventana: '{app_name}'")
-            return True
-        return False
-    except Exception as e:
-        logger.error(f"Error cambiando a ventana: {e}")
-        return False
+    """Cambia el foco a la ventana que mejor coincida con app_name."""
+    return _apply(app_name, "activate", "activada")
 
 if __name__ == "__main__":
     # Prueba rápida
@@ -1,27 +1,19 @@
-from google import genai
-import os
-from dotenv import load_dotenv
+from ai.client import get_client
+from ai.router import get_router
 
-load_dotenv()
-api_key = os.getenv("GEMINI_API_KEY")
-client = genai.Client(api_key=api_key)
+# Prueba cada modelo configurado en el router (ver NUVIA_MODELS_<TAREA> en .env)
+client = get_client()
+router = get_router()
 
-# Test con los IDs exactos que salieron en list_models()
-models_to_test = [
-    "models/gemini-1.5-flash",
-    "models/gemini-flash-latest",
-    "models/gemini-1.5-flash-002",
-    "models/gemini-2.0-flash-lite-preview-02-05" 
-]
+for task, models in router.routes.items():
+    for model_id in models:
+        print(f"[{task}] Testing {model_id}...")
+        try:
+            client.generate_text("Hola", model=model_id, task=task)
+            print(f"SUCCESS: {model_id} works.")
+        except Exception as e:
+            print(f"FAILED: {model_id}: {e}")
 
-for model_id in models_to_test:
-    print(f"Testing {model_id}...")
-    try:
-        response = client.models.generate_content(
-            model=model_id,
-            contents="Hola"
-        )
-        print(f"SUCCESS: {model_id} works.")
-        break
-    except Exception as e:
-        print(f"FAILED: {model_id}: {e}")
+print("\n--- Latencias observadas ---")
+for model_id, stats in router.report().items():
+    print(f"{model_id}: {stats}")
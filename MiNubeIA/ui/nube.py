@@ -22,6 +22,7 @@ _W, _H = int(260 * _SCALE), int(220 * _SCALE)
 _TINT_LISTENING = (100, 200, 255, 45)
 _TINT_THINKING  = (180, 100, 255, 45)
 _TINT_SPEAKING  = (255, 180, 100, 45)
+_TINT_REMINDER  = (255, 220, 80, 60)
 
 # ── Coordenadas Base (antes del escalado) ──
 _SCX_B, _SCY_B = 130, 110
@@ -200,7 +201,7 @@ class CloudWindow:
     def __init__(self):
         self.root = None
         self._state = "idle"
-        self.STATES = ["idle", "listening", "thinking", "speaking"]
+        self.STATES = ["idle", "listening", "thinking", "speaking", "reminder"]
         self._talking = False
         self._drag_x = 0
         self._drag_y = 0
@@ -280,7 +281,7 @@ class CloudWindow:
             # Variar la apertura de la boca con el tiempo para que no sea un toggle rígido
             mouth = (self._step % 10 < 5) and (random.random() > 0.2)
             
-        tint = _TINT_LISTENING if self._state == "listening" else _TINT_THINKING if self._state == "thinking" else _TINT_SPEAKING if self._state == "speaking" else None
+        tint = _TINT_LISTENING if self._state == "listening" else _TINT_THINKING if self._state == "thinking" else _TINT_SPEAKING if self._state == "speaking" else _TINT_REMINDER if self._state == "reminder" else None
         
         cloud = _render_cloud(tint=tint, mouth_open=mouth, blink_frame=blink, sparkles_data=current_p_data)
         self._photo = _to_tk(cloud)
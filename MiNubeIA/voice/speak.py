@@ -8,17 +8,25 @@ class Speaker:
         self._queue = queue.Queue()
         self.on_start = None  # Callback para cuando empieza a hablar
         self.on_stop = None   # Callback para cuando termina
+        self._generation = 0  # Se incrementa en cada interrupción; descarta frases viejas
+        self._engine = None
         self._thread = threading.Thread(target=self._worker, daemon=True)
         self._thread.start()
 
     def _worker(self):
         while True:
-            text = self._queue.get()
-            if text is None: break
+            item = self._queue.get()
+            if item is None: break
+            generation, text = item
+            if generation != self._generation:
+                # Frase encolada antes de una interrupción: se descarta
+                self._queue.task_done()
+                continue
             
             try:
                 # RE-INICIALIZAR CADA VEZ asegura que el driver de Windows no se pierda
                 engine = pyttsx3.init()
+                self._engine = engine
                 self._configure_engine(engine)
                 
                 print(f"[Nuvia TTS] Hablando: '{text[:50]}...'")
@@ -32,6 +40,7 @@ class Speaker:
                 print("[Nuvia TTS] Fin de habla.")
                 
                 # Forzar limpieza
+                self._engine = None
                 del engine
 
                 # Disparar callback de fin (boca off)
@@ -70,7 +79,23 @@ class Speaker:
         engine.setProperty('volume', 1.0)
 
     def speak(self, text: str):
-        self._queue.put(text)
+        self._queue.put((self._generation, text))
+
+    def interrupt(self):
+        """Corta la frase en curso y descarta las pendientes (p. ej. al llegar un comando nuevo)."""
+        self._generation += 1
+        while True:
+            try:
+                self._queue.get_nowait()
+                self._queue.task_done()
+            except queue.Empty:
+                break
+        engine = self._engine
+        if engine is not None:
+            try:
+                engine.stop()
+            except Exception as e:
+                print(f"[Nuvia TTS] Error al interrumpir: {e}")
 
 # Instancia única
 _speaker = Speaker()
@@ -84,6 +109,10 @@ def speak(text: str):
     """Agrega texto a la cola de habla."""
     _speaker.speak(text)
 
+def interrupt_speech():
+    """Detiene el habla actual y vacía la cola."""
+    _speaker.interrupt()
+
 def speak_async(text: str):
     """Alias para compatibilidad, ya es asíncrono por la cola."""
     speak(text)